@@ -0,0 +1,161 @@
+"""Maintenance commands, meant for cron or one-off use.
+
+Usage: python -m app.cli <command> [options]
+"""
+import argparse
+from datetime import datetime, timedelta, timezone
+
+from .config import settings
+from .database import SessionLocal
+from . import explain_check
+from .customers import crud as customer_crud
+from .sales import crud as sale_crud
+from .sales import partitions as sale_partitions
+from .stock import crud as stock_crud
+from .outbox import dispatcher as outbox_dispatcher
+from .exports import jobs as export_jobs
+
+
+def fold_pending_ledger(args):
+    """Fold pending-ledger deltas into customers.pending."""
+    db = SessionLocal()
+    try:
+        folded = customer_crud.fold_pending_ledger(db)
+        print(f"Folded pending ledger into {folded} customers")
+    finally:
+        db.close()
+
+
+def rebuild_daily_rollup(args):
+    """Recompute the daily sales rollup from the sales table."""
+    db = SessionLocal()
+    try:
+        rows = sale_crud.rebuild_daily_rollup(db)
+        print(f"Rebuilt daily sales rollup: {rows} rows")
+    finally:
+        db.close()
+
+
+def explain_indexes(args):
+    """Check via EXPLAIN that the main queries use their indexes."""
+    db = SessionLocal()
+    try:
+        missing = 0
+        for case, used in explain_check.explain_indexes(db):
+            ok = case.index in used
+            missing += not ok
+            print(f"{'ok  ' if ok else 'MISS'} {case.name}: expected {case.index}, plan uses {', '.join(used) or 'no index'}")
+    finally:
+        db.close()
+    if missing:
+        raise SystemExit(f"{missing} queries are not using their index")
+
+
+def dispatch_outbox(args):
+    """Run the outbox dispatcher (alongside or instead of the in-app one)."""
+    outbox_dispatcher.run(args.interval, once=args.once)
+    print(f"Dispatched {outbox_dispatcher.stats()['processed']} outbox events")
+
+
+def ensure_sale_partitions(args):
+    """Create sales/sale_items partitions for the coming months."""
+    db = SessionLocal()
+    try:
+        created = sale_partitions.ensure_partitions(db, args.months_ahead)
+        print(f"Created {len(created)} partitions{': ' + ', '.join(created) if created else ''}")
+    finally:
+        db.close()
+
+
+def detach_sale_partition(args):
+    """Detach one month from sales and sale_items, for archiving."""
+    month = datetime.strptime(args.month, "%Y-%m").date()
+    db = SessionLocal()
+    try:
+        detached = sale_partitions.detach_month(db, month)
+        print(f"Detached {', '.join(detached)}; dump and drop them when archived")
+    except ValueError as e:
+        raise SystemExit(str(e))
+    finally:
+        db.close()
+
+
+def _report_checkpoints(result):
+    print(f"Wrote {result['checkpoints']} stock checkpoints as of {result['as_of'].isoformat()}"
+          f" ({result['drifted']} drifted from their ledger), compacted {result['compacted']} transactions")
+
+
+def checkpoint_stock(args):
+    """Checkpoint the ledger balance of stock items with new transactions."""
+    db = SessionLocal()
+    try:
+        as_of = datetime.fromisoformat(args.as_of) if args.as_of else None
+        _report_checkpoints(stock_crud.checkpoint_stock(db, as_of))
+    finally:
+        db.close()
+
+
+def compact_stock_ledger(args):
+    """Fold stock transactions older than the retention window into checkpoints."""
+    db = SessionLocal()
+    try:
+        as_of = datetime.now(timezone.utc) - timedelta(days=args.retention_days)
+        _report_checkpoints(stock_crud.checkpoint_stock(db, as_of, compact=True))
+    finally:
+        db.close()
+
+
+def sweep_exports(args):
+    """Delete expired export jobs with their files, and leftover .part files."""
+    db = SessionLocal()
+    try:
+        swept = export_jobs.sweep_files(db)
+        print(f"Deleted {swept['jobs']} expired export jobs, {swept['files']} files"
+              f" and {swept['part_files']} leftover .part files")
+    finally:
+        db.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m app.cli")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    fold = commands.add_parser("fold-pending-ledger", help=fold_pending_ledger.__doc__)
+    fold.set_defaults(func=fold_pending_ledger)
+
+    rollup = commands.add_parser("rebuild-daily-rollup", help=rebuild_daily_rollup.__doc__)
+    rollup.set_defaults(func=rebuild_daily_rollup)
+
+    explain = commands.add_parser("explain-indexes", help=explain_indexes.__doc__)
+    explain.set_defaults(func=explain_indexes)
+
+    dispatch = commands.add_parser("dispatch-outbox", help=dispatch_outbox.__doc__)
+    dispatch.add_argument("--interval", type=float, default=1.0, help="seconds between polls when idle")
+    dispatch.add_argument("--once", action="store_true", help="stop once the outbox is drained")
+    dispatch.set_defaults(func=dispatch_outbox)
+
+    ensure = commands.add_parser("ensure-sale-partitions", help=ensure_sale_partitions.__doc__)
+    ensure.add_argument("--months-ahead", type=int, default=settings.SALES_PARTITION_MONTHS_AHEAD)
+    ensure.set_defaults(func=ensure_sale_partitions)
+
+    detach = commands.add_parser("detach-sale-partition", help=detach_sale_partition.__doc__)
+    detach.add_argument("month", help="YYYY-MM")
+    detach.set_defaults(func=detach_sale_partition)
+
+    checkpoint = commands.add_parser("checkpoint-stock", help=checkpoint_stock.__doc__)
+    checkpoint.add_argument("--as-of", help="ISO date/time (default: now)")
+    checkpoint.set_defaults(func=checkpoint_stock)
+
+    compact = commands.add_parser("compact-stock-ledger", help=compact_stock_ledger.__doc__)
+    compact.add_argument("--retention-days", type=int, default=settings.STOCK_LEDGER_RETENTION_DAYS)
+    compact.set_defaults(func=compact_stock_ledger)
+
+    sweep = commands.add_parser("sweep-exports", help=sweep_exports.__doc__)
+    sweep.set_defaults(func=sweep_exports)
+
+    args = parser.parse_args(argv)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,6 +3,8 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))  # backend/
+
 class Settings:
     PG_USER = os.getenv("PG_USER", "postgres")
     PG_PASSWORD = os.getenv("PG_PASSWORD", "abi123")
@@ -17,4 +19,67 @@ class Settings:
     
     PAGE_SIZE = int(os.getenv("PAGE_SIZE", "100"))
 
+    # Connection pool per worker process. DB_POOL_PREWARM connections are
+    # opened during startup so the first requests do not pay for connecting.
+    DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+    DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+    DB_POOL_PREWARM = int(os.getenv("DB_POOL_PREWARM", "0"))
+
+    # Run Base.metadata.create_all when the app is imported. Handy for local
+    # development; in production leave it off and run `alembic upgrade head`
+    # once per deploy, so workers start without DDL or catalog round trips.
+    CREATE_SCHEMA = os.getenv("CREATE_SCHEMA", "true").lower() == "true"
+
+    # Append pending-balance changes to customer_pending_entries instead of
+    # rewriting customers.pending, so checkouts for a shared customer do not
+    # lock its row (they queue on a per-customer advisory lock instead, as
+    # each reads the balance it changes). Reads add the unfolded deltas; fold
+    # them into customers.pending periodically with `python -m app.cli fold-pending-ledger`.
+    PENDING_LEDGER = os.getenv("PENDING_LEDGER", "false").lower() == "true"
+
+    # Report results cache (per worker process): max entries and seconds an
+    # entry is kept. Entries are tagged with the shared table versions, so a
+    # write in any worker invalidates them at once. 0 disables it.
+    REPORT_CACHE_SIZE = int(os.getenv("REPORT_CACHE_SIZE", "256"))
+    REPORT_CACHE_TTL = int(os.getenv("REPORT_CACHE_TTL", "60"))
+
+    # In-process product catalog behind /api/products/search: seconds between
+    # refreshes, which read the products change feed to pick up writes made
+    # by other workers (0 = never).
+    CATALOG_REFRESH_SECONDS = int(os.getenv("CATALOG_REFRESH_SECONDS", "5"))
+
+    # Transactional outbox (app/outbox): seconds between polls of the in-app
+    # dispatcher (0 = run `python -m app.cli dispatch-outbox` instead), events
+    # per batch, and hours processed events are kept. OUTBOX_ROLLUP moves the
+    # daily-rollup upsert off the checkout transaction into the dispatcher; it
+    # is the only outbox handler, so with it off no events are written and
+    # the dispatcher does not run.
+    OUTBOX_DISPATCH_SECONDS = float(os.getenv("OUTBOX_DISPATCH_SECONDS", "1"))
+    OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", "100"))
+    OUTBOX_RETENTION_HOURS = int(os.getenv("OUTBOX_RETENTION_HOURS", "24"))
+    OUTBOX_ROLLUP = os.getenv("OUTBOX_ROLLUP", "false").lower() == "true"
+
+    # Monthly range partitioning of sales and sale_items (app/sales/partitions.py),
+    # opted into when upgrading past migration 0009 (see README_RUN.md):
+    # `python -m app.cli ensure-sale-partitions`, run from cron, keeps
+    # partitions this many months ahead.
+    SALES_PARTITION_MONTHS_AHEAD = int(os.getenv("SALES_PARTITION_MONTHS_AHEAD", "3"))
+
+    # Stock ledger compaction (`python -m app.cli compact-stock-ledger`): stock
+    # transactions older than this many days are folded into a checkpoint.
+    STOCK_LEDGER_RETENTION_DAYS = int(os.getenv("STOCK_LEDGER_RETENTION_DAYS", "365"))
+
+    # Background export jobs (/api/exports): where finished files are kept
+    # (a relative path is taken from the backend directory, not the working
+    # directory), how many run at once, and when a "running" job counts as
+    # abandoned. Every EXPORT_MAINTENANCE_SECONDS each app worker requeues
+    # abandoned jobs and deletes jobs finished more than EXPORT_RETENTION_HOURS
+    # ago, with their files and any leftover .part files (0 = run
+    # `python -m app.cli sweep-exports` from cron instead).
+    EXPORT_DIR = os.path.join(BASE_DIR, os.getenv("EXPORT_DIR", "exports"))
+    EXPORT_WORKERS = int(os.getenv("EXPORT_WORKERS", "2"))
+    EXPORT_STALE_SECONDS = int(os.getenv("EXPORT_STALE_SECONDS", "300"))
+    EXPORT_RETENTION_HOURS = int(os.getenv("EXPORT_RETENTION_HOURS", "24"))
+    EXPORT_MAINTENANCE_SECONDS = float(os.getenv("EXPORT_MAINTENANCE_SECONDS", "60"))
+
 settings = Settings()
\ No newline at end of file
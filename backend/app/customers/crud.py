@@ -1,29 +1,78 @@
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy import func, select, insert, update, delete, values, column, case, or_, text, Float
+from sqlalchemy.dialects.postgresql import UUID as PG_UUID
+from typing import Dict, Iterable, List, Optional, Tuple
 from uuid import UUID
 
 from . import models, schemas
+from ..config import settings
+from ..pagination import paginate
+from .. import versions
+from ..sync import crud as sync_crud
+from ..outbox import crud as outbox
 
 def get_customer(db: Session, customer_id: UUID) -> Optional[models.Customer]:
-    return db.query(models.Customer).filter(models.Customer.id == customer_id).first()
+    customers = _with_pending_balance(db.query(models.Customer).filter(models.Customer.id == customer_id).limit(1))
+    return customers[0] if customers else None
 
-def get_customers(db: Session, skip: int = 0, limit: int = 100, customer_type: Optional[str] = None) -> List[models.Customer]:
+def get_customers(
+    db: Session,
+    skip: int = 0,
+    limit: int = 100,
+    customer_type: Optional[str] = None,
+    cursor: Optional[str] = None,
+) -> List[models.Customer]:
     query = db.query(models.Customer)
     
     if customer_type:
         query = query.filter(models.Customer.type == customer_type)
     
-    return (
-        query.order_by(models.Customer.created_at.desc())
-        .offset(skip)
+    return _with_pending_balance(paginate(query, models.Customer.created_at, models.Customer.id, skip, limit, cursor))
+
+def search_customers(db: Session, q: str, limit: int = 20) -> List[models.Customer]:
+    """Typeahead match on name and phone, prefix matches ranked first.
+
+    Served by the trigram indexes from migration 0004; terms under three
+    characters only match prefixes, which those indexes can still narrow.
+    """
+    term = q.strip().lower()
+    if not term:
+        return []
+
+    name = func.lower(models.Customer.name)
+    phone = models.Customer.phone
+    prefix = or_(name.startswith(term, autoescape=True), phone.startswith(term, autoescape=True))
+    if len(term) < 3:
+        match = prefix
+    else:
+        match = or_(name.contains(term, autoescape=True), phone.contains(term, autoescape=True))
+
+    return _with_pending_balance(
+        db.query(models.Customer)
+        .filter(match)
+        .order_by(case((prefix, 0), else_=1), func.strpos(name, term), func.length(name), models.Customer.id)
         .limit(limit)
-        .all()
     )
 
+def get_customer_changes(db: Session, since: Optional[str] = None, limit: int = 500):
+    # Ledger deltas change a customer's balance without writing its row
+    also_changed = []
+    if settings.PENDING_LEDGER:
+        entry = models.CustomerPendingEntry
+        also_changed.append((entry.change_xid, entry.customer_id))
+    updated, deleted, next_token, has_more = sync_crud.get_changes(db, models.Customer, since, limit, also_changed)
+    if settings.PENDING_LEDGER:
+        balances = get_pending_balances(db, updated)
+        for customer in updated:
+            set_committed_value(customer, "pending", balances[customer.id])
+    return updated, deleted, next_token, has_more
+
 def create_customer(db: Session, customer_in: schemas.CustomerCreate) -> models.Customer:
     db_obj = models.Customer(**customer_in.dict())
     db.add(db_obj)
     db.commit()
+    versions.bump(db, "customers")
     db.refresh(db_obj)
     return db_obj
 
@@ -32,20 +81,24 @@ def update_customer(db: Session, db_obj: models.Customer, customer_in: schemas.C
     for field, value in data.items():
         setattr(db_obj, field, value)
     db.commit()
+    versions.bump(db, "customers")
     db.refresh(db_obj)
     return db_obj
 
 def delete_customer(db: Session, db_obj: models.Customer):
     db.delete(db_obj)
+    sync_crud.record_deletion(db, models.Customer, db_obj.id)
     db.commit()
+    versions.bump(db, "customers")
 
 def apply_payment(db: Session, customer_id: UUID, payment_in: schemas.CustomerPaymentCreate) -> models.Customer:
-    customer = get_customer(db, customer_id)
+    customer = get_customer_for_pending(db, customer_id)
     if not customer:
         raise ValueError("Customer not found")
     
     # Update customer pending amount
-    customer.pending = max(0, customer.pending - payment_in.amount)
+    balance = get_pending_balance(db, customer)
+    set_pending(db, customer, balance, max(0, balance - payment_in.amount))
     
     # Create payment record
     payment = models.CustomerPayment(
@@ -55,17 +108,180 @@ def apply_payment(db: Session, customer_id: UUID, payment_in: schemas.CustomerPa
         note=payment_in.note
     )
     db.add(payment)
+    db.flush()
+    outbox.emit(db, "customer.payment", customer_id=customer_id, payment_id=payment.id, amount=payment_in.amount)
     db.commit()
-    db.refresh(customer)
+    versions.bump(db, "customers")
     
-    return customer
-
-def get_customer_payments(db: Session, customer_id: UUID, skip: int = 0, limit: int = 100) -> List[models.CustomerPayment]:
-    return (
-        db.query(models.CustomerPayment)
-        .filter(models.CustomerPayment.customer_id == customer_id)
-        .order_by(models.CustomerPayment.created_at.desc())
-        .offset(skip)
-        .limit(limit)
+    return get_customer(db, customer_id)
+
+def get_customer_payments(
+    db: Session,
+    customer_id: UUID,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+) -> List[models.CustomerPayment]:
+    query = db.query(models.CustomerPayment).filter(models.CustomerPayment.customer_id == customer_id)
+    return paginate(query, models.CustomerPayment.created_at, models.CustomerPayment.id, skip, limit, cursor).all()
+
+# -------------------------------------
+# PENDING BALANCE / LEDGER
+# -------------------------------------
+def get_customer_for_pending(db: Session, customer_id: UUID) -> Optional[models.Customer]:
+    """Load a customer whose pending balance is about to change.
+
+    Balance changes for the customer are serialized until commit: the
+    caller reads the balance and writes the new one from it. Without the
+    ledger the row is locked; with it an advisory lock is taken instead
+    (_lock_ledger), so the row itself stays free for reads, edits and folds.
+    Reloaded from the row even if this session already read the customer
+    with its ledger balance folded in (_with_pending_balance).
+    """
+    query = db.query(models.Customer).filter(models.Customer.id == customer_id).populate_existing()
+    if settings.PENDING_LEDGER:
+        _lock_ledger(db, [customer_id])
+    else:
+        query = query.with_for_update()
+    return query.first()
+
+def get_customers_for_pending(db: Session, customer_ids: Iterable[UUID]) -> Dict[UUID, models.Customer]:
+    """Batch form of get_customer_for_pending; rows are locked in id order."""
+    customer_ids = list(customer_ids)
+    query = (
+        db.query(models.Customer)
+        .filter(models.Customer.id.in_(customer_ids))
+        .order_by(models.Customer.id)
+        .populate_existing()
+    )
+    if settings.PENDING_LEDGER:
+        _lock_ledger(db, customer_ids)
+    else:
+        query = query.with_for_update()
+    return {customer.id: customer for customer in query.all()}
+
+def _lock_ledger(db: Session, customer_ids: List[UUID]) -> None:
+    """Take the customers' ledger advisory locks until commit, in one fixed order.
+
+    Two balance changes must not both start from the same balance: each
+    delta is the new balance minus the one read, and a sale carries the
+    balance into its invoice total.
+    """
+    keys = sorted({customer_id.int >> 65 for customer_id in customer_ids})  # fits a signed bigint
+    db.execute(text("SELECT count(pg_advisory_xact_lock(key)) FROM unnest(CAST(:keys AS bigint[])) AS key"), {"keys": keys})
+
+def pending_balance(customer=models.Customer):
+    """SQL expression for the current pending balance of customer (a Customer alias or CTE).
+
+    With the ledger enabled, that is customers.pending plus the deltas not
+    folded in yet, summed inside the reading query: reads never fold, which
+    would turn them into writes on the very rows the ledger keeps free.
+    """
+    if not settings.PENDING_LEDGER:
+        return customer.pending
+    entry = models.CustomerPendingEntry
+    unfolded = (
+        select(func.coalesce(func.sum(entry.delta), 0))
+        .where(entry.customer_id == customer.id)
+        .scalar_subquery()
+    )
+    return func.greatest(customer.pending + unfolded, 0)
+
+def _with_pending_balance(query) -> List[models.Customer]:
+    """Run a Customer query with pending set to the current balance (pending_balance).
+
+    The balance is set as the loaded value, so it is never written back.
+    """
+    if not settings.PENDING_LEDGER:
+        return query.all()
+    rows = query.add_columns(pending_balance()).all()
+    for customer, balance in rows:
+        set_committed_value(customer, "pending", balance)
+    return [customer for customer, _ in rows]
+
+def get_pending_balance(db: Session, customer: models.Customer) -> float:
+    """Current pending balance, including deltas not folded in yet."""
+    if not settings.PENDING_LEDGER:
+        return customer.pending
+
+    unfolded = (
+        db.query(func.coalesce(func.sum(models.CustomerPendingEntry.delta), 0))
+        .filter(models.CustomerPendingEntry.customer_id == customer.id)
+        .scalar()
+    )
+    return max(0, customer.pending + unfolded)
+
+def get_pending_balances(db: Session, customers: Iterable[models.Customer]) -> Dict[UUID, float]:
+    """Batch form of get_pending_balance, in one query."""
+    balances = {customer.id: customer.pending for customer in customers}
+    if not settings.PENDING_LEDGER or not balances:
+        return balances
+
+    entry = models.CustomerPendingEntry
+    unfolded = (
+        db.query(entry.customer_id, func.sum(entry.delta))
+        .filter(entry.customer_id.in_(list(balances)))
+        .group_by(entry.customer_id)
         .all()
-    )
\ No newline at end of file
+    )
+    for customer_id, delta in unfolded:
+        balances[customer_id] = max(0, balances[customer_id] + delta)
+    return balances
+
+def set_pending(db: Session, customer: models.Customer, old_pending: float, new_pending: float):
+    """Move the customer's balance from old_pending to new_pending (no commit)."""
+    if not settings.PENDING_LEDGER:
+        customer.pending = new_pending
+    elif new_pending != old_pending:
+        db.add(models.CustomerPendingEntry(customer_id=customer.id, delta=new_pending - old_pending))
+
+def set_pending_many(db: Session, changes: Dict[UUID, Tuple[float, float]]):
+    """Batch form of set_pending: {customer_id: (old_pending, new_pending)}, one statement."""
+    changes = {customer_id: change for customer_id, change in changes.items() if change[0] != change[1]}
+    if not changes:
+        return
+
+    if settings.PENDING_LEDGER:
+        db.execute(
+            insert(models.CustomerPendingEntry),
+            [{"customer_id": customer_id, "delta": new - old} for customer_id, (old, new) in changes.items()],
+        )
+        return
+
+    balances = values(
+        column("id", PG_UUID(as_uuid=True)),
+        column("pending", Float),
+        name="balances",
+    ).data([(customer_id, new) for customer_id, (_, new) in changes.items()])
+    db.execute(
+        update(models.Customer)
+        .where(models.Customer.id == balances.c.id)
+        .values(pending=balances.c.pending)
+        .execution_options(synchronize_session=False)
+    )
+
+def fold_pending_ledger(db: Session, customer_ids: Optional[Iterable[UUID]] = None) -> int:
+    """Fold ledger deltas into customers.pending; returns the customers updated.
+
+    The entries are deleted and summed in the same statement, so concurrent
+    folds never apply a delta twice and new entries wait for the next fold.
+    """
+    entry = models.CustomerPendingEntry
+    moved = delete(entry).returning(entry.customer_id, entry.delta)
+    if customer_ids is not None:
+        moved = moved.where(entry.customer_id.in_(list(customer_ids)))
+    moved = moved.cte("moved")
+
+    totals = (
+        select(moved.c.customer_id, func.sum(moved.c.delta).label("delta"))
+        .group_by(moved.c.customer_id)
+        .subquery("totals")
+    )
+    result = db.execute(
+        update(models.Customer)
+        .where(models.Customer.id == totals.c.customer_id)
+        .values(pending=func.greatest(0, models.Customer.pending + totals.c.delta))
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+    return result.rowcount
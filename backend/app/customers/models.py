@@ -1,10 +1,11 @@
-from sqlalchemy import Column, String, Integer, Float, DateTime, ForeignKey
+from sqlalchemy import Column, String, Integer, Float, DateTime, ForeignKey, Index, text, BigInteger
 from sqlalchemy.sql import func
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 import uuid
 
 from ..database import Base
+from ..sync.models import CURRENT_XID_DEFAULT, current_xid
 
 class Customer(Base):
     __tablename__ = "customers"
@@ -15,6 +16,17 @@ class Customer(Base):
     type = Column(String(20), nullable=False, default="retail")  # retail, wholesale
     pending = Column(Float, nullable=False, default=0)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    change_xid = Column(BigInteger, nullable=False, server_default=CURRENT_XID_DEFAULT, onupdate=current_xid)
+
+    __table_args__ = (
+        Index("ix_customers_created_at_id", "created_at", "id"),
+        Index("ix_customers_change_xid_id", "change_xid", "id"),  # /changes feed
+        Index(
+            "ix_customers_wholesale_pending", "pending", "id",
+            postgresql_where=text("type = 'wholesale' AND pending > 0"),
+        ),
+    )
 
 class CustomerPayment(Base):
     __tablename__ = "customer_payments"
@@ -26,4 +38,22 @@ class CustomerPayment(Base):
     note = Column(String(255), nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     
-    customer = relationship("Customer")
\ No newline at end of file
+    customer = relationship("Customer")
+
+    __table_args__ = (
+        Index("ix_customer_payments_customer_id_created_at", "customer_id", "created_at", "id"),
+    )
+
+class CustomerPendingEntry(Base):
+    __tablename__ = "customer_pending_entries"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4, index=True)
+    customer_id = Column(UUID(as_uuid=True), ForeignKey("customers.id"), nullable=False, index=True)
+    delta = Column(Float, nullable=False)  # signed: + sale on credit, - payment
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # The customer's balance changed in this transaction: /changes reports it
+    change_xid = Column(BigInteger, nullable=False, server_default=CURRENT_XID_DEFAULT)
+
+    __table_args__ = (
+        Index("ix_customer_pending_entries_change_xid", "change_xid", "customer_id"),  # /changes feed
+    )
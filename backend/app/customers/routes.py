@@ -1,61 +1,55 @@
-import csv
-from io import StringIO
-from fastapi import APIRouter, HTTPException, Depends, Response
+from fastapi import APIRouter, HTTPException, Depends, Request, Response
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from uuid import UUID
 
 from . import schemas, crud
 from ..utils import get_db
+from ..exports.streaming import csv_response
+from ..pagination import set_next_cursor
+from .. import versions
+from ..sync.schemas import ChangesOut
 
 router = APIRouter(prefix="/api/customers", tags=["customers"])
 
 @router.get("/export", tags=["Export"])
-def export_customers_csv(db: Session = Depends(get_db)):
-    """Download all customers as CSV."""
-    customers = crud.get_customers(db, skip=0, limit=100000)
-
-    # Create CSV in memory
-    output = StringIO()
-    writer = csv.writer(output)
-
-    # Header
-    writer.writerow([
-        "id",
-        "name",
-        "phone",
-        "type",
-        "pending",
-        "created_at"
-    ])
-
-    # Rows
-    for c in customers:
-        writer.writerow([
-            str(c.id),
-            c.name,
-            c.phone,
-            c.type,
-            c.pending,
-            c.created_at.isoformat() if c.created_at else "",
-        ])
-
-    output.seek(0)
-
-    return Response(
-        content=output.getvalue(),
-        media_type="text/csv",
-        headers={"Content-Disposition": "attachment; filename=customers_export.csv"},
-    )
+def export_customers_csv(request: Request, start_date: Optional[str] = None, end_date: Optional[str] = None):
+    """Stream all customers as CSV."""
+    return csv_response(request, "customers", start_date, end_date)
 
 @router.get("/", response_model=List[schemas.CustomerOut])
 def list_customers(
+    request: Request,
+    response: Response,
     skip: int = 0, 
     limit: int = 100, 
+    cursor: Optional[str] = None,
     type: Optional[str] = None,
     db: Session = Depends(get_db)
 ):
-    return crud.get_customers(db, skip=skip, limit=limit, customer_type=type)
+    unchanged = versions.not_modified(request, response, db, "customers")
+    if unchanged:
+        return unchanged
+    try:
+        customers = crud.get_customers(db, skip=skip, limit=limit, customer_type=type, cursor=cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    set_next_cursor(response, customers, limit)
+    return customers
+
+@router.get("/changes", response_model=ChangesOut[schemas.CustomerOut])
+def customer_changes(since: Optional[str] = None, limit: int = 500, db: Session = Depends(get_db)):
+    """Rows inserted, updated or deleted since the sync token (all rows without one)"""
+    try:
+        updated, deleted, next_token, has_more = crud.get_customer_changes(db, since, min(limit, 5000))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return ChangesOut(updated=updated, deleted=deleted, next_token=next_token, has_more=has_more)
+
+@router.get("/search", response_model=List[schemas.CustomerOut])
+def search_customers(q: str, limit: int = 20, db: Session = Depends(get_db)):
+    """Typeahead search on customer name and phone"""
+    return crud.search_customers(db, q, min(limit, 100))
 
 @router.get("/{customer_id}", response_model=schemas.CustomerOut)
 def read_customer(customer_id: UUID, db: Session = Depends(get_db)):
@@ -91,5 +85,17 @@ def accept_payment(customer_id: UUID, payment_in: schemas.CustomerPaymentCreate,
         raise HTTPException(status_code=404, detail=str(e))
 
 @router.get("/{customer_id}/payments", response_model=List[schemas.CustomerPaymentOut])
-def get_customer_payments(customer_id: UUID, skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    return crud.get_customer_payments(db, customer_id, skip=skip, limit=limit)
\ No newline at end of file
+def get_customer_payments(
+    customer_id: UUID,
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db),
+):
+    try:
+        payments = crud.get_customer_payments(db, customer_id, skip=skip, limit=limit, cursor=cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    set_next_cursor(response, payments, limit)
+    return payments
\ No newline at end of file
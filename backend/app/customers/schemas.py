@@ -26,6 +26,7 @@ class CustomerOut(CustomerBase):
     id: UUID
     pending: float
     created_at: datetime
+    updated_at: Optional[datetime] = None
 
 class CustomerPaymentBase(BaseModel):
     amount: float = Field(..., gt=0)
@@ -0,0 +1,171 @@
+"""EXPLAIN-based check that the hot queries are served by their indexes.
+
+Each case mirrors a query from the crud/report modules and names the index
+the planner should pick for it. Plans are taken with enable_seqscan off so
+the check means "can use the index" even on a small or empty database,
+where a sequential scan would otherwise win on cost.
+
+With partitioned sales, indexes of the partitions count as the partitioned
+index they belong to, and date-range cases are checked for partition
+pruning instead: reading only the months in range is what keeps them fast.
+"""
+import json
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Iterator, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import func, select, text, tuple_
+from sqlalchemy.orm import Session
+
+from .customers import models as customer_models
+from .products import models as product_models
+from .sales import models as sale_models
+from .sales import partitions
+from .stock import models as stock_models
+
+
+class Case(NamedTuple):
+    name: str
+    index: str
+    query: object
+    pruned_table: Optional[str] = None  # date range over this table, when partitioned
+
+
+PRUNING = "partition pruning"
+
+
+def _cases() -> List[Case]:
+    Sale, SaleItem = sale_models.Sale, sale_models.SaleItem
+    Customer, CustomerPayment = customer_models.Customer, customer_models.CustomerPayment
+    StockItem = stock_models.StockItem
+    StockTransaction = stock_models.StockTransaction
+    StockCheckpoint = stock_models.StockCheckpoint
+    some_id = uuid.uuid4()
+    now = datetime.now(timezone.utc)
+
+    return [
+        Case(
+            "sales list (keyset page)", "ix_sales_created_at_id",
+            select(Sale)
+            .where(tuple_(Sale.created_at, Sale.id) < tuple_(now, some_id))
+            .order_by(Sale.created_at.desc(), Sale.id.desc()).limit(100),
+        ),
+        Case(
+            "pending sales list", "ix_sales_pending_created_at",
+            select(Sale).where(Sale.pending > 0)
+            .order_by(Sale.created_at.desc(), Sale.id.desc()).limit(100),
+        ),
+        Case(
+            "last invoice per customer", "ix_sales_customer_id_created_at",
+            select(Sale).where(Sale.customer_id == some_id)
+            .order_by(Sale.created_at.desc()).limit(1),
+        ),
+        Case(
+            "daily sales report (date range)", "ix_sales_date_brin",
+            select(func.date(Sale.date), func.count(Sale.id), func.sum(Sale.total))
+            .where(Sale.date >= now - timedelta(days=30), Sale.date <= now)
+            .group_by(func.date(Sale.date)),
+            "sales",
+        ),
+        Case(
+            "sale items of a page of sales", "ix_sale_items_sale_id",
+            select(SaleItem).where(SaleItem.sale_id.in_([some_id, uuid.uuid4()])),
+        ),
+        Case(
+            "product performance (date range)", "ix_sale_items_sale_date_brin",
+            # the range scan only: on an empty table the planner would rather
+            # read ix_sale_items_product_id in GROUP BY order
+            select(func.sum(SaleItem.quantity), func.sum(SaleItem.line_total))
+            .where(SaleItem.sale_date >= now - timedelta(days=30), SaleItem.sale_date <= now),
+            "sale_items",
+        ),
+        Case(
+            "sales of a product", "ix_sale_items_product_id",
+            select(func.sum(SaleItem.quantity)).where(SaleItem.product_id == some_id),
+        ),
+        Case(
+            "wholesale pending customers", "ix_customers_wholesale_pending",
+            select(Customer)
+            .where(Customer.type == "wholesale", Customer.pending > 0)
+            .order_by(Customer.pending.desc(), Customer.id.desc()).limit(100),
+        ),
+        Case(
+            "customers list", "ix_customers_created_at_id",
+            select(Customer).order_by(Customer.created_at.desc(), Customer.id.desc()).limit(100),
+        ),
+        Case(
+            "customer payments", "ix_customer_payments_customer_id_created_at",
+            select(CustomerPayment).where(CustomerPayment.customer_id == some_id)
+            .order_by(CustomerPayment.created_at.desc(), CustomerPayment.id.desc()).limit(100),
+        ),
+        Case(
+            "products list", "ix_products_created_at_id",
+            select(product_models.Product)
+            .order_by(product_models.Product.created_at.desc(), product_models.Product.id.desc()).limit(100),
+        ),
+        Case(
+            "stock items list", "ix_stock_items_created_at_id",
+            select(stock_models.StockItem)
+            .order_by(stock_models.StockItem.created_at.desc(), stock_models.StockItem.id.desc()).limit(100),
+        ),
+        Case(
+            "low stock", "ix_stock_items_low_shortfall",
+            select(StockItem).where(StockItem.quantity <= StockItem.min_threshold)
+            .order_by((StockItem.min_threshold - StockItem.quantity).desc(), StockItem.id).limit(100),
+        ),
+        Case(
+            "stock transactions", "ix_stock_transactions_stock_item_id_created_at",
+            select(StockTransaction).where(StockTransaction.stock_item_id == some_id)
+            .order_by(StockTransaction.created_at.desc(), StockTransaction.id.desc()).limit(100),
+        ),
+        Case(
+            "stock balance checkpoint", "ix_stock_checkpoints_stock_item_id_as_of",
+            select(StockCheckpoint).where(StockCheckpoint.stock_item_id == some_id, StockCheckpoint.as_of <= now)
+            .order_by(StockCheckpoint.as_of.desc()).limit(1),
+        ),
+    ]
+
+
+def _plan_nodes(node: dict) -> Iterator[dict]:
+    yield node
+    for child in node.get("Plans", []):
+        yield from _plan_nodes(child)
+
+
+def _top_level(db: Session, index_names: List[str]) -> List[str]:
+    """Map indexes of partitions to the partitioned index they belong to."""
+    if not index_names:
+        return []
+    roots = db.execute(
+        text("SELECT coalesce(pg_partition_root(name::regclass)::text, name) FROM unnest(:names) AS name"),
+        {"names": index_names},
+    ).scalars()
+    return list(dict.fromkeys(roots))
+
+
+def explain_indexes(db: Session) -> List[Tuple[Case, List[str]]]:
+    """Return each case with the index names found in its plan."""
+    dialect = db.get_bind().dialect
+    partitioned = partitions.is_partitioned(db)
+    results = []
+    for case in _cases():
+        compiled = case.query.compile(
+            dialect=dialect, compile_kwargs={"literal_binds": True, "render_postcompile": True}
+        )
+        # set_config(..., is_local=true) is SET LOCAL: undone by the rollback
+        db.execute(select(func.set_config("enable_seqscan", "off", True)))
+        plan = db.connection().exec_driver_sql(f"EXPLAIN (FORMAT JSON) {compiled}").scalar()
+        db.rollback()
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        nodes = list(_plan_nodes(plan[0]["Plan"]))
+        used = _top_level(db, [node["Index Name"] for node in nodes if "Index Name" in node])
+
+        if partitioned and case.pruned_table:
+            # Pruned at plan time (fewer partitions scanned) or at run time
+            scanned = {node["Relation Name"] for node in nodes if "Relation Name" in node}
+            if any("Subplans Removed" in node for node in nodes) or len(scanned) < len(partitions.attached(db, case.pruned_table)):
+                used.append(PRUNING)
+            case = case._replace(index=PRUNING)
+        results.append((case, used))
+    return results
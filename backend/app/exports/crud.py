@@ -0,0 +1,108 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import func, or_, and_, update, delete
+from datetime import timedelta
+from typing import List, Optional, Set, Tuple
+from uuid import UUID
+import uuid
+
+from . import models, schemas
+from ..config import settings
+
+def create_job(db: Session, job_in: schemas.ExportCreate) -> models.ExportJob:
+    db_obj = models.ExportJob(**job_in.dict())
+    db.add(db_obj)
+    db.commit()
+    db.refresh(db_obj)
+    return db_obj
+
+def get_job(db: Session, job_id: UUID) -> Optional[models.ExportJob]:
+    return db.query(models.ExportJob).filter(models.ExportJob.id == job_id).first()
+
+def get_unfinished_job_ids(db: Session) -> List[UUID]:
+    return [
+        job_id
+        for (job_id,) in db.query(models.ExportJob.id)
+        .filter(models.ExportJob.status.in_(["pending", "running"]))
+        .order_by(models.ExportJob.created_at)
+    ]
+
+def get_stale_job_ids(db: Session) -> List[UUID]:
+    """Jobs untouched for EXPORT_STALE_SECONDS: running ones whose heartbeat
+    stopped (see claim_job), and pending ones no worker has picked up.
+
+    A pending job may just be queued behind others; submitting it again is
+    harmless, as only one run can claim it.
+    """
+    job = models.ExportJob
+    stale_before = func.now() - timedelta(seconds=settings.EXPORT_STALE_SECONDS)
+    return [
+        job_id
+        for (job_id,) in db.query(job.id)
+        .filter(job.status.in_(["pending", "running"]), job.updated_at < stale_before)
+        .order_by(job.created_at)
+    ]
+
+def get_live_claims(db: Session) -> Set[Tuple[UUID, UUID]]:
+    """(job id, claim token) of every running job."""
+    job = models.ExportJob
+    return set(db.query(job.id, job.claim_token).filter(job.status == "running").all())
+
+def delete_finished_jobs(db: Session, older_than: timedelta) -> List[Optional[str]]:
+    """Delete jobs that finished more than older_than ago; returns their file paths."""
+    job = models.ExportJob
+    deleted = db.execute(
+        delete(job)
+        .where(job.status.in_(["done", "failed"]), job.finished_at < func.now() - older_than)
+        .returning(job.file_path)
+        .execution_options(synchronize_session=False)
+    ).scalars().all()
+    db.commit()
+    return deleted
+
+def claim_job(db: Session, job_id: UUID) -> Optional[UUID]:
+    """Mark a job running under a new claim token; None if another worker holds it.
+
+    A running job whose claim has not been refreshed for EXPORT_STALE_SECONDS
+    is taken to belong to a dead worker and can be claimed again. The
+    previous holder then finds its token gone on its next write.
+    """
+    job = models.ExportJob
+    token = uuid.uuid4()
+    stale_before = func.now() - timedelta(seconds=settings.EXPORT_STALE_SECONDS)
+    result = db.execute(
+        update(job)
+        .where(
+            job.id == job_id,
+            or_(job.status == "pending", and_(job.status == "running", job.updated_at < stale_before)),
+        )
+        .values(status="running", rows_written=0, error=None, claim_token=token)
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+    return token if result.rowcount == 1 else None
+
+def update_claimed_job(db: Session, job_id: UUID, token: UUID, **values) -> bool:
+    """Update a job (and its updated_at heartbeat) if token still holds its claim; commits."""
+    job = models.ExportJob
+    result = db.execute(
+        update(job)
+        .where(job.id == job_id, job.claim_token == token)
+        .values(**values)
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+    return result.rowcount == 1
+
+def lock_claimed_job(db: Session, job_id: UUID, token: UUID) -> Optional[models.ExportJob]:
+    """The job, locked until commit, if token still holds its claim.
+
+    While it is locked nobody can claim the job, so its file can be put in
+    place and the job finished without racing a new holder.
+    """
+    return (
+        db.query(models.ExportJob)
+        .filter(models.ExportJob.id == job_id, models.ExportJob.claim_token == token)
+        .with_for_update()
+        .populate_existing()
+        .first()
+    )
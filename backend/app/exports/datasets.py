@@ -0,0 +1,149 @@
+"""Column layout and source query for each CSV export."""
+from datetime import datetime
+from typing import Callable, List, NamedTuple, Optional
+
+from sqlalchemy import select
+from sqlalchemy.sql import Select
+
+from ..sales import models as sale_models
+from ..customers import crud as customer_crud, models as customer_models
+from ..products import models as product_models
+from ..stock import models as stock_models
+
+
+class Dataset(NamedTuple):
+    filename: str
+    header: List[str]
+    query: Callable[[Optional[str], Optional[str]], Select]
+    row: Callable[[object], list]
+    keys: tuple  # unique sort key, newest first, that streaming seeks on
+
+
+def _iso(value) -> str:
+    return value.isoformat() if value else ""
+
+
+def check_date_range(start_date: Optional[str], end_date: Optional[str]) -> None:
+    """Raise ValueError unless both bounds are ISO dates or datetimes.
+
+    Checked before an export starts: a bound the database rejects would
+    otherwise fail the stream after its headers are sent.
+    """
+    for name, value in (("start_date", start_date), ("end_date", end_date)):
+        if value:
+            try:
+                datetime.fromisoformat(value)
+            except ValueError:
+                raise ValueError(f"{name} must be an ISO date or datetime") from None
+
+
+def _date_range(query: Select, column, start_date: Optional[str], end_date: Optional[str]) -> Select:
+    if start_date:
+        query = query.where(column >= start_date)
+    if end_date:
+        query = query.where(column <= end_date)
+    return query
+
+
+def _sales_query(start_date: Optional[str], end_date: Optional[str]) -> Select:
+    Sale = sale_models.Sale
+    query = select(
+        Sale.invoice_number, Sale.date, Sale.customer_name, Sale.customer_type, Sale.subtotal,
+        Sale.gst, Sale.total, Sale.paid, Sale.pending, Sale.payment_method, Sale.created_at,
+    )
+    return _date_range(query, Sale.date, start_date, end_date).order_by(Sale.created_at.desc())
+
+
+def _sales_items_query(start_date: Optional[str], end_date: Optional[str]) -> Select:
+    Sale, SaleItem = sale_models.Sale, sale_models.SaleItem
+    query = select(
+        Sale.invoice_number, Sale.date, Sale.customer_name, Sale.customer_type, Sale.payment_method,
+        SaleItem.product_id, SaleItem.product_name, SaleItem.quantity, SaleItem.price,
+        SaleItem.line_total, SaleItem.price_type,
+    ).join(SaleItem, SaleItem.sale_id == Sale.id)
+    return _date_range(query, Sale.date, start_date, end_date).order_by(Sale.created_at.desc(), Sale.id)
+
+
+def _customers_query(start_date: Optional[str], end_date: Optional[str]) -> Select:
+    Customer = customer_models.Customer
+    query = select(
+        Customer.id, Customer.name, Customer.phone, Customer.type,
+        customer_crud.pending_balance().label("pending"), Customer.created_at,
+    )
+    return _date_range(query, Customer.created_at, start_date, end_date).order_by(Customer.created_at.desc())
+
+
+def _products_query(start_date: Optional[str], end_date: Optional[str]) -> Select:
+    Product = product_models.Product
+    query = select(
+        Product.id, Product.name, Product.category, Product.retail_price, Product.wholesale_price,
+        Product.is_wholesale_only, Product.stock, Product.created_at,
+    )
+    return _date_range(query, Product.created_at, start_date, end_date).order_by(Product.created_at.desc())
+
+
+def _stock_query(start_date: Optional[str], end_date: Optional[str]) -> Select:
+    StockItem = stock_models.StockItem
+    query = select(
+        StockItem.id, StockItem.name, StockItem.category, StockItem.quantity, StockItem.unit,
+        StockItem.min_threshold, StockItem.linked_product_id, StockItem.created_at,
+    )
+    return _date_range(query, StockItem.created_at, start_date, end_date).order_by(StockItem.created_at.desc())
+
+
+DATASETS = {
+    "sales": Dataset(
+        filename="sales_export.csv",
+        header=[
+            "invoice_number", "date", "customer_name", "customer_type", "subtotal",
+            "gst", "total", "paid", "pending", "payment_method", "created_at",
+        ],
+        query=_sales_query,
+        row=lambda r: [
+            r.invoice_number, _iso(r.date), r.customer_name, r.customer_type, r.subtotal,
+            r.gst, r.total, r.paid, r.pending, r.payment_method, _iso(r.created_at),
+        ],
+        keys=(sale_models.Sale.created_at, sale_models.Sale.id),
+    ),
+    "sales_items": Dataset(
+        filename="sales_items_export.csv",
+        header=[
+            "invoice_number", "date", "customer_name", "customer_type", "payment_method",
+            "product_id", "product_name", "quantity", "price", "line_total", "price_type",
+        ],
+        query=_sales_items_query,
+        row=lambda r: [
+            r.invoice_number, _iso(r.date), r.customer_name, r.customer_type, r.payment_method,
+            str(r.product_id) if r.product_id else "", r.product_name, r.quantity, r.price,
+            r.line_total, r.price_type,
+        ],
+        keys=(sale_models.Sale.created_at, sale_models.Sale.id, sale_models.SaleItem.id),
+    ),
+    "customers": Dataset(
+        filename="customers_export.csv",
+        header=["id", "name", "phone", "type", "pending", "created_at"],
+        query=_customers_query,
+        row=lambda r: [str(r.id), r.name, r.phone, r.type, r.pending, _iso(r.created_at)],
+        keys=(customer_models.Customer.created_at, customer_models.Customer.id),
+    ),
+    "products": Dataset(
+        filename="products_export.csv",
+        header=["id", "name", "category", "retail_price", "wholesale_price", "is_wholesale_only", "stock", "created_at"],
+        query=_products_query,
+        row=lambda r: [
+            str(r.id), r.name, r.category, r.retail_price, r.wholesale_price,
+            r.is_wholesale_only, r.stock, _iso(r.created_at),
+        ],
+        keys=(product_models.Product.created_at, product_models.Product.id),
+    ),
+    "stock": Dataset(
+        filename="stock_export.csv",
+        header=["id", "name", "category", "quantity", "unit", "min_threshold", "linked_product_id", "created_at"],
+        query=_stock_query,
+        row=lambda r: [
+            str(r.id), r.name, r.category, r.quantity, r.unit, r.min_threshold,
+            str(r.linked_product_id) if r.linked_product_id else "", _iso(r.created_at),
+        ],
+        keys=(stock_models.StockItem.created_at, stock_models.StockItem.id),
+    ),
+}
@@ -0,0 +1,206 @@
+"""Background runner for export jobs.
+
+Jobs run on a small thread pool, off the request path, and write a gzip'd
+CSV under EXPORT_DIR. While a job runs, a heartbeat thread commits its
+progress every few seconds, however long a query takes: claim_job picks up
+jobs whose heartbeat has stopped. Every write checks the worker's claim
+token, so a worker whose job was re-claimed stops instead of racing the
+new holder, and each claim writes its own side file.
+
+Jobs abandoned by a dead worker are requeued by maintain(), which app
+workers run every EXPORT_MAINTENANCE_SECONDS; it also deletes expired jobs
+and their files.
+"""
+import asyncio
+import gzip
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from typing import Dict
+from uuid import UUID
+
+from fastapi.concurrency import run_in_threadpool
+
+from sqlalchemy import func, select
+
+from . import crud
+from .datasets import DATASETS
+from .streaming import iter_csv
+from ..config import settings
+from ..database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+PROGRESS_INTERVAL = 2.0  # seconds between heartbeats (progress commits)
+
+_executor = ThreadPoolExecutor(max_workers=settings.EXPORT_WORKERS, thread_name_prefix="export")
+
+
+def submit(job_id: UUID):
+    _executor.submit(run_export_job, job_id)
+
+
+def resume_unfinished():
+    """Queue jobs left pending or abandoned by a previous process."""
+    db = SessionLocal()
+    try:
+        for job_id in crud.get_unfinished_job_ids(db):
+            submit(job_id)
+    finally:
+        db.close()
+
+
+def sweep_files(db) -> Dict[str, int]:
+    """Delete expired jobs with their files, and .part files no running claim owns."""
+    removed_files = 0
+    paths = crud.delete_finished_jobs(db, timedelta(hours=settings.EXPORT_RETENTION_HOURS))
+    for path in paths:
+        if path and _remove(path):
+            removed_files += 1
+
+    # A side file is named {job_id}.{token}.csv.gz.part; its worker removes it
+    # unless it died, so one whose claim is no longer running is left over
+    live = {(str(job_id), str(token)) for job_id, token in crud.get_live_claims(db)}
+    removed_parts = 0
+    if os.path.isdir(settings.EXPORT_DIR):
+        for name in os.listdir(settings.EXPORT_DIR):
+            if not name.endswith(".csv.gz.part"):
+                continue
+            claim = tuple(name[:-len(".csv.gz.part")].split(".", 1))
+            if claim not in live and _remove(os.path.join(settings.EXPORT_DIR, name)):
+                removed_parts += 1
+    return {"jobs": len(paths), "files": removed_files, "part_files": removed_parts}
+
+
+def _remove(path: str) -> bool:
+    try:
+        os.remove(path)
+        return True
+    except FileNotFoundError:
+        return False
+
+
+def maintain() -> Dict[str, int]:
+    """Requeue abandoned jobs and sweep expired ones; returns what was done."""
+    db = SessionLocal()
+    try:
+        requeued = crud.get_stale_job_ids(db)
+        for job_id in requeued:
+            submit(job_id)
+        return {"requeued": len(requeued), **sweep_files(db)}
+    finally:
+        db.close()
+
+
+async def maintain_periodically(interval: float) -> None:
+    """In-app maintenance; run as a lifespan task."""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await run_in_threadpool(maintain)
+        except Exception:
+            logger.exception("Export maintenance failed")
+
+
+def shutdown():
+    _executor.shutdown(wait=False, cancel_futures=True)
+
+
+class ClaimLost(Exception):
+    """The job was re-claimed by another worker."""
+
+
+class _Heartbeat(threading.Thread):
+    """Commits rows_written under the claim every PROGRESS_INTERVAL; sets lost if the claim is gone."""
+
+    def __init__(self, job_id: UUID, token: UUID):
+        super().__init__(name=f"export-heartbeat-{job_id}", daemon=True)
+        self.job_id, self.token = job_id, token
+        self.rows_written = 0
+        self.lost = threading.Event()
+        self._done = threading.Event()
+
+    def run(self):
+        db = SessionLocal()
+        try:
+            while not self._done.wait(PROGRESS_INTERVAL):
+                try:
+                    if not crud.update_claimed_job(db, self.job_id, self.token, rows_written=self.rows_written):
+                        self.lost.set()
+                        return
+                except Exception:
+                    logger.warning("Heartbeat for export job %s failed", self.job_id, exc_info=True)
+                    db.rollback()
+        finally:
+            db.close()
+
+    def stop(self):
+        self._done.set()
+        self.join()
+
+
+def run_export_job(job_id: UUID):
+    db = SessionLocal()
+    token = heartbeat = part_path = None
+    try:
+        token = crud.claim_job(db, job_id)
+        if not token:
+            return
+        heartbeat = _Heartbeat(job_id, token)
+        heartbeat.start()
+
+        job = crud.get_job(db, job_id)
+        dataset = DATASETS[job.dataset]
+        start_date, end_date = job.start_date, job.end_date
+
+        counted = dataset.query(start_date, end_date).order_by(None).subquery()
+        total_rows = db.execute(select(func.count()).select_from(counted)).scalar()
+        if not crud.update_claimed_job(db, job_id, token, total_rows=total_rows):
+            raise ClaimLost()
+
+        os.makedirs(settings.EXPORT_DIR, exist_ok=True)
+        path = os.path.join(settings.EXPORT_DIR, f"{job_id}.csv.gz")
+        written = 0
+
+        def on_rows(count: int):
+            nonlocal written
+            written += count
+            heartbeat.rows_written = written
+            if heartbeat.lost.is_set():
+                raise ClaimLost()
+
+        # Write to a side file of this claim, so a half-written export is
+        # never downloadable and a previous holder cannot write into it
+        part_path = os.path.join(settings.EXPORT_DIR, f"{job_id}.{token}.csv.gz.part")
+        with gzip.open(part_path, "wb") as out:
+            for chunk in iter_csv(dataset, start_date, end_date, on_rows=on_rows):
+                out.write(chunk)
+        heartbeat.stop()
+
+        job = crud.lock_claimed_job(db, job_id, token)
+        if not job:
+            raise ClaimLost()
+        os.replace(part_path, path)
+        job.rows_written = written
+        job.file_path = path
+        job.file_size = os.path.getsize(path)
+        job.status = "done"
+        job.finished_at = func.now()
+        db.commit()
+
+    except ClaimLost:
+        logger.warning("Export job %s was claimed by another worker; dropping this run", job_id)
+        db.rollback()
+    except Exception as e:
+        logger.exception("Export job %s failed", job_id)
+        db.rollback()
+        if token:
+            crud.update_claimed_job(db, job_id, token, status="failed", error=str(e)[:500], finished_at=func.now())
+    finally:
+        if heartbeat:
+            heartbeat.stop()
+        if part_path and os.path.exists(part_path):
+            os.remove(part_path)
+        db.close()
@@ -0,0 +1,31 @@
+from sqlalchemy import Column, String, Integer, BigInteger, DateTime
+from sqlalchemy.sql import func
+from sqlalchemy.dialects.postgresql import UUID
+import uuid
+
+from ..database import Base
+
+class ExportJob(Base):
+    __tablename__ = "export_jobs"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4, index=True)
+    dataset = Column(String(50), nullable=False)  # key of exports.datasets.DATASETS
+    start_date = Column(String(50), nullable=True)
+    end_date = Column(String(50), nullable=True)
+    status = Column(String(20), nullable=False, default="pending")  # pending, running, done, failed
+    total_rows = Column(Integer, nullable=True)
+    rows_written = Column(Integer, nullable=False, default=0)
+    file_path = Column(String(500), nullable=True)
+    file_size = Column(BigInteger, nullable=True)
+    error = Column(String(500), nullable=True)
+    # Set by claim_job; progress and completion are only written under it
+    claim_token = Column(UUID(as_uuid=True), nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+
+    @property
+    def progress(self):
+        if not self.total_rows:
+            return 1.0 if self.status == "done" else None
+        return min(1.0, self.rows_written / self.total_rows)
@@ -0,0 +1,102 @@
+import os
+import re
+from fastapi import APIRouter, HTTPException, Depends, Request, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+from typing import Optional, Tuple
+from uuid import UUID
+
+from . import schemas, crud, jobs
+from .datasets import DATASETS, check_date_range
+from ..utils import get_db
+
+router = APIRouter(prefix="/api/exports", tags=["Export"])
+
+CHUNK_SIZE = 64 * 1024
+
+
+@router.post("/", response_model=schemas.ExportJobOut, status_code=202)
+def create_export(job_in: schemas.ExportCreate, db: Session = Depends(get_db)):
+    """Queue a background export; poll the job, then download the file."""
+    try:
+        check_date_range(job_in.start_date, job_in.end_date)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    job = crud.create_job(db, job_in)
+    jobs.submit(job.id)
+    return job
+
+
+@router.get("/{job_id}", response_model=schemas.ExportJobOut)
+def read_export(job_id: UUID, db: Session = Depends(get_db)):
+    job = crud.get_job(db, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Export not found")
+    return job
+
+
+@router.get("/{job_id}/download")
+def download_export(job_id: UUID, request: Request, db: Session = Depends(get_db)):
+    """Download a finished export (gzip'd CSV); supports single Range requests."""
+    job = crud.get_job(db, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Export not found")
+    if job.status != "done" or not job.file_path or not os.path.exists(job.file_path):
+        raise HTTPException(status_code=409, detail="Export is not ready")
+
+    size = os.path.getsize(job.file_path)
+    headers = {
+        "Accept-Ranges": "bytes",
+        "Content-Disposition": f"attachment; filename={DATASETS[job.dataset].filename}.gz",
+    }
+
+    byte_range = _parse_range(request.headers.get("range"), size)
+    if byte_range is None:
+        start, end, status_code = 0, size - 1, 200
+    elif byte_range == (-1, -1):
+        return Response(status_code=416, headers={"Content-Range": f"bytes */{size}"})
+    else:
+        (start, end), status_code = byte_range, 206
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+
+    headers["Content-Length"] = str(end - start + 1)
+    return StreamingResponse(
+        _read_file(job.file_path, start, end),
+        status_code=status_code,
+        media_type="application/gzip",
+        headers=headers,
+    )
+
+
+def _parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """Parse a single "bytes=" range; None means whole file, (-1, -1) unsatisfiable."""
+    if not header:
+        return None
+    match = re.fullmatch(r"\s*bytes=(\d*)-(\d*)\s*", header)
+    if not match or match.groups() == ("", ""):
+        return None  # multi-range or malformed: ignore it and send the whole file
+
+    first, last = match.groups()
+    if first and last and int(last) < int(first):
+        return None  # invalid range (RFC 9110 14.1.1): ignored like a malformed one
+    if first == "":
+        if int(last) == 0 or size == 0:
+            return (-1, -1)
+        return max(0, size - int(last)), size - 1
+
+    start = int(first)
+    if start >= size:
+        return (-1, -1)
+    return start, min(int(last), size - 1) if last else size - 1
+
+
+def _read_file(path: str, start: int, end: int):
+    with open(path, "rb") as f:
+        f.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = f.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
@@ -0,0 +1,26 @@
+from pydantic import BaseModel, Field
+from typing import Optional
+from uuid import UUID
+from datetime import datetime
+
+class ExportCreate(BaseModel):
+    dataset: str = Field(..., pattern="^(sales|sales_items|customers|products|stock)$")
+    start_date: Optional[str] = None
+    end_date: Optional[str] = None
+
+class ExportJobOut(BaseModel):
+    id: UUID
+    dataset: str
+    start_date: Optional[str] = None
+    end_date: Optional[str] = None
+    status: str
+    total_rows: Optional[int] = None
+    rows_written: int
+    progress: Optional[float] = None  # 0..1, once total_rows is known
+    file_size: Optional[int] = None
+    error: Optional[str] = None
+    created_at: datetime
+    finished_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
@@ -1,7 +1,17 @@
+import time
+
+_import_started = time.perf_counter()
+
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
-from app.database import Base, engine
+from app.config import settings
+from app.database import Base, engine, prewarm_pool
+from app.pagination import NEXT_CURSOR_HEADER
 
 from app.products.routes import router as products_router
 from app.stock.routes import router as stock_router
@@ -9,10 +19,74 @@ from app.customers.routes import router as customers_router
 from app.sales.routes import router as sales_router
 from app.pending.routes import router as pending_router
 from app.reports.routes import router as reports_router
+from app.exports.routes import router as exports_router
+from app.outbox.routes import router as outbox_router
+from app.exports import jobs as export_jobs
+from app.products import catalog as product_catalog
+from app.outbox import dispatcher as outbox_dispatcher, handlers as outbox_handlers
+
+# uvicorn configures this logger, so startup timings show up next to its own
+logger = logging.getLogger("uvicorn.error")
+
+if settings.CREATE_SCHEMA:
+    Base.metadata.create_all(bind=engine)
 
-Base.metadata.create_all(bind=engine)
+def _startup_step(name: str, step, default=None):
+    """Run one startup step, returning default if it fails.
 
-app = FastAPI(title="Billing Backend")
+    A failure (the database being down, say) is logged and startup goes on,
+    so the worker still comes up and serves what it can.
+    """
+    try:
+        return step()
+    except Exception:
+        logger.exception("Startup step %s failed; continuing without it", name)
+        return default
+
+def _start_dispatcher():
+    # Events are only written for enabled handlers, so without one there is
+    # nothing to poll for
+    if settings.OUTBOX_DISPATCH_SECONDS > 0 and outbox_handlers.any_enabled():
+        return asyncio.create_task(outbox_dispatcher.dispatch_periodically(settings.OUTBOX_DISPATCH_SECONDS))
+    return None
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    started = time.perf_counter()
+    warmed = (
+        _startup_step("pre-warm pool", lambda: prewarm_pool(settings.DB_POOL_PREWARM), default=0)
+        if settings.DB_POOL_PREWARM else 0
+    )
+    # Both are retried later: export maintenance requeues abandoned jobs,
+    # and the first search or catalog refresh loads the catalog
+    _startup_step("resume export jobs", export_jobs.resume_unfinished)
+    _startup_step("load product catalog", product_catalog.load)
+    refresh = (
+        asyncio.create_task(product_catalog.refresh_periodically(settings.CATALOG_REFRESH_SECONDS))
+        if settings.CATALOG_REFRESH_SECONDS > 0 else None
+    )
+    dispatch = _startup_step("start outbox dispatcher", _start_dispatcher)
+    maintain_exports = (
+        asyncio.create_task(export_jobs.maintain_periodically(settings.EXPORT_MAINTENANCE_SECONDS))
+        if settings.EXPORT_MAINTENANCE_SECONDS > 0 else None
+    )
+    logger.info(
+        "App imported in %.0f ms (create_all %s); startup took %.0f ms, %d pool connections pre-warmed",
+        (_import_done - _import_started) * 1000,
+        "on" if settings.CREATE_SCHEMA else "off",
+        (time.perf_counter() - started) * 1000,
+        warmed,
+    )
+    yield
+    if refresh:
+        refresh.cancel()
+    if dispatch:
+        dispatch.cancel()
+    if maintain_exports:
+        maintain_exports.cancel()
+    export_jobs.shutdown()
+
+app = FastAPI(title="Billing Backend", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -20,6 +94,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, "ETag"],
 )
 
 app.include_router(products_router)
@@ -28,7 +103,11 @@ app.include_router(customers_router)
 app.include_router(sales_router)
 app.include_router(pending_router)
 app.include_router(reports_router)
+app.include_router(exports_router)
+app.include_router(outbox_router)
 
 @app.get("/", include_in_schema=False)
 def root():
     return {"status": "running"}
+
+_import_done = time.perf_counter()
@@ -0,0 +1,78 @@
+from datetime import timedelta
+from typing import Dict, List, Optional
+
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import delete, func, select
+from sqlalchemy.orm import Session
+
+from . import handlers, models
+
+# Events the rollup handler has work in (the same test rebuild_daily_rollup uses)
+ROLLUP_WORK = models.OutboxEvent.payload.has_key("rollup")
+
+
+def emit(db: Session, event_type: str, **payload) -> None:
+    """Append an event to the outbox (no commit; it lands with the caller's write).
+
+    Nothing is written when no handler is enabled for event_type.
+    """
+    if handlers.is_enabled(event_type):
+        db.add(models.OutboxEvent(event_type=event_type, payload=jsonable_encoder(payload)))
+
+
+def _due():
+    Event = models.OutboxEvent
+    return (Event.processed_at.is_(None), Event.available_at <= func.now())
+
+
+def has_due_rollup(db: Session) -> bool:
+    """Whether any due event carries rollup work."""
+    return db.execute(select(select(models.OutboxEvent.id).where(*_due(), ROLLUP_WORK).exists())).scalar()
+
+
+def claim_batch(db: Session, limit: int, with_rollup: bool = True) -> List[models.OutboxEvent]:
+    """Lock up to limit due events, oldest first, skipping those other dispatchers hold.
+
+    with_rollup=False leaves events with rollup work for a batch that holds
+    the rollup lock (handlers.lock_for_batch).
+    """
+    Event = models.OutboxEvent
+    query = db.query(Event).filter(*_due())
+    if not with_rollup:
+        query = query.filter(~ROLLUP_WORK)
+    return (
+        query
+        .order_by(Event.available_at, Event.id)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+        .all()
+    )
+
+
+def purge_processed(db: Session, older_than: timedelta) -> int:
+    """Delete events handled more than older_than ago; returns the number deleted."""
+    Event = models.OutboxEvent
+    deleted = db.execute(
+        delete(Event).where(Event.processed_at < func.now() - older_than)
+    ).rowcount
+    db.commit()
+    return deleted
+
+
+def get_stats(db: Session) -> Dict[str, Optional[float]]:
+    """Backlog, lag and recent throughput, across every dispatcher."""
+    Event = models.OutboxEvent
+    waiting = Event.processed_at.is_(None)
+    row = db.execute(
+        select(
+            func.count().filter(waiting).label("pending"),
+            func.count().filter(waiting, Event.attempts > 0).label("retrying"),
+            func.extract("epoch", func.now() - func.min(Event.created_at).filter(waiting)).label("lag_seconds"),
+            func.count().filter(Event.processed_at >= func.now() - timedelta(minutes=1)).label("processed_last_minute"),
+            func.count().filter(Event.processed_at >= func.now() - timedelta(hours=1)).label("processed_last_hour"),
+        )
+    ).one()
+    stats = row._asdict()
+    if stats["lag_seconds"] is not None:
+        stats["lag_seconds"] = float(stats["lag_seconds"])
+    return stats
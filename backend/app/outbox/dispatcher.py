@@ -0,0 +1,132 @@
+"""Drains the outbox: claims due events in batches and runs their handlers.
+
+Any number of dispatchers can run at once (app workers with
+OUTBOX_DISPATCH_SECONDS > 0, or `python -m app.cli dispatch-outbox`):
+claim_batch skips rows another one has locked. A failing event is retried
+with exponential backoff without holding up the rest of its batch.
+"""
+import asyncio
+import logging
+import threading
+import time
+from datetime import timedelta
+from typing import Any, Dict
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import func, update
+from sqlalchemy.orm import Session
+
+from . import crud, handlers
+from .models import OutboxEvent
+from .. import versions
+from ..config import settings
+from ..database import SessionLocal
+from ..sales import crud as sale_crud  # noqa: F401  (registers the rollup handler)
+
+logger = logging.getLogger(__name__)
+
+MAX_BACKOFF_SECONDS = 3600
+PURGE_INTERVAL = 60.0  # seconds between purges of processed events
+
+_lock = threading.Lock()
+_started = time.monotonic()
+_processed = 0
+_failed = 0
+_last_purge = 0.0
+
+
+def dispatch_batch(db: Session, batch_size: int) -> int:
+    """Handle one batch of due events and commit; returns how many were claimed."""
+    with_rollup = crud.has_due_rollup(db)
+    if with_rollup:
+        handlers.lock_for_batch(db)
+    events = crud.claim_batch(db, batch_size, with_rollup)
+
+    done, failed = [], 0
+    for event in events:
+        try:
+            with db.begin_nested():
+                handlers.run(db, event)
+            done.append(event.id)
+        except Exception as e:
+            logger.exception("Outbox event %s (%s) failed", event.id, event.event_type)
+            failed += 1
+            event.attempts += 1
+            event.last_error = str(e)[:500]
+            event.available_at = func.now() + timedelta(seconds=min(2 ** event.attempts, MAX_BACKOFF_SECONDS))
+
+    # Read before commit expires the events: reports read the rollup, so
+    # their ETag (and cached results) must move once its rows land
+    rollup_applied = any(handlers.has_rollup(event) for event in events if event.id in done)
+    if done:
+        db.execute(
+            update(OutboxEvent)
+            .where(OutboxEvent.id.in_(done))
+            .values(processed_at=func.now())
+            .execution_options(synchronize_session=False)
+        )
+    db.commit()
+    if rollup_applied:
+        versions.bump(db, "sales")
+    _count(len(done), failed)
+    return len(events)
+
+
+def _count(processed: int, failed: int) -> None:
+    global _processed, _failed
+    with _lock:
+        _processed += processed
+        _failed += failed
+
+
+def dispatch_once() -> int:
+    """One batch in a fresh session, plus the periodic purge; returns events claimed."""
+    global _last_purge
+    db = SessionLocal()
+    try:
+        claimed = dispatch_batch(db, settings.OUTBOX_BATCH_SIZE)
+        if time.monotonic() - _last_purge >= PURGE_INTERVAL:
+            _last_purge = time.monotonic()
+            crud.purge_processed(db, timedelta(hours=settings.OUTBOX_RETENTION_HOURS))
+        return claimed
+    finally:
+        db.close()
+
+
+def run(interval: float, once: bool = False) -> None:
+    """Dispatch until interrupted (or until the outbox is drained, with once)."""
+    while True:
+        try:
+            claimed = dispatch_once()
+        except Exception:
+            if once:
+                raise
+            logger.exception("Outbox dispatch failed")
+            claimed = 0
+        if claimed < settings.OUTBOX_BATCH_SIZE:
+            if once:
+                return
+            time.sleep(interval)
+
+
+async def dispatch_periodically(interval: float) -> None:
+    """In-app dispatcher; run as a lifespan task. Full batches are followed right away."""
+    while True:
+        try:
+            claimed = await run_in_threadpool(dispatch_once)
+        except Exception:
+            logger.exception("Outbox dispatch failed")
+            claimed = 0
+        if claimed < settings.OUTBOX_BATCH_SIZE:
+            await asyncio.sleep(interval)
+
+
+def stats() -> Dict[str, Any]:
+    """Counters of the dispatcher in this process."""
+    with _lock:
+        elapsed = time.monotonic() - _started
+        return {
+            "processed": _processed,
+            "failed": _failed,
+            "events_per_second": _processed / elapsed if elapsed else 0.0,
+        }
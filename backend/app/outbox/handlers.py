@@ -0,0 +1,75 @@
+"""Outbox event types and the registry of handlers the dispatcher runs for them.
+
+Events appended by the write paths:
+
+    sale.created      sale_ids, rollup      (create_sale, create_sales_bulk)
+    sale.paid         sale_id, amount, rollup
+    sale.deleted      sale_id, invoice_number, rollup
+    customer.payment  customer_id, payment_id, amount
+    stock.adjusted    adjustments: [{stock_item_id, delta, quantity}]
+
+Handlers are registered with @handles next to the code they drive (the
+rollup one lives in sales.crud) and say when they are enabled. Events are
+opt-in: crud.emit writes nothing for an event type with no enabled
+handler, so with every handler off (the default, OUTBOX_ROLLUP=false) the
+outbox stays empty and the app starts no dispatcher. Events left queued
+from before are still handled by `python -m app.cli dispatch-outbox --once`.
+
+Handlers run inside the dispatcher's transaction, so database work they do
+commits together with the event being marked processed. Anything outside
+the database must tolerate being repeated: delivery is at least once.
+"""
+from collections import defaultdict
+from typing import Callable, Dict, List, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from .models import OutboxEvent
+
+Handler = Callable[[Session, OutboxEvent], None]
+
+HANDLERS: Dict[str, List[Tuple[Handler, Callable[[], bool]]]] = defaultdict(list)
+
+
+def handles(*event_types: str, enabled: Callable[[], bool] = lambda: True):
+    """Register the decorated function as a handler for event_types.
+
+    enabled says whether events should be written for it at all. Queued
+    events are handled either way, so turning a handler off loses nothing.
+    """
+    def register(handler: Handler) -> Handler:
+        for event_type in event_types:
+            HANDLERS[event_type].append((handler, enabled))
+        return handler
+    return register
+
+
+def is_enabled(event_type: str) -> bool:
+    """Whether any handler wants events of event_type written."""
+    return any(enabled() for _, enabled in HANDLERS.get(event_type, ()))
+
+
+def any_enabled() -> bool:
+    """Whether any event is written at all, i.e. a dispatcher has work."""
+    return any(is_enabled(event_type) for event_type in HANDLERS)
+
+
+def run(db: Session, event: OutboxEvent) -> None:
+    for handler, _ in HANDLERS.get(event.event_type, ()):
+        handler(db, event)
+
+
+def has_rollup(event: OutboxEvent) -> bool:
+    """Whether the event carries daily_sales_rollup rows (see crud.ROLLUP_WORK)."""
+    return "rollup" in event.payload
+
+
+def lock_for_batch(db: Session) -> None:
+    """Take the table lock rollup handlers need, before their events are claimed.
+
+    rebuild_daily_rollup locks the rollup table and then rewrites queued
+    events; taking the rollup lock first here too keeps the two from
+    deadlocking. Batches without rollup work skip it (crud.claim_batch).
+    """
+    db.execute(text("LOCK TABLE daily_sales_rollup IN ROW EXCLUSIVE MODE"))
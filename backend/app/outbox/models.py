@@ -0,0 +1,26 @@
+from sqlalchemy import Column, String, Integer, DateTime, Index, text
+from sqlalchemy.sql import func
+from sqlalchemy.dialects.postgresql import UUID, JSONB
+import uuid
+
+from ..database import Base
+
+
+class OutboxEvent(Base):
+    """A side effect of a committed write, waiting for the outbox dispatcher."""
+    __tablename__ = "outbox_events"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    event_type = Column(String(50), nullable=False)  # e.g. sale.created; see outbox.handlers
+    payload = Column(JSONB, nullable=False)
+    created_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    available_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())  # pushed back on failure
+    attempts = Column(Integer, nullable=False, default=0)
+    last_error = Column(String(500), nullable=True)
+    processed_at = Column(DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (
+        # Dispatch queue: only events still to be handled
+        Index("ix_outbox_events_pending", "available_at", "id", postgresql_where=text("processed_at IS NULL")),
+        Index("ix_outbox_events_processed_at", "processed_at"),
+    )
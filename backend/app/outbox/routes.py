@@ -0,0 +1,13 @@
+from fastapi import APIRouter, Depends
+from sqlalchemy.orm import Session
+
+from . import crud, dispatcher
+from ..utils import get_db
+
+router = APIRouter(prefix="/api/outbox", tags=["outbox"])
+
+
+@router.get("/stats")
+def outbox_stats(db: Session = Depends(get_db)):
+    """Outbox backlog and lag, plus this worker's dispatcher counters"""
+    return {**crud.get_stats(db), "dispatcher": dispatcher.stats()}
@@ -0,0 +1,54 @@
+"""Keyset (cursor) pagination shared by the list endpoints.
+
+Lists are ordered by (sort column, id) descending. A cursor is an opaque
+encoding of the last row's pair; the next page seeks strictly past it, so
+page N costs the same as page 1 and rows do not shift when new ones land.
+The next cursor is returned in the X-Next-Cursor header, so list bodies
+keep their shape; ``skip`` still works when no cursor is given.
+"""
+import base64
+import json
+from datetime import datetime
+from typing import Optional, Sequence
+from uuid import UUID
+
+from fastapi import Response
+from sqlalchemy import DateTime, tuple_
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(value, row_id) -> str:
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    raw = json.dumps([value, str(row_id)]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, sort_column):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        value, row_id = json.loads(raw)
+        if isinstance(sort_column.type, DateTime):
+            value = datetime.fromisoformat(value)
+        return value, UUID(row_id)
+    except (ValueError, TypeError) as e:
+        raise ValueError("Invalid cursor") from e
+
+
+def paginate(query, sort_column, id_column, skip: int = 0, limit: int = 100, cursor: Optional[str] = None):
+    """Order by (sort_column, id_column) DESC, then seek past cursor or apply skip."""
+    query = query.order_by(sort_column.desc(), id_column.desc())
+    if cursor:
+        value, row_id = decode_cursor(cursor, sort_column)
+        query = query.filter(tuple_(sort_column, id_column) < tuple_(value, row_id))
+    elif skip:
+        query = query.offset(skip)
+    return query.limit(limit)
+
+
+def set_next_cursor(response: Response, rows: Sequence, limit: int, sort_attr: str = "created_at", id_attr: str = "id"):
+    """Advertise the cursor for the following page when this one is full."""
+    if rows and len(rows) >= limit:
+        last = rows[-1]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(getattr(last, sort_attr), getattr(last, id_attr))
@@ -1,43 +1,89 @@
 from sqlalchemy.orm import Session
-from typing import List
-from sqlalchemy import func
+from datetime import timedelta
+from typing import List, Optional
+from sqlalchemy import case, func, select, true
 
+from ..pagination import paginate
 from ..customers import models as customer_models
+from ..customers import crud as customer_crud
 from ..sales import models as sale_models
 from . import schemas
 
-def get_pending_customers(db: Session, skip: int = 0, limit: int = 100) -> List[schemas.PendingOut]:
-    # Get wholesale customers with pending > 0
-    customers = (
-        db.query(customer_models.Customer)
-        .filter(
-            customer_models.Customer.type == "wholesale",
-            customer_models.Customer.pending > 0
+def _oldest_unpaid_charge(Customer, pending):
+    """Lateral: date of the customer's oldest charge the balance still covers."""
+    Sale = sale_models.Sale
+    amount = Sale.subtotal + Sale.gst
+    charges = (
+        select(
+            Sale.date.label("charged_at"),
+            amount.label("amount"),
+            # Charges newer than this one, which the balance covers first
+            func.coalesce(func.sum(amount).over(order_by=(Sale.date.desc(), Sale.id), rows=(None, -1)), 0).label("newer"),
         )
-        .order_by(customer_models.Customer.pending.desc())
-        .offset(skip)
-        .limit(limit)
-        .all()
+        .where(Sale.customer_id == Customer.id)
+        .correlate(Customer)
+        .subquery("charges")
     )
-    
-    pending_list = []
-    for customer in customers:
-        # Get last invoice for this customer
-        last_sale = (
-            db.query(sale_models.Sale)
-            .filter(sale_models.Sale.customer_id == customer.id)
-            .order_by(sale_models.Sale.created_at.desc())
-            .first()
+    return (
+        select(
+            case(
+                (func.coalesce(func.sum(charges.c.amount), 0) < pending, Customer.created_at),
+                else_=func.min(charges.c.charged_at).filter(charges.c.newer < pending),
+            ).label("charged_at")
         )
-        
-        pending_out = schemas.PendingOut(
-            customer_id=customer.id,
-            name=customer.name,
-            phone=customer.phone,
-            pending=customer.pending,
-            last_invoice=last_sale.invoice_number if last_sale else None,
-            due_since=last_sale.created_at if last_sale else None
+        .select_from(charges)
+        .lateral("oldest_unpaid")
+    )
+
+def get_pending_customers(
+    db: Session,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    min_pending: Optional[float] = None,
+    overdue_days: Optional[int] = None,
+) -> List[schemas.PendingOut]:
+    """Wholesale customers with pending > 0 and their last invoice, in one query.
+
+    overdue_days keeps customers whose oldest unpaid charge is at least that
+    old. As in the receivables aging report, the balance is matched against
+    the invoice charges (subtotal + gst) newest first, so payments settle
+    the oldest ones; a balance larger than every charge is dated at the
+    customer's creation.
+    """
+    Customer = customer_models.Customer
+    Sale = sale_models.Sale
+    pending = customer_crud.pending_balance(Customer)
+
+    # Last invoice per customer, one index probe each on (customer_id, created_at)
+    last_sale = (
+        select(Sale.invoice_number, Sale.created_at)
+        .where(Sale.customer_id == Customer.id)
+        .order_by(Sale.created_at.desc())
+        .limit(1)
+        .lateral("last_sale")
+    )
+
+    # Get wholesale customers with pending > 0
+    query = (
+        db.query(
+            Customer.id.label("customer_id"),
+            Customer.name,
+            Customer.phone,
+            pending.label("pending"),
+            last_sale.c.invoice_number.label("last_invoice"),
+            last_sale.c.created_at.label("due_since"),
         )
-        pending_list.append(pending_out)
-    
-    return pending_list
\ No newline at end of file
+        .outerjoin(last_sale, true())
+        .filter(Customer.type == "wholesale", pending > 0)
+    )
+    if min_pending is not None:
+        query = query.filter(pending >= min_pending)
+    if overdue_days is not None:
+        oldest_unpaid = _oldest_unpaid_charge(Customer, pending)
+        query = query.outerjoin(oldest_unpaid, true()).filter(
+            oldest_unpaid.c.charged_at <= func.now() - timedelta(days=overdue_days)
+        )
+
+    rows = paginate(query, pending, Customer.id, skip, limit, cursor).all()
+    return [schemas.PendingOut(**row._asdict()) for row in rows]
@@ -1,13 +1,29 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, Response
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 
 from . import schemas, crud
 from ..utils import get_db
+from ..pagination import set_next_cursor
 
 router = APIRouter(prefix="/api/pending", tags=["pending"])
 
 @router.get("/", response_model=List[schemas.PendingOut])
-def list_pending_customers(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+def list_pending_customers(
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    min_pending: Optional[float] = None,
+    overdue_days: Optional[int] = None,
+    db: Session = Depends(get_db),
+):
     """Get list of wholesale customers with pending payments"""
-    return crud.get_pending_customers(db, skip=skip, limit=limit)
\ No newline at end of file
+    try:
+        pending = crud.get_pending_customers(
+            db, skip=skip, limit=limit, cursor=cursor, min_pending=min_pending, overdue_days=overdue_days
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    set_next_cursor(response, pending, limit, sort_attr="pending", id_attr="customer_id")
+    return pending
\ No newline at end of file
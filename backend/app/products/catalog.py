@@ -0,0 +1,236 @@
+"""In-process product catalog for POS item lookup.
+
+Products are held by id, with a sorted (token, id) list over the words of
+their name and category, so a prefix search is a couple of bisects, and
+the ids of each category. The catalog is loaded at startup and patched by
+the product and sale write paths in this process after they commit. Every
+CATALOG_REFRESH_SECONDS it reads the products change feed (app/sync) from
+where it last stopped, to pick up writes made by other workers.
+"""
+import asyncio
+import bisect
+import heapq
+import logging
+import re
+import threading
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from uuid import UUID
+
+from fastapi.concurrency import run_in_threadpool
+
+from ..database import SessionLocal
+from ..sync import crud as sync_crud
+from .models import Product
+from .schemas import ProductOut
+
+logger = logging.getLogger(__name__)
+
+_TOKEN = re.compile(r"\w+")
+
+FEED_PAGE_SIZE = 1000
+
+_lock = threading.RLock()
+_load_lock = threading.Lock()  # one load or refresh at a time
+_by_id: Dict[UUID, ProductOut] = {}
+_tokens: List[Tuple[str, UUID]] = []  # sorted (token, product id)
+_by_category: Dict[str, Set[UUID]] = {}  # lower-cased category -> product ids
+_loaded = False
+_since: Optional[str] = None  # change feed token the next refresh reads from
+# While a load or refresh is reading the table, changes applied meanwhile
+# are kept here and replayed on top of what it read.
+_changes_during_load: Optional[list] = None
+
+
+def _tokenize(text: str) -> Set[str]:
+    return set(_TOKEN.findall(text.lower()))
+
+
+def _product_tokens(product: ProductOut) -> Set[str]:
+    return _tokenize(product.name) | _tokenize(product.category)
+
+
+def _add(product: ProductOut) -> None:
+    _by_id[product.id] = product
+    _by_category.setdefault(product.category.lower(), set()).add(product.id)
+    for token in _product_tokens(product):
+        bisect.insort(_tokens, (token, product.id))
+
+
+def _discard(product_id: UUID) -> None:
+    product = _by_id.pop(product_id, None)
+    if product is None:
+        return
+    category = product.category.lower()
+    _by_category[category].discard(product_id)
+    if not _by_category[category]:
+        del _by_category[category]
+    for token in _product_tokens(product):
+        index = bisect.bisect_left(_tokens, (token, product_id))
+        if index < len(_tokens) and _tokens[index] == (token, product_id):
+            del _tokens[index]
+
+
+def _apply(change: tuple) -> None:
+    kind, value = change
+    if kind == "upsert":
+        _discard(value.id)
+        _add(value)
+    elif kind == "remove":
+        _discard(value)
+    elif kind == "stock":
+        for product_id, stock in value.items():
+            product = _by_id.get(product_id)
+            if product is not None:
+                _by_id[product_id] = product.model_copy(update={"stock": stock})
+
+
+def _record(change: tuple) -> None:
+    with _lock:
+        if _changes_during_load is not None:
+            _changes_during_load.append(change)
+        if _loaded:
+            _apply(change)
+
+
+# ---------------------------------------------------
+# LOADING
+# ---------------------------------------------------
+def _load() -> int:
+    global _by_id, _tokens, _by_category, _loaded, _since, _changes_during_load
+    with _lock:
+        _changes_during_load = []
+    try:
+        db = SessionLocal()
+        try:
+            since = sync_crud.start_token(db)
+            products = [ProductOut.model_validate(product) for product in db.query(Product)]
+        finally:
+            db.close()
+
+        by_id = {product.id: product for product in products}
+        tokens = sorted((token, product.id) for product in products for token in _product_tokens(product))
+        by_category: Dict[str, Set[UUID]] = {}
+        for product in products:
+            by_category.setdefault(product.category.lower(), set()).add(product.id)
+        with _lock:
+            _by_id, _tokens, _by_category, _loaded, _since = by_id, tokens, by_category, True, since
+            for change in _changes_during_load:
+                _apply(change)
+            return len(_by_id)
+    finally:
+        with _lock:
+            _changes_during_load = None
+
+
+def load() -> int:
+    """(Re)build the catalog from the products table; returns the product count."""
+    with _load_lock:
+        return _load()
+
+
+def ensure_loaded() -> None:
+    if not _loaded:
+        with _load_lock:
+            if not _loaded:
+                _load()
+
+
+def refresh() -> int:
+    """Apply products written or deleted since the last load or refresh; returns how many."""
+    global _since, _changes_during_load
+    with _load_lock:
+        if not _loaded:
+            _load()
+            return 0
+        with _lock:
+            _changes_during_load = []
+        try:
+            changes = []
+            since = _since
+            db = SessionLocal()
+            try:
+                has_more = True
+                while has_more:
+                    rows, deleted, since, has_more = sync_crud.get_changes(db, Product, since, FEED_PAGE_SIZE)
+                    changes += [("upsert", ProductOut.model_validate(row)) for row in rows]
+                    changes += [("remove", product_id) for product_id in deleted]
+            finally:
+                db.close()
+            with _lock:
+                for change in changes + _changes_during_load:
+                    _apply(change)
+                _since = since
+            return len(changes)
+        finally:
+            with _lock:
+                _changes_during_load = None
+
+
+async def refresh_periodically(interval: int) -> None:
+    """Refresh the catalog every `interval` seconds; run as a lifespan task."""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await run_in_threadpool(refresh)
+        except Exception:
+            logger.exception("Product catalog refresh failed")
+
+
+# ---------------------------------------------------
+# WRITE HOOKS (call after commit)
+# ---------------------------------------------------
+def upsert(product: Product) -> None:
+    _record(("upsert", ProductOut.model_validate(product)))
+
+
+def remove(product_id: UUID) -> None:
+    _record(("remove", product_id))
+
+
+def set_stock(stock: Dict[UUID, int]) -> None:
+    """Record stock levels returned by a committed write (absolute, so replays are safe)."""
+    if stock:
+        _record(("stock", dict(stock)))
+
+
+# ---------------------------------------------------
+# LOOKUPS
+# ---------------------------------------------------
+def get(product_id: UUID) -> Optional[ProductOut]:
+    ensure_loaded()
+    return _by_id.get(product_id)
+
+
+def _prefix_matches(prefix: str) -> Set[UUID]:
+    matches = set()
+    index = bisect.bisect_left(_tokens, (prefix,))
+    while index < len(_tokens) and _tokens[index][0].startswith(prefix):
+        matches.add(_tokens[index][1])
+        index += 1
+    return matches
+
+
+def search(q: str = "", category: Optional[str] = None, limit: int = 20) -> List[ProductOut]:
+    """Products whose name/category words start with every word of q.
+
+    Names starting with q come first, then alphabetical order.
+    """
+    ensure_loaded()
+    words = sorted(_tokenize(q), key=len, reverse=True)  # longest prefix narrows most
+    with _lock:
+        ids: Optional[Set[UUID]] = None
+        if category:
+            ids = _by_category.get(category.lower(), set())
+        for word in words:
+            matches = _prefix_matches(word)
+            ids = matches if ids is None else ids & matches
+            if not ids:
+                return []
+        candidates: Iterable[ProductOut] = (
+            _by_id.values() if ids is None else (_by_id[product_id] for product_id in ids)
+        )
+
+        needle = q.strip().lower()
+        return heapq.nsmallest(
+            limit, candidates, key=lambda product: (not product.name.lower().startswith(needle), product.name.lower())
+        )
@@ -3,25 +3,27 @@ from typing import List, Optional
 from uuid import UUID
 
 from .models import Product
-from . import schemas
+from . import catalog, schemas
+from ..pagination import paginate
+from .. import versions
+from ..sync import crud as sync_crud
 
 def get_product(db: Session, product_id: UUID) -> Optional[Product]:
     return db.query(Product).filter(Product.id == product_id).first()
 
-def get_products(db: Session, skip: int = 0, limit: int = 100) -> List[Product]:
-    return (
-        db.query(Product)
-        .order_by(Product.created_at.desc())
-        .offset(skip)
-        .limit(limit)
-        .all()
-    )
+def get_products(db: Session, skip: int = 0, limit: int = 100, cursor: Optional[str] = None) -> List[Product]:
+    return paginate(db.query(Product), Product.created_at, Product.id, skip, limit, cursor).all()
+
+def get_product_changes(db: Session, since: Optional[str] = None, limit: int = 500):
+    return sync_crud.get_changes(db, Product, since, limit)
 
 def create_product(db: Session, product_in: schemas.ProductCreate) -> Product:
     db_obj = Product(**product_in.dict())
     db.add(db_obj)
     db.commit()
+    versions.bump(db, "products")
     db.refresh(db_obj)
+    catalog.upsert(db_obj)
     return db_obj
 
 def update_product(db: Session, db_obj: Product, product_in: schemas.ProductUpdate):
@@ -29,9 +31,15 @@ def update_product(db: Session, db_obj: Product, product_in: schemas.ProductUpda
     for field, value in data.items():
         setattr(db_obj, field, value)
     db.commit()
+    versions.bump(db, "products")
     db.refresh(db_obj)
+    catalog.upsert(db_obj)
     return db_obj
 
 def delete_product(db: Session, db_obj: Product):
+    product_id = db_obj.id
     db.delete(db_obj)
+    sync_crud.record_deletion(db, Product, product_id)
     db.commit()
+    versions.bump(db, "products")
+    catalog.remove(product_id)
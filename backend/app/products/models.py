@@ -1,8 +1,9 @@
-from sqlalchemy import Column, String, Integer, Float, DateTime, Boolean
+from sqlalchemy import Column, String, Integer, Float, DateTime, Boolean, Index, BigInteger
 from sqlalchemy.sql import func
 from sqlalchemy.dialects.postgresql import UUID
 import uuid
 from app.database import Base
+from app.sync.models import CURRENT_XID_DEFAULT, current_xid
 
 class Product(Base):
     __tablename__ = "products"
@@ -15,3 +16,10 @@ class Product(Base):
     is_wholesale_only = Column(Boolean, default=False)    # ✅ new column
     stock = Column(Integer, nullable=False, default=0)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    change_xid = Column(BigInteger, nullable=False, server_default=CURRENT_XID_DEFAULT, onupdate=current_xid)
+
+    __table_args__ = (
+        Index("ix_products_created_at_id", "created_at", "id"),
+        Index("ix_products_change_xid_id", "change_xid", "id"),  # /changes feed
+    )
@@ -1,15 +1,17 @@
 # app/products/routes.py
 
-import csv
-from io import StringIO
 from uuid import UUID
-from typing import List
+from typing import List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, Response
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from sqlalchemy.orm import Session
 
 from app.utils import get_db
-from . import crud, schemas
+from app.pagination import set_next_cursor
+from app import versions
+from app.exports.streaming import csv_response
+from app.sync.schemas import ChangesOut
+from . import catalog, crud, schemas
 
 router = APIRouter(prefix="/api/products", tags=["Products"])
 
@@ -17,41 +19,49 @@ router = APIRouter(prefix="/api/products", tags=["Products"])
 # EXPORT CSV
 # ---------------------------------------------------
 @router.get("/export")
-def export_products_csv(db: Session = Depends(get_db)):
-    products = crud.get_products(db, skip=0, limit=100000)
-
-    # Create CSV
-    output = StringIO()
-    writer = csv.writer(output)
-
-    writer.writerow(["id", "name", "category", "retail_price", "wholesale_price", "is_wholesale_only", "stock", "created_at"])
-
-    for p in products:
-        writer.writerow([
-            str(p.id),
-            p.name,
-            p.category,
-            p.retail_price,
-            p.wholesale_price,
-            p.is_wholesale_only,
-            p.stock,
-            p.created_at.isoformat() if p.created_at else "",
-        ])
-
-    output.seek(0)
-
-    return Response(
-        content=output.getvalue(),
-        media_type="text/csv",
-        headers={"Content-Disposition": "attachment; filename=products_export.csv"},
-    )
+def export_products_csv(request: Request, start_date: Optional[str] = None, end_date: Optional[str] = None):
+    return csv_response(request, "products", start_date, end_date)
 
 # ---------------------------------------------------
 # GET ALL
 # ---------------------------------------------------
 @router.get("/", response_model=List[schemas.ProductOut])
-def list_products(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    return crud.get_products(db, skip=skip, limit=limit)
+def list_products(
+    request: Request,
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db),
+):
+    unchanged = versions.not_modified(request, response, db, "products")
+    if unchanged:
+        return unchanged
+    try:
+        products = crud.get_products(db, skip=skip, limit=limit, cursor=cursor)
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+    set_next_cursor(response, products, limit)
+    return products
+
+# ---------------------------------------------------
+# SEARCH (in-memory catalog, no database round trip)
+# ---------------------------------------------------
+@router.get("/search", response_model=List[schemas.ProductOut])
+def search_products(q: str = "", category: Optional[str] = None, limit: int = 20):
+    return catalog.search(q, category, min(limit, 200))
+
+# ---------------------------------------------------
+# CHANGES (delta sync)
+# ---------------------------------------------------
+@router.get("/changes", response_model=ChangesOut[schemas.ProductOut])
+def product_changes(since: Optional[str] = None, limit: int = 500, db: Session = Depends(get_db)):
+    """Rows inserted, updated or deleted since the sync token (all rows without one)"""
+    try:
+        updated, deleted, next_token, has_more = crud.get_product_changes(db, since, min(limit, 5000))
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+    return ChangesOut(updated=updated, deleted=deleted, next_token=next_token, has_more=has_more)
 
 # ---------------------------------------------------
 # GET ONE
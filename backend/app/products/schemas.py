@@ -31,3 +31,4 @@ class ProductUpdate(BaseModel):
 class ProductOut(ProductBase):
     id: UUID
     created_at: datetime
+    updated_at: Optional[datetime] = None
@@ -0,0 +1,69 @@
+"""In-process cache for report results.
+
+Entries are keyed by (endpoint, params...) and tagged with the version of
+the data they were computed from: the report routes pass the ETag they
+just set, built from the shared table versions (app.versions). Writes
+advance those versions after they commit, in whichever worker they land,
+so an entry is only ever served under the ETag it was computed for and
+repeated dashboard loads come from memory until the data changes.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable
+
+from ..config import settings
+
+_lock = threading.Lock()
+_entries: "OrderedDict[Hashable, tuple]" = OrderedDict()  # key -> (version, expires_at, value)
+_hits = 0
+_misses = 0
+
+
+def get_or_compute(key: Hashable, version: Hashable, compute: Callable[[], Any]) -> Any:
+    """Return the value cached for key at version, or compute, store and return it.
+
+    version must be read before compute runs, so a write that lands in
+    between can only make the entry newer than its tag, never older.
+    """
+    global _hits, _misses
+    if settings.REPORT_CACHE_SIZE <= 0 or settings.REPORT_CACHE_TTL <= 0:
+        return compute()
+
+    now = time.monotonic()
+    with _lock:
+        entry = _entries.get(key)
+        if entry and entry[0] == version and entry[1] > now:
+            _entries.move_to_end(key)
+            _hits += 1
+            return entry[2]
+        _misses += 1
+
+    value = compute()  # outside the lock
+
+    with _lock:
+        _entries[key] = (version, now + settings.REPORT_CACHE_TTL, value)
+        _entries.move_to_end(key)
+        while len(_entries) > settings.REPORT_CACHE_SIZE:
+            _entries.popitem(last=False)
+    return value
+
+
+def clear() -> None:
+    global _hits, _misses
+    with _lock:
+        _entries.clear()
+        _hits = _misses = 0
+
+
+def stats() -> Dict[str, Any]:
+    with _lock:
+        lookups = _hits + _misses
+        return {
+            "hits": _hits,
+            "misses": _misses,
+            "hit_rate": _hits / lookups if lookups else 0.0,
+            "size": len(_entries),
+            "max_size": settings.REPORT_CACHE_SIZE,
+            "ttl_seconds": settings.REPORT_CACHE_TTL,
+        }
@@ -1,90 +1,201 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from sqlalchemy.orm import Session
 from typing import Optional
+from datetime import date
 
-from . import services
+from . import cache, services
 from ..utils import get_db
+from .. import versions
 
 router = APIRouter(prefix="/api/reports", tags=["reports"])
 
+# Every report reads some of these; their versions make up the ETag, which
+# also tags the cached result
+REPORT_TABLES = ("sales", "customers", "products")
+
 # Legacy endpoints (kept for compatibility)
 @router.get("/summary")
 def get_summary(
+    request: Request,
+    response: Response,
     start_date: Optional[str] = None,
     end_date: Optional[str] = None,
+    approximate: bool = False,
     db: Session = Depends(get_db)
 ):
-    """Get summary statistics for date range"""
-    return services.get_summary_stats(db, start_date, end_date)
+    """Get summary statistics for date range (approximate=true estimates row counts)"""
+    unchanged = versions.not_modified(request, response, db, *REPORT_TABLES)
+    if unchanged:
+        return unchanged
+    return cache.get_or_compute(
+        ("get_summary_stats", start_date, end_date, approximate),
+        response.headers["ETag"],
+        lambda: services.get_summary_stats(db, start_date, end_date, approximate),
+    )
 
 
 @router.get("/daily")
 def get_daily_summary_legacy(
+    request: Request,
+    response: Response,
     start_date: Optional[str] = None,
     end_date: Optional[str] = None,
     db: Session = Depends(get_db)
 ):
     """Get daily summary for date range (legacy)"""
-    return services.get_daily_summary(db, start_date, end_date)
+    unchanged = versions.not_modified(request, response, db, *REPORT_TABLES)
+    if unchanged:
+        return unchanged
+    return cache.get_or_compute(
+        ("get_daily_summary", start_date, end_date),
+        response.headers["ETag"],
+        lambda: services.get_daily_summary(db, start_date, end_date),
+    )
 
 
 @router.get("/sales")
 def get_sales_report(
+    request: Request,
+    response: Response,
     start_date: Optional[str] = None,
     end_date: Optional[str] = None,
     db: Session = Depends(get_db)
 ):
     """Get sales totals for date range"""
-    return {
-        'total_revenue': services.get_total_revenue(db, start_date, end_date),
-        'total_collected': services.get_total_collected(db, start_date, end_date),
-        'total_pending': services.get_total_pending(db, start_date, end_date)
-    }
+    unchanged = versions.not_modified(request, response, db, *REPORT_TABLES)
+    if unchanged:
+        return unchanged
+    return cache.get_or_compute(
+        ("get_revenue_report", start_date, end_date),
+        response.headers["ETag"],
+        lambda: services.get_revenue_report(db, start_date, end_date),
+    )
 
 
 @router.get("/products")
 def get_product_performance_legacy(
+    request: Request,
+    response: Response,
     start_date: Optional[str] = None,
     end_date: Optional[str] = None,
+    limit: Optional[int] = None,
+    order_by: str = "revenue",
+    category: Optional[str] = None,
     db: Session = Depends(get_db)
 ):
     """Get product performance report for date range (legacy)"""
-    return services.get_product_performance(db, start_date, end_date)
+    unchanged = versions.not_modified(request, response, db, *REPORT_TABLES)
+    if unchanged:
+        return unchanged
+    try:
+        return cache.get_or_compute(
+            ("get_product_performance", start_date, end_date, limit, order_by, category),
+            response.headers["ETag"],
+            lambda: services.get_product_performance(db, start_date, end_date, limit, order_by, category),
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 
 # New endpoints per frontend expectations
 @router.get("/daily-summary")
 def get_daily_summary(
+    request: Request,
+    response: Response,
     start_date: Optional[str] = None,
     end_date: Optional[str] = None,
     db: Session = Depends(get_db)
 ):
     """Get daily summary for date range"""
-    return services.get_daily_summary(db, start_date, end_date)
+    unchanged = versions.not_modified(request, response, db, *REPORT_TABLES)
+    if unchanged:
+        return unchanged
+    return cache.get_or_compute(
+        ("get_daily_summary", start_date, end_date),
+        response.headers["ETag"],
+        lambda: services.get_daily_summary(db, start_date, end_date),
+    )
 
 
 @router.get("/product-performance")
 def product_performance(
+    request: Request,
+    response: Response,
     start_date: Optional[str] = None,
     end_date: Optional[str] = None,
+    limit: Optional[int] = None,
+    order_by: str = "revenue",
+    category: Optional[str] = None,
     db: Session = Depends(get_db)
 ):
-    return services.get_product_performance(db, start_date, end_date)
+    unchanged = versions.not_modified(request, response, db, *REPORT_TABLES)
+    if unchanged:
+        return unchanged
+    try:
+        return cache.get_or_compute(
+            ("get_product_performance", start_date, end_date, limit, order_by, category),
+            response.headers["ETag"],
+            lambda: services.get_product_performance(db, start_date, end_date, limit, order_by, category),
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 
 @router.get("/revenue")
 def revenue_report(
+    request: Request,
+    response: Response,
     start_date: Optional[str] = None,
     end_date: Optional[str] = None,
     db: Session = Depends(get_db)
 ):
-    return services.get_revenue_report(db, start_date, end_date)
+    unchanged = versions.not_modified(request, response, db, *REPORT_TABLES)
+    if unchanged:
+        return unchanged
+    return cache.get_or_compute(
+        ("get_revenue_report", start_date, end_date),
+        response.headers["ETag"],
+        lambda: services.get_revenue_report(db, start_date, end_date),
+    )
 
 
 @router.get("/customer-performance")
 def customer_performance(
+    request: Request,
+    response: Response,
     start_date: Optional[str] = None,
     end_date: Optional[str] = None,
     db: Session = Depends(get_db)
 ):
-    return services.get_customer_performance(db, start_date, end_date)
\ No newline at end of file
+    unchanged = versions.not_modified(request, response, db, *REPORT_TABLES)
+    if unchanged:
+        return unchanged
+    return cache.get_or_compute(
+        ("get_customer_performance", start_date, end_date),
+        response.headers["ETag"],
+        lambda: services.get_customer_performance(db, start_date, end_date),
+    )
+
+
+@router.get("/receivables-aging")
+def receivables_aging(
+    request: Request,
+    response: Response,
+    limit: Optional[int] = None,
+    db: Session = Depends(get_db)
+):
+    """Outstanding balances per customer, bucketed by invoice age"""
+    unchanged = versions.not_modified(request, response, db, *REPORT_TABLES, extra=date.today().isoformat())
+    if unchanged:
+        return unchanged
+    return cache.get_or_compute(
+        ("get_receivables_aging", limit),
+        response.headers["ETag"],
+        lambda: services.get_receivables_aging(db, limit),
+    )
+
+
+@router.get("/cache-stats")
+def cache_stats():
+    """Report cache hit/miss counters"""
+    return cache.stats()
@@ -1,65 +1,127 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import func
-from typing import Dict, List, Optional
+from sqlalchemy import BigInteger, and_, case, cast, column, func, literal, select, table, tuple_, union_all
+from sqlalchemy.dialects.postgresql import REGCLASS
+from typing import Dict, List, Optional, Tuple
+from datetime import date
 
 from ..sales import models as sale_models
 from ..customers import models as customer_models
 from ..products import models as product_models
+from ..customers import crud as customer_crud
+
+pg_class = table("pg_class", column("oid"), column("reltuples"))
+
+def _rollup_days(start_date: Optional[str], end_date: Optional[str]) -> Optional[Tuple[Optional[date], Optional[date]]]:
+    """Map a report range onto daily_sales_rollup days, or None if it needs sales.
+
+    Bare dates compare against the timestamptz as midnight, so start_date
+    keeps its whole day and end_date keeps none of its own. Ranges with a
+    time of day fall back to scanning sales.
+    """
+    try:
+        return (
+            date.fromisoformat(start_date) if start_date else None,
+            date.fromisoformat(end_date) if end_date else None,
+        )
+    except ValueError:
+        return None
 
-def get_total_revenue(db: Session, start_date: Optional[str] = None, end_date: Optional[str] = None) -> float:
-    """Get total revenue for date range"""
-    query = db.query(func.sum(sale_models.Sale.total))
 
+def _sales_range(start_date: Optional[str], end_date: Optional[str], column=None) -> list:
+    # Plain comparisons on the partition key, so partitioned sales are pruned
+    column = sale_models.Sale.date if column is None else column
+    conditions = []
     if start_date:
-        query = query.filter(sale_models.Sale.date >= start_date)
+        conditions.append(column >= start_date)
     if end_date:
-        query = query.filter(sale_models.Sale.date <= end_date)
+        conditions.append(column <= end_date)
+    return conditions
 
-    result = query.scalar()
-    return result or 0
 
+def _rollup_range(start_day: Optional[date], end_day: Optional[date]) -> list:
+    conditions = []
+    if start_day:
+        conditions.append(sale_models.DailySalesRollup.day >= start_day)
+    if end_day:
+        conditions.append(sale_models.DailySalesRollup.day < end_day)
+    return conditions
 
-def get_total_collected(db: Session, start_date: Optional[str] = None, end_date: Optional[str] = None) -> float:
-    """Get total collected amount for date range"""
-    query = db.query(func.sum(sale_models.Sale.paid))
 
-    if start_date:
-        query = query.filter(sale_models.Sale.date >= start_date)
-    if end_date:
-        query = query.filter(sale_models.Sale.date <= end_date)
+def _totals_source(start_date: Optional[str], end_date: Optional[str]):
+    """(model, range conditions, invoice count) for the table that can answer the range."""
+    days = _rollup_days(start_date, end_date)
+    if days is None:
+        return sale_models.Sale, _sales_range(start_date, end_date), func.count()
+    rollup = sale_models.DailySalesRollup
+    return rollup, _rollup_range(*days), func.sum(rollup.invoices)
 
-    result = query.scalar()
-    return result or 0
 
+def _sale_totals(db: Session, start_date: Optional[str], end_date: Optional[str]) -> Dict:
+    source, conditions, _ = _totals_source(start_date, end_date)
+    row = db.query(
+        func.sum(source.total).label('total_revenue'),
+        func.sum(source.paid).label('total_collected'),
+        func.sum(source.pending).label('total_pending'),
+    ).filter(*conditions).one()
+    return {key: value or 0 for key, value in row._asdict().items()}
 
-def get_total_pending(db: Session, start_date: Optional[str] = None, end_date: Optional[str] = None) -> float:
-    """Get total pending amount for date range"""
-    query = db.query(func.sum(sale_models.Sale.pending))
 
-    if start_date:
-        query = query.filter(sale_models.Sale.date >= start_date)
-    if end_date:
-        query = query.filter(sale_models.Sale.date <= end_date)
+def _sum_sales(db: Session, column: str, start_date: Optional[str], end_date: Optional[str]) -> float:
+    source, conditions, _ = _totals_source(start_date, end_date)
+    return db.query(func.sum(getattr(source, column))).filter(*conditions).scalar() or 0
+
+
+def _row_count(model, approximate: bool = False):
+    """Scalar subquery counting model's rows, or the planner's estimate when approximate."""
+    exact = select(func.count()).select_from(model).scalar_subquery()
+    if not approximate:
+        return exact
+    # reltuples is -1 until the table has been vacuumed or analyzed
+    estimate = (
+        select(cast(pg_class.c.reltuples, BigInteger))
+        .where(pg_class.c.oid == cast(model.__tablename__, REGCLASS))
+        .scalar_subquery()
+    )
+    return case((estimate >= 0, estimate), else_=exact)
+
+
+def get_total_revenue(db: Session, start_date: Optional[str] = None, end_date: Optional[str] = None) -> float:
+    """Get total revenue for date range"""
+    return _sum_sales(db, "total", start_date, end_date)
+
+
+def get_total_collected(db: Session, start_date: Optional[str] = None, end_date: Optional[str] = None) -> float:
+    """Get total collected amount for date range"""
+    return _sum_sales(db, "paid", start_date, end_date)
 
-    result = query.scalar()
-    return result or 0
+
+def get_total_pending(db: Session, start_date: Optional[str] = None, end_date: Optional[str] = None) -> float:
+    """Get total pending amount for date range"""
+    return _sum_sales(db, "pending", start_date, end_date)
 
 
 def get_daily_summary(db: Session, start_date: Optional[str] = None, end_date: Optional[str] = None) -> List[Dict]:
     """Get daily summary grouped by date"""
-    query = db.query(
-        func.date(sale_models.Sale.date).label('date'),
-        func.count(sale_models.Sale.id).label('invoices'),
-        func.sum(sale_models.Sale.total).label('total_sales'),
-        func.sum(sale_models.Sale.paid).label('total_collected')
-    ).group_by(func.date(sale_models.Sale.date))
+    days = _rollup_days(start_date, end_date)
+    if days is None:
+        day = func.date(sale_models.Sale.date)
+        query = db.query(
+            day.label('date'),
+            func.count(sale_models.Sale.id).label('invoices'),
+            func.sum(sale_models.Sale.total).label('total_sales'),
+            func.sum(sale_models.Sale.paid).label('total_collected')
+        ).filter(*_sales_range(start_date, end_date)).group_by(day)
+    else:
+        Rollup = sale_models.DailySalesRollup
+        day = Rollup.day
+        query = db.query(
+            day.label('date'),
+            func.sum(Rollup.invoices).label('invoices'),
+            func.sum(Rollup.total).label('total_sales'),
+            func.sum(Rollup.paid).label('total_collected')
+        ).filter(*_rollup_range(*days)).group_by(day).having(func.sum(Rollup.invoices) > 0)
 
-    if start_date:
-        query = query.filter(sale_models.Sale.date >= start_date)
-    if end_date:
-        query = query.filter(sale_models.Sale.date <= end_date)
-
-    results = query.order_by(func.date(sale_models.Sale.date).desc()).all()
+    results = query.order_by(day.desc()).all()
 
     return [
         {
@@ -72,28 +134,68 @@ def get_daily_summary(db: Session, start_date: Optional[str] = None, end_date: O
     ]
 
 
-def get_product_performance(db: Session, start_date: Optional[str] = None, end_date: Optional[str] = None) -> List[Dict]:
-    """Get product performance data"""
-    query = db.query(
-        sale_models.SaleItem.product_name,
-        func.sum(sale_models.SaleItem.quantity).label('total_quantity'),
-        func.sum(sale_models.SaleItem.line_total).label('total_revenue')
-    ).join(sale_models.Sale)
+PRODUCT_ORDERINGS = ("revenue", "quantity")
 
-    if start_date:
-        query = query.filter(sale_models.Sale.date >= start_date)
-    if end_date:
-        query = query.filter(sale_models.Sale.date <= end_date)
 
-    results = query.group_by(sale_models.SaleItem.product_name).all()
+def get_product_performance(
+    db: Session,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    limit: Optional[int] = None,
+    order_by: str = "revenue",
+    category: Optional[str] = None,
+) -> List[Dict]:
+    """Get product performance data, best sellers first.
+
+    Items are grouped by product_id, so renames do not split a product; items
+    sold without one are grouped by name. Ranking and limit run in SQL. The
+    range is applied to the items' own sale_date, so sales is not joined.
+    """
+    if order_by not in PRODUCT_ORDERINGS:
+        raise ValueError(f"order_by must be one of: {', '.join(PRODUCT_ORDERINGS)}")
+
+    Item = sale_models.SaleItem
+    Product = product_models.Product
+    adhoc_name = case((Item.product_id.is_(None), Item.product_name))
+
+    grouped = (
+        select(
+            Item.product_id,
+            func.max(Item.product_name).label('item_name'),
+            func.sum(Item.quantity).label('total_quantity'),
+            func.sum(Item.line_total).label('total_revenue'),
+        )
+        .where(*_sales_range(start_date, end_date, Item.sale_date))
+        .group_by(Item.product_id, adhoc_name)
+    )
+    if category:
+        grouped = grouped.where(Item.product_id.in_(select(Product.id).where(Product.category == category)))
+    grouped = grouped.subquery()
+
+    rank = grouped.c.total_revenue if order_by == "revenue" else grouped.c.total_quantity
+    query = (
+        db.query(
+            grouped.c.product_id,
+            func.coalesce(Product.name, grouped.c.item_name).label('product_name'),
+            Product.category,
+            grouped.c.total_quantity,
+            grouped.c.total_revenue,
+        )
+        .outerjoin(Product, Product.id == grouped.c.product_id)
+        .order_by(rank.desc().nullslast(), grouped.c.product_id, grouped.c.item_name)
+    )
+    if limit:
+        query = query.limit(limit)
 
     return [
         {
+            'product_id': str(row.product_id) if row.product_id else None,
             'product_name': row.product_name,
+            'category': row.category,
             'total_quantity': row.total_quantity,
             'total_revenue': row.total_revenue or 0
         }
-        for row in results
+        for row in query.all()
     ]
 
 
@@ -126,22 +228,125 @@ def get_customer_performance(db: Session, start_date: Optional[str] = None, end_
     ]
 
 
-def get_summary_stats(db: Session, start_date: Optional[str] = None, end_date: Optional[str] = None) -> Dict:
-    """Get comprehensive summary statistics"""
+AGING_BUCKETS = (("days_0_30", 0, 30), ("days_31_60", 31, 60), ("days_61_90", 61, 90), ("days_90_plus", 91, None))
+
+
+def get_receivables_aging(db: Session, limit: Optional[int] = None) -> Dict:
+    """Age each customer's outstanding balance into 0-30/31-60/61-90/90+ day buckets.
+
+    sales.pending cannot be summed: every sale carries the customer's earlier
+    balance forward, and customer payments do not touch it. Instead the
+    balance in customers.pending is matched against the customer's invoice
+    charges (subtotal + gst) newest first, so payments settle the oldest
+    invoices; anything left over is dated at the customer's creation.
+    One windowed pass over the open customers' sales, totals included.
+    """
+    Customer = customer_models.Customer
+    Sale = sale_models.Sale
+    pending = customer_crud.pending_balance(Customer)
+
+    open_customers = select(Customer.id, Customer.name, pending.label("pending"), Customer.created_at).where(
+        pending > 0
+    ).cte("open_customers")
+
+    charges = union_all(
+        select(
+            open_customers.c.id.label("customer_id"),
+            Sale.date.label("charged_at"),
+            (Sale.subtotal + Sale.gst).label("amount"),
+            literal(0).label("opening"),
+        ).join(Sale, Sale.customer_id == open_customers.c.id),
+        # Opening row: sorts after every invoice and can absorb the whole balance
+        select(
+            open_customers.c.id,
+            open_customers.c.created_at,
+            open_customers.c.pending,
+            literal(1),
+        ),
+    ).subquery("charges")
+
+    newer = func.coalesce(
+        func.sum(charges.c.amount).over(
+            partition_by=charges.c.customer_id,
+            order_by=(charges.c.opening, charges.c.charged_at.desc()),
+            rows=(None, -1),
+        ),
+        0,
+    )
+    allocated = (
+        select(
+            charges.c.customer_id,
+            func.current_date() - func.date(charges.c.charged_at),
+            newer,
+            charges.c.amount,
+        )
+        .subquery("allocated")
+    )
+    customer_id, age, newer, amount = allocated.c
+    balance = open_customers.c.pending
+    owed = func.greatest(0, func.least(amount, balance - newer))
+
+    def bucket(low, high):
+        in_bucket = age >= low if high is None else age.between(low, high)
+        return func.coalesce(func.sum(owed).filter(in_bucket), 0)
+
+    query = (
+        db.query(
+            open_customers.c.id.label("customer_id"),
+            func.max(open_customers.c.name).label("customer_name"),
+            *(bucket(low, high).label(name) for name, low, high in AGING_BUCKETS),
+            func.sum(owed).label("total"),
+            func.current_date().label("as_of"),
+        )
+        .join(allocated, allocated.c.customer_id == open_customers.c.id)
+        .group_by(func.grouping_sets(open_customers.c.id, tuple_()))
+        # The grand-total row (customer_id NULL) first, then largest debtors
+        .order_by(open_customers.c.id.isnot(None), func.sum(owed).desc(), open_customers.c.id)
+    )
+    if limit:
+        query = query.limit(limit + 1)
+    rows = query.all()
+
+    def amounts(row):
+        return {name: row._mapping[name] for name, _, _ in AGING_BUCKETS} | {"total": row.total}
+
+    totals = amounts(rows[0]) if rows else {name: 0 for name, _, _ in AGING_BUCKETS} | {"total": 0}
     return {
-        'total_revenue': get_total_revenue(db, start_date, end_date),
-        'total_collected': get_total_collected(db, start_date, end_date),
-        'total_pending': get_total_pending(db, start_date, end_date),
-        'total_invoices': db.query(sale_models.Sale).count(),
-        'total_customers': db.query(customer_models.Customer).count(),
-        'total_products': db.query(product_models.Product).count(),
+        "as_of": rows[0].as_of if rows else date.today(),
+        "totals": totals,
+        "customers": [
+            {"customer_id": str(row.customer_id), "customer_name": row.customer_name, **amounts(row)}
+            for row in rows[1:]
+        ],
     }
 
 
+def get_summary_stats(
+    db: Session, start_date: Optional[str] = None, end_date: Optional[str] = None, approximate: bool = False
+) -> Dict:
+    """Get comprehensive summary statistics in a single query.
+
+    The range totals are FILTERed aggregates over the same scan that counts
+    all invoices. With approximate=True the customer and product counts come
+    from planner statistics instead of a full count.
+    """
+    source, conditions, invoices = _totals_source(start_date, end_date)
+
+    def in_range(column):
+        total = func.sum(column)
+        return total.filter(and_(*conditions)) if conditions else total
+
+    row = db.query(
+        in_range(source.total).label('total_revenue'),
+        in_range(source.paid).label('total_collected'),
+        in_range(source.pending).label('total_pending'),
+        invoices.label('total_invoices'),
+        _row_count(customer_models.Customer, approximate).label('total_customers'),
+        _row_count(product_models.Product, approximate).label('total_products'),
+    ).select_from(source).one()
+    return {key: value or 0 for key, value in row._asdict().items()}
+
+
 def get_revenue_report(db: Session, start_date: Optional[str] = None, end_date: Optional[str] = None) -> Dict:
     """Return revenue aggregates for the range"""
-    return {
-        'total_revenue': get_total_revenue(db, start_date, end_date),
-        'total_collected': get_total_collected(db, start_date, end_date),
-        'total_pending': get_total_pending(db, start_date, end_date),
-    }
\ No newline at end of file
+    return _sale_totals(db, start_date, end_date)
@@ -1,36 +1,74 @@
-from sqlalchemy.orm import Session
-from typing import List, Optional
+from sqlalchemy.orm import Session, selectinload
+from typing import Dict, List, Optional
 from uuid import UUID
-from sqlalchemy import func
+from sqlalchemy import func, update, insert, select, delete, text, values, column, literal, Integer
+from sqlalchemy.dialects.postgresql import insert as pg_insert, UUID as PG_UUID
+from sqlalchemy.engine import Row
 from datetime import datetime
+import uuid
 
 from . import models, schemas
+from ..pagination import paginate
+from .. import versions
 from ..products import models as product_models
-from ..customers import models as customer_models
+from ..products import catalog as product_catalog
+from ..customers import crud as customer_crud
+from ..outbox import crud as outbox, handlers as outbox_handlers
+from ..outbox.models import OutboxEvent
+from ..config import settings
 
 
 # -------------------------------------
-# FIXED INVOICE NUMBER GENERATOR
+# INVOICE NUMBER GENERATOR
 # -------------------------------------
 def generate_invoice_number(db: Session) -> str:
-    """Generate unique invoice number for the current date."""
-    today = datetime.now().date()  # FIXED (previously was func.now().date())
-    
-    # Count today's invoices
-    count = (
-        db.query(models.Sale)
-        .filter(func.date(models.Sale.created_at) == today)
-        .count()
-    )
+    """Allocate the next invoice number for the current date."""
+    return allocate_invoice_numbers(db, 1)[0]
+
+
+def allocate_invoice_numbers(db: Session, count: int) -> List[str]:
+    """Allocate ``count`` consecutive invoice numbers for the current date.
+
+    Bumps the day's row in ``invoice_counters`` in place (creating it for
+    the first invoice of the day; a concurrent first checkout lands in ON
+    CONFLICT and increments the row the other one created), so numbers are
+    allocated in constant time and the row lock is held until the caller's
+    transaction ends: concurrent checkouts queue for the next value instead
+    of reading the same count and colliding on the unique constraint. Every
+    number is allocated here, so the row alone says where the day's numbers
+    stand. The numbers are recorded in ``invoice_numbers``, whose primary
+    key fails the transaction rather than let a number be issued twice,
+    partitioned sales or not.
+    """
+    today = datetime.now().date()
+    prefix = f"INV-{today.strftime('%Y%m%d')}-"
+    counter = models.InvoiceCounter
+
+    value = db.execute(
+        pg_insert(counter)
+        .values(day=today, last_value=count)
+        .on_conflict_do_update(
+            index_elements=[counter.day],
+            set_={"last_value": counter.last_value + count},
+        )
+        .returning(counter.last_value)
+    ).scalar()
 
-    return f"INV-{today.strftime('%Y%m%d')}-{count + 1:04d}"
+    numbers = [f"{prefix}{number:04d}" for number in range(value - count + 1, value + 1)]
+    db.execute(insert(models.InvoiceNumber), [{"invoice_number": number} for number in numbers])
+    return numbers
 
 
 # -------------------------------------
 # GET SINGLE SALE
 # -------------------------------------
 def get_sale(db: Session, sale_id: UUID) -> Optional[models.Sale]:
-    return db.query(models.Sale).filter(models.Sale.id == sale_id).first()
+    return (
+        db.query(models.Sale)
+        .options(selectinload(models.Sale.items))
+        .filter(models.Sale.id == sale_id)
+        .first()
+    )
 
 
 # -------------------------------------
@@ -43,9 +81,11 @@ def get_sales(
     start_date: Optional[str] = None,
     end_date: Optional[str] = None,
     pending: Optional[bool] = None,
+    cursor: Optional[str] = None,
 ) -> List[models.Sale]:
 
-    query = db.query(models.Sale)
+    # Items are loaded for the whole page in one extra IN query, not one per sale
+    query = db.query(models.Sale).options(selectinload(models.Sale.items))
 
     if start_date:
         query = query.filter(models.Sale.date >= start_date)
@@ -54,12 +94,197 @@ def get_sales(
     if pending:
         query = query.filter(models.Sale.pending > 0)
 
-    return (
-        query.order_by(models.Sale.created_at.desc())
-        .offset(skip)
-        .limit(limit)
+    return paginate(query, models.Sale.created_at, models.Sale.id, skip, limit, cursor).all()
+
+
+# -------------------------------------
+# STOCK DECREMENT
+# -------------------------------------
+def _cart_quantities(items: List[schemas.SaleItemCreate]) -> Dict[UUID, int]:
+    quantities: Dict[UUID, int] = {}
+    for item_data in items:
+        if item_data.product_id:
+            quantities[item_data.product_id] = quantities.get(item_data.product_id, 0) + item_data.quantity
+    return quantities
+
+
+def _lock_products(db: Session, product_ids) -> Dict[UUID, Row]:
+    """Lock product rows in id order and return (name, stock) keyed by id.
+
+    A fixed lock order means terminals selling overlapping carts queue
+    behind each other instead of deadlocking.
+    """
+    if not product_ids:
+        return {}
+    Product = product_models.Product
+    rows = (
+        db.query(Product.id, Product.name, Product.stock)
+        .filter(Product.id.in_(list(product_ids)))
+        .order_by(Product.id)
+        .with_for_update()
         .all()
     )
+    return {row.id: row for row in rows}
+
+
+def _take_stock(db: Session, quantities: Dict[UUID, int]) -> Dict[UUID, int]:
+    """Decrement stock where enough is left, in one UPDATE; returns {id: stock left} for those taken."""
+    if not quantities:
+        return {}
+    Product = product_models.Product
+    requested = values(
+        column("id", PG_UUID(as_uuid=True)),
+        column("quantity", Integer),
+        name="requested",
+    ).data(list(quantities.items()))
+
+    return dict(
+        db.execute(
+            update(Product)
+            .where(Product.id == requested.c.id, Product.stock >= requested.c.quantity)
+            .values(stock=Product.stock - requested.c.quantity)
+            .returning(Product.id, Product.stock)
+            .execution_options(synchronize_session=False)
+        ).all()
+    )
+
+
+def _decrement_stock(db: Session, items: List[schemas.SaleItemCreate]) -> Dict[UUID, int]:
+    """Validate and take stock for every product on the cart in one UPDATE.
+
+    Unknown product ids are skipped, as before. Returns {id: stock left}.
+    """
+    quantities = _cart_quantities(items)
+    products = _lock_products(db, quantities)
+    taken = _take_stock(db, {product_id: quantities[product_id] for product_id in products})
+
+    short = [products[product_id].name for product_id in quantities if product_id in products and product_id not in taken]
+    if short:
+        raise ValueError("; ".join(f"Insufficient stock for product: {name}" for name in short))
+    return taken
+
+
+def _sale_item_rows(sale_id: UUID, sale_date: datetime, items: List[schemas.SaleItemCreate]) -> List[dict]:
+    return [
+        {
+            "sale_id": sale_id,
+            "sale_date": sale_date,
+            "product_id": item_data.product_id,
+            "product_name": item_data.product_name,
+            "quantity": item_data.quantity,
+            "price": item_data.price,
+            "line_total": item_data.quantity * item_data.price,
+            "price_type": getattr(item_data, "price_type", "retail"),
+        }
+        for item_data in items
+    ]
+
+
+# -------------------------------------
+# DAILY ROLLUP
+# -------------------------------------
+def _rollup_select(sign: int = 1, sale_ids=None):
+    """Sales grouped into rollup rows, optionally limited to sale_ids and negated."""
+    Sale = models.Sale
+    day = func.date(Sale.date)
+    query = select(
+        day,
+        Sale.customer_type,
+        Sale.payment_method,
+        func.count() * sign,
+        func.sum(Sale.total) * sign,
+        func.sum(Sale.paid) * sign,
+        func.sum(Sale.pending) * sign,
+    ).group_by(day, Sale.customer_type, Sale.payment_method)
+    if sale_ids is not None:
+        query = query.where(Sale.id.in_(sale_ids))
+    # Fixed order, so concurrent writers lock rollup rows in the same order
+    return query.order_by(day, Sale.customer_type, Sale.payment_method)
+
+
+_ROLLUP_COLUMNS = ["day", "customer_type", "payment_method", "invoices", "total", "paid", "pending"]
+
+# Rollup rows per (day, customer type, payment method). A transaction writes
+# to the slot of its connection, so checkouts on different connections
+# mostly touch different rows, while one transaction stays on one slot and
+# keeps the row order above.
+ROLLUP_SLOTS = 16
+_slot = func.pg_backend_pid() % ROLLUP_SLOTS
+
+
+def _add_to_rollup(stmt):
+    """Turn an INSERT of rollup rows into one that adds onto existing rows."""
+    Rollup = models.DailySalesRollup
+    return stmt.on_conflict_do_update(
+        index_elements=[Rollup.day, Rollup.customer_type, Rollup.payment_method, Rollup.slot],
+        set_={
+            "invoices": Rollup.invoices + stmt.excluded.invoices,
+            "total": Rollup.total + stmt.excluded.total,
+            "paid": Rollup.paid + stmt.excluded.paid,
+            "pending": Rollup.pending + stmt.excluded.pending,
+        },
+    )
+
+
+def _rollup_sales(db: Session, sale_ids, sign: int = 1) -> List[list]:
+    """Add (sign=1) or remove (sign=-1) the given sales from daily_sales_rollup.
+
+    Run it as late as possible in the transaction: it locks the day's rollup
+    row in this connection's slot until commit. With OUTBOX_ROLLUP on
+    nothing is written or locked;
+    the rows are returned for the caller's outbox event instead, and the
+    dispatcher applies them. Otherwise returns [].
+    """
+    if settings.OUTBOX_ROLLUP:
+        return [list(row) for row in db.execute(_rollup_select(sign, sale_ids))]
+    rows = _rollup_select(sign, sale_ids).add_columns(_slot)
+    db.execute(_add_to_rollup(pg_insert(models.DailySalesRollup).from_select(_ROLLUP_COLUMNS + ["slot"], rows)))
+    return []
+
+
+@outbox_handlers.handles("sale.created", "sale.paid", "sale.deleted", enabled=lambda: settings.OUTBOX_ROLLUP)
+def apply_rollup_event(db: Session, event: OutboxEvent) -> None:
+    apply_rollup_rows(db, event.payload.get("rollup"))
+
+
+def apply_rollup_rows(db: Session, rows: Optional[List[list]]) -> None:
+    """Add rollup rows carried by an outbox event (see _rollup_sales)."""
+    if not rows:
+        return
+    # One INSERT may not touch a row twice, so merge rows of the same key first
+    merged: Dict[tuple, list] = {}
+    for day, customer_type, payment_method, *amounts in rows:
+        key = (datetime.strptime(str(day), "%Y-%m-%d").date(), customer_type, payment_method)
+        merged[key] = [a + b for a, b in zip(merged[key], amounts)] if key in merged else list(amounts)
+    stmt = pg_insert(models.DailySalesRollup).values([
+        dict(zip(_ROLLUP_COLUMNS, key + tuple(amounts)), slot=_slot) for key, amounts in sorted(merged.items())
+    ])
+    db.execute(_add_to_rollup(stmt))
+
+
+def rebuild_daily_rollup(db: Session) -> int:
+    """Recompute daily_sales_rollup from sales; returns the number of rows."""
+    # EXCLUSIVE waits for in-flight sale transactions that already touched the
+    # rollup and holds back new ones until the rebuild commits, so their
+    # deltas land either in the rebuilt rows or on top of them, never twice.
+    # The outbox dispatcher takes the same lock before claiming rollup events.
+    db.connection(execution_options={"isolation_level": "REPEATABLE READ"})
+    db.execute(text("LOCK TABLE daily_sales_rollup IN EXCLUSIVE MODE"))
+    # Snapshot taken after the lock: queued rollup deltas (OUTBOX_ROLLUP) of
+    # sales it sees are dropped, since the rebuild counts those sales already.
+    db.execute(
+        update(OutboxEvent)
+        .where(OutboxEvent.processed_at.is_(None), OutboxEvent.payload.has_key("rollup"))
+        .values(payload=OutboxEvent.payload.op("-")(literal("rollup")))
+        .execution_options(synchronize_session=False)
+    )
+    db.execute(delete(models.DailySalesRollup))
+    rows = db.execute(
+        insert(models.DailySalesRollup).from_select(_ROLLUP_COLUMNS, _rollup_select())
+    ).rowcount
+    db.commit()
+    versions.bump(db, "sales")
+    return rows
 
 
 # -------------------------------------
@@ -73,14 +298,9 @@ def create_sale(db: Session, sale_in: schemas.SaleCreate) -> models.Sale:
     pending_from_customer = 0
     customer = None
     if sale_in.customer_id:
-        customer = (
-            db.query(customer_models.Customer)
-            .filter(customer_models.Customer.id == sale_in.customer_id)
-            .with_for_update()
-            .first()
-        )
+        customer = customer_crud.get_customer_for_pending(db, sale_in.customer_id)
         if customer:
-            pending_from_customer = customer.pending
+            pending_from_customer = customer_crud.get_pending_balance(db, customer)
 
     # Totals
     subtotal = sum(item.quantity * item.price for item in sale_in.items)
@@ -90,10 +310,15 @@ def create_sale(db: Session, sale_in: schemas.SaleCreate) -> models.Sale:
     total = subtotal + gst_amount + pending_from_customer
     pending = max(0, total - sale_in.paid)
 
-    # Generate invoice number
-    invoice_number = generate_invoice_number(db)
-
     try:
+        # Update product stock. Locks are taken in one order on every
+        # checkout path, here and in create_sales_bulk: customer, products,
+        # invoice counter, then rollup rows.
+        stock_left = _decrement_stock(db, sale_in.items)
+
+        # Generate invoice number
+        invoice_number = generate_invoice_number(db)
+
         # Create sale record
         sale = models.Sale(
             invoice_number=invoice_number,
@@ -110,62 +335,162 @@ def create_sale(db: Session, sale_in: schemas.SaleCreate) -> models.Sale:
         db.add(sale)
         db.flush()  # Retrieve sale.id
 
-        # Add sale items + update stock
-        for item_data in sale_in.items:
-
-            sale_item = models.SaleItem(
-                sale_id=sale.id,
-                product_id=item_data.product_id,
-                product_name=item_data.product_name,
-                quantity=item_data.quantity,
-                price=item_data.price,
-                line_total=item_data.quantity * item_data.price,
-                price_type=getattr(item_data, "price_type", "retail"),
-            )
-            db.add(sale_item)
-
-            # Update product stock
-            if item_data.product_id:
-                product = (
-                    db.query(product_models.Product)
-                    .filter(product_models.Product.id == item_data.product_id)
-                    .with_for_update()
-                    .first()
-                )
-
-                if product:
-                    if product.stock < item_data.quantity:
-                        raise ValueError(
-                            f"Insufficient stock for product: {product.name}"
-                        )
-                    product.stock -= item_data.quantity
+        # Add sale items in one multi-row insert
+        if sale_in.items:
+            db.execute(insert(models.SaleItem), _sale_item_rows(sale.id, sale.date, sale_in.items))
 
         # Update customer pending to reflect new pending balance
         if customer:
-            customer.pending = pending
+            customer_crud.set_pending(db, customer, pending_from_customer, pending)
+
+        rollup = _rollup_sales(db, [sale.id])
+        outbox.emit(db, "sale.created", sale_ids=[sale.id], rollup=rollup)
+
+        db.commit()
+        versions.bump(db, "sales", "products", "customers")
+        product_catalog.set_stock(stock_left)
+        return get_sale(db, sale.id)
+
+    except Exception as e:
+        db.rollback()
+        raise e
+
+
+# -------------------------------------
+# BULK CREATE (offline POS replay)
+# -------------------------------------
+def create_sales_bulk(db: Session, sales_in: List[schemas.SaleCreate]) -> List[schemas.SaleBulkResult]:
+    """Create a batch of sales in one transaction with set-based writes.
+
+    Every record is validated up front against locked customer and product
+    rows, in batch order, exactly as sequential create_sale calls would see
+    them. Records that fail get an error in their result and are skipped;
+    the rest are written with one statement per table.
+    """
+    results = [schemas.SaleBulkResult(index=index, ok=False) for index in range(len(sales_in))]
+
+    candidates = []
+    for index, sale_in in enumerate(sales_in):
+        if not sale_in.customer_id or not sale_in.customer_name.strip():
+            results[index].error = "Customer information is required to create a sale."
+        else:
+            candidates.append(index)
+
+    customers = customer_crud.get_customers_for_pending(db, {sales_in[index].customer_id for index in candidates})
+    balances = customer_crud.get_pending_balances(db, customers.values())
+    opening_balances = dict(balances)
+
+    quantities = {index: _cart_quantities(sales_in[index].items) for index in candidates}
+    products = _lock_products(db, {product_id for cart in quantities.values() for product_id in cart})
+    available = {product_id: row.stock for product_id, row in products.items()}
+
+    accepted = []
+    for index in candidates:
+        sale_in = sales_in[index]
+        cart = quantities[index]
+
+        if sale_in.customer_id not in customers:
+            results[index].error = "Customer not found"
+            continue
+        unknown = [product_id for product_id in cart if product_id not in products]
+        if unknown:
+            results[index].error = "; ".join(f"Product not found: {product_id}" for product_id in unknown)
+            continue
+        short = [products[product_id].name for product_id, quantity in cart.items() if available[product_id] < quantity]
+        if short:
+            results[index].error = "; ".join(f"Insufficient stock for product: {name}" for name in short)
+            continue
+
+        for product_id, quantity in cart.items():
+            available[product_id] -= quantity
+
+        subtotal = sum(item.quantity * item.price for item in sale_in.items)
+        gst_amount = subtotal * 0.18 if sale_in.gst_enabled else 0
+        total = subtotal + gst_amount + balances[sale_in.customer_id]
+        pending = max(0, total - sale_in.paid)
+        balances[sale_in.customer_id] = pending
+
+        accepted.append((index, {
+            "id": uuid.uuid4(),
+            "customer_id": sale_in.customer_id,
+            "customer_name": sale_in.customer_name,
+            "customer_type": sale_in.customer_type,
+            "subtotal": subtotal,
+            "gst": gst_amount,
+            "total": total,
+            "paid": sale_in.paid,
+            "pending": pending,
+            "payment_method": sale_in.payment_method,
+        }))
+
+    if not accepted:
+        db.rollback()
+        return results
+
+    try:
+        # Same lock order as create_sale: customers and products are locked
+        # above, the invoice counter only now
+        sale_rows = [row for _, row in accepted]
+        for row, invoice_number in zip(sale_rows, allocate_invoice_numbers(db, len(sale_rows))):
+            row["invoice_number"] = invoice_number
+        sale_dates = dict(db.execute(
+            insert(models.Sale).returning(models.Sale.id, models.Sale.date),
+            sale_rows,
+        ).all())
+
+        item_rows = []
+        for index, row in accepted:
+            item_rows.extend(_sale_item_rows(row["id"], sale_dates[row["id"]], sales_in[index].items))
+        if item_rows:
+            db.execute(insert(models.SaleItem), item_rows)
+
+        # Rows are locked, so the guarded UPDATE takes everything requested.
+        stock_left = _take_stock(db, {
+            product_id: products[product_id].stock - left
+            for product_id, left in available.items()
+            if left != products[product_id].stock
+        })
+        customer_crud.set_pending_many(db, {
+            customer_id: (opening_balances[customer_id], balance)
+            for customer_id, balance in balances.items()
+        })
+        sale_ids = [row["id"] for row in sale_rows]
+        rollup = _rollup_sales(db, sale_ids)
+        outbox.emit(db, "sale.created", sale_ids=sale_ids, rollup=rollup)
 
         db.commit()
-        db.refresh(sale)
-        return sale
+        versions.bump(db, "sales", "products", "customers")
+        product_catalog.set_stock(stock_left)
 
     except Exception as e:
         db.rollback()
         raise e
 
+    for index, row in accepted:
+        results[index].ok = True
+        results[index].sale_id = row["id"]
+        results[index].invoice_number = row["invoice_number"]
+    return results
+
 
 # -------------------------------------
 # DELETE SALE
 # -------------------------------------
 def delete_sale(db: Session, db_obj: models.Sale):
+    db.refresh(db_obj, with_for_update=True)
+    rollup = _rollup_sales(db, [db_obj.id], sign=-1)
+    outbox.emit(db, "sale.deleted", sale_id=db_obj.id, invoice_number=db_obj.invoice_number, rollup=rollup)
     db.delete(db_obj)
     db.commit()
+    versions.bump(db, "sales")
 
 
 # -------------------------------------
 # PAY PENDING
 # -------------------------------------
 def pay_pending(db: Session, sale_id: UUID, amount: float) -> models.Sale:
-    sale = get_sale(db, sale_id)
+    # Lock the sale so concurrent payments apply one after the other
+    sale = db.query(models.Sale).filter(models.Sale.id == sale_id).with_for_update().first()
     if not sale:
         raise ValueError("Sale not found")
 
@@ -175,22 +500,24 @@ def pay_pending(db: Session, sale_id: UUID, amount: float) -> models.Sale:
     if sale.pending <= 0:
         raise ValueError("No pending amount for this sale")
 
-    # Apply payment
     apply_amount = min(amount, sale.pending)
-    sale.paid += apply_amount
-    sale.pending = max(0, sale.pending - apply_amount)
 
-    # Update customer pending too
+    # Update customer pending too, before touching the rollup: checkouts lock
+    # the customer first and rollup rows last, so this must as well
     if sale.customer_id:
-        customer = (
-            db.query(customer_models.Customer)
-            .filter(customer_models.Customer.id == sale.customer_id)
-            .with_for_update()
-            .first()
-        )
+        customer = customer_crud.get_customer_for_pending(db, sale.customer_id)
         if customer:
-            customer.pending = max(0, customer.pending - apply_amount)
+            balance = customer_crud.get_pending_balance(db, customer)
+            customer_crud.set_pending(db, customer, balance, max(0, balance - apply_amount))
+
+    # Apply payment, moving the sale's rollup contribution along with it
+    rollup = _rollup_sales(db, [sale.id], sign=-1)
+    sale.paid += apply_amount
+    sale.pending = max(0, sale.pending - apply_amount)
+    db.flush()
+    rollup += _rollup_sales(db, [sale.id])
+    outbox.emit(db, "sale.paid", sale_id=sale.id, amount=apply_amount, rollup=rollup)
 
     db.commit()
-    db.refresh(sale)
-    return sale
+    versions.bump(db, "sales", "customers")
+    return get_sale(db, sale_id)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Integer, Float, DateTime, ForeignKey
+from sqlalchemy import Column, String, Integer, SmallInteger, Float, DateTime, Date, ForeignKey, Index, text
 from sqlalchemy.sql import func
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
@@ -11,7 +11,7 @@ class Sale(Base):
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4, index=True)
     invoice_number = Column(String(100), nullable=False, unique=True, index=True)
-    date = Column(DateTime(timezone=True), server_default=func.now())
+    date = Column(DateTime(timezone=True), nullable=False, server_default=func.now())  # partition key, see partitions.py
     customer_id = Column(UUID(as_uuid=True), ForeignKey("customers.id"), nullable=True)  # <-- changed nullable=False to True
     customer_name = Column(String(255), nullable=False)
     customer_type = Column(String(20), nullable=False)
@@ -25,11 +25,21 @@ class Sale(Base):
     
     items = relationship("SaleItem", back_populates="sale", cascade="all, delete-orphan")
 
+    __table_args__ = (
+        Index("ix_sales_created_at_id", "created_at", "id"),  # keyset listing
+        Index("ix_sales_customer_id_created_at", "customer_id", "created_at"),  # last invoice per customer
+        Index("ix_sales_pending_created_at", "created_at", "id", postgresql_where=text("pending > 0")),
+        Index("ix_sales_date_brin", "date", postgresql_using="brin"),  # date-range reports on an append-only heap
+    )
+    # date is needed right after insert, to stamp the items' sale_date
+    __mapper_args__ = {"eager_defaults": True}
+
 class SaleItem(Base):
     __tablename__ = "sale_items"
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4, index=True)
     sale_id = Column(UUID(as_uuid=True), ForeignKey("sales.id"), nullable=False)
+    sale_date = Column(DateTime(timezone=True), nullable=False)  # = sales.date; partition key, see partitions.py
     product_id = Column(UUID(as_uuid=True), ForeignKey("products.id"), nullable=True)
     product_name = Column(String(255), nullable=False)
     quantity = Column(Integer, nullable=False)
@@ -38,3 +48,47 @@ class SaleItem(Base):
     price_type = Column(String(20), nullable=False, default="retail")  # "retail" or "wholesale"
     
     sale = relationship("Sale", back_populates="items")
+
+    __table_args__ = (
+        Index("ix_sale_items_sale_id", "sale_id"),
+        Index("ix_sale_items_product_id", "product_id"),
+        Index("ix_sale_items_sale_date_brin", "sale_date", postgresql_using="brin"),
+    )
+
+
+class InvoiceCounter(Base):
+    """Per-day invoice sequence, bumped atomically by generate_invoice_number."""
+    __tablename__ = "invoice_counters"
+
+    day = Column(Date, primary_key=True)
+    last_value = Column(Integer, nullable=False, default=0)
+
+
+class InvoiceNumber(Base):
+    """Every invoice number handed out; the primary key keeps each one issued once.
+
+    sales.invoice_number loses its unique index when sales is partitioned
+    (0009), and numbers of deleted sales must not come back either.
+    """
+    __tablename__ = "invoice_numbers"
+
+    invoice_number = Column(String(100), primary_key=True)
+    issued_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+
+
+class DailySalesRollup(Base):
+    """Per-day sales totals, kept in step with sales by the write paths in crud.
+
+    Each day's totals are spread over up to crud.ROLLUP_SLOTS rows (slot),
+    so concurrent checkouts do not all queue on one row; readers sum them.
+    """
+    __tablename__ = "daily_sales_rollup"
+
+    day = Column(Date, primary_key=True)
+    customer_type = Column(String(20), primary_key=True)
+    payment_method = Column(String(50), primary_key=True)
+    slot = Column(SmallInteger, primary_key=True, default=0, server_default="0")
+    invoices = Column(Integer, nullable=False, default=0)
+    total = Column(Float, nullable=False, default=0)
+    paid = Column(Float, nullable=False, default=0)
+    pending = Column(Float, nullable=False, default=0)
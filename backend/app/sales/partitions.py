@@ -0,0 +1,116 @@
+"""Monthly range partitions of sales and sale_items (migration 0009, opt-in).
+
+sales is partitioned on date and sale_items on sale_date, the date of its
+sale, one partition per month in both tables. A date-filtered query then
+reads only the months it covers, and a month can be detached from both
+tables at once for archiving. Bounds are midnight on the 1st in the
+database's TimeZone, the same calendar the reports group days by.
+
+A sale whose month has no partition fails to insert, so ensure_partitions
+creates the coming months ahead of time, from cron via
+`python -m app.cli ensure-sale-partitions`.
+
+Partitioned, sales cannot keep a unique index on invoice_number (Postgres
+wants the partition key in it); the invoice_numbers table (see
+crud.allocate_invoice_numbers) keeps each number issued once instead.
+"""
+from datetime import date
+from typing import List
+
+from sqlalchemy import text
+
+# (parent table, partition key)
+TABLES = (("sales", "date"), ("sale_items", "sale_date"))
+
+# pg_advisory_xact_lock key serializing ensure_partitions runs
+ENSURE_LOCK_KEY = 0x5A1E5
+
+
+def partition_name(table: str, month: date) -> str:
+    return f"{table}_p{month:%Y%m}"
+
+
+def next_month(month: date) -> date:
+    return date(month.year + month.month // 12, month.month % 12 + 1, 1)
+
+
+def months(first: date, last: date) -> List[date]:
+    """First days of the months from first's through last's, inclusive."""
+    month, result = first.replace(day=1), []
+    while month <= last:
+        result.append(month)
+        month = next_month(month)
+    return result
+
+
+def is_partitioned(conn) -> bool:
+    return conn.execute(text(
+        "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass('sales'))"
+    )).scalar()
+
+
+def current_month(conn) -> date:
+    return conn.execute(text("SELECT date_trunc('month', now())::date")).scalar()
+
+
+def create_month(conn, month: date) -> None:
+    """Create the month's partition in each table, if missing (no commit)."""
+    for table, _ in TABLES:
+        conn.execute(text(
+            f"CREATE TABLE IF NOT EXISTS {partition_name(table, month)} PARTITION OF {table} "
+            f"FOR VALUES FROM ('{month}') TO ('{next_month(month)}')"
+        ))
+
+
+def attached(conn, table: str) -> set:
+    """Names of the partitions attached to table."""
+    return set(conn.execute(text(
+        "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+        "WHERE i.inhparent = to_regclass(:table)"
+    ), {"table": table}).scalars())
+
+
+def ensure_partitions(db, months_ahead: int) -> List[str]:
+    """Create partitions for this month and the next months_ahead; returns those created.
+
+    Only reads the catalog when nothing is missing, and does nothing when
+    sales is not partitioned. Concurrent runs (cron on several hosts) queue
+    on an advisory lock rather than race to create the same partition.
+    """
+    if not is_partitioned(db):
+        return []
+    db.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": ENSURE_LOCK_KEY})
+    existing = attached(db, "sales") | attached(db, "sale_items")
+    wanted = [current_month(db)]
+    for _ in range(months_ahead):
+        wanted.append(next_month(wanted[-1]))
+    missing = [
+        month for month in wanted
+        if any(partition_name(table, month) not in existing for table, _ in TABLES)
+    ]
+    for month in missing:
+        create_month(db, month)
+    db.commit()
+    return [partition_name("sales", month) for month in missing]
+
+
+def detach_month(db, month: date) -> List[str]:
+    """Detach a month from sales and sale_items; returns the detached tables.
+
+    The detached tables stay in the database as ordinary tables, to be
+    dumped and dropped at leisure. Their rows leave every sales query (the
+    daily rollup keeps their totals until it is rebuilt).
+    """
+    if not is_partitioned(db):
+        raise ValueError("sales is not partitioned")
+    items, sales = partition_name("sale_items", month), partition_name("sales", month)
+    if sales not in attached(db, "sales"):
+        raise ValueError(f"No sales partition for {month:%Y-%m}")
+
+    db.execute(text(f"ALTER TABLE sale_items DETACH PARTITION {items}"))
+    # The detached items keep their foreign key into sales, which would
+    # block detaching the sales month they point at
+    db.execute(text(f"ALTER TABLE {items} DROP CONSTRAINT IF EXISTS sale_items_sale_id_fkey"))
+    db.execute(text(f"ALTER TABLE sales DETACH PARTITION {sales}"))
+    db.commit()
+    return [sales, items]
@@ -1,81 +1,41 @@
-import csv
-from io import StringIO
-from fastapi import APIRouter, HTTPException, Depends, Response
+from fastapi import APIRouter, HTTPException, Depends, Request, Response
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from uuid import UUID
 
 from . import schemas, crud
 from ..utils import get_db
+from ..exports.streaming import csv_response
+from ..pagination import set_next_cursor
 
 router = APIRouter(prefix="/api/sales", tags=["sales"])
 
 
 @router.get("/export", tags=["Export"])
-def export_sales_csv(db: Session = Depends(get_db)):
-    """Download all sales as CSV."""
-    sales = crud.get_sales(db, skip=0, limit=100000)
-
-    # Create CSV in memory
-    output = StringIO()
-    writer = csv.writer(output)
-
-    # Header
-    writer.writerow(
-        [
-            "invoice_number",
-            "date",
-            "customer_name",
-            "customer_type",
-            "subtotal",
-            "gst",
-            "total",
-            "paid",
-            "pending",
-            "payment_method",
-            "created_at",
-        ]
-    )
-
-    # Rows
-    for sale in sales:
-        writer.writerow(
-            [
-                sale.invoice_number,
-                sale.date.isoformat() if sale.date else "",
-                sale.customer_name,
-                sale.customer_type,
-                sale.subtotal,
-                sale.gst,
-                sale.total,
-                sale.paid,
-                sale.pending,
-                sale.payment_method,
-                sale.created_at.isoformat() if sale.created_at else "",
-            ]
-        )
-
-    output.seek(0)
-
-    return Response(
-        content=output.getvalue(),
-        media_type="text/csv",
-        headers={"Content-Disposition": "attachment; filename=sales_export.csv"},
-    )
+def export_sales_csv(request: Request, start_date: Optional[str] = None, end_date: Optional[str] = None):
+    """Stream all sales as CSV."""
+    return csv_response(request, "sales", start_date, end_date)
 
 
 @router.get("/", response_model=List[schemas.SaleOut])
 def list_sales(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = None,
     start_date: Optional[str] = None,
     end_date: Optional[str] = None,
     pending: Optional[bool] = None,
     db: Session = Depends(get_db),
 ):
-    return crud.get_sales(
-        db, skip=skip, limit=limit, start_date=start_date, end_date=end_date, pending=pending
-    )
+    try:
+        sales = crud.get_sales(
+            db, skip=skip, limit=limit, start_date=start_date, end_date=end_date, pending=pending, cursor=cursor
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    set_next_cursor(response, sales, limit)
+    return sales
 
 
 @router.get("/{sale_id}", response_model=schemas.SaleOut)
@@ -96,6 +56,15 @@ def create_sale(sale_in: schemas.SaleCreate, db: Session = Depends(get_db)):
         raise HTTPException(status_code=500, detail="Failed to create sale")
 
 
+@router.post("/bulk", response_model=List[schemas.SaleBulkResult])
+def create_sales_bulk(sales_in: List[schemas.SaleCreate], db: Session = Depends(get_db)):
+    """Replay a batch of offline sales; each record succeeds or fails on its own."""
+    try:
+        return crud.create_sales_bulk(db, sales_in)
+    except Exception:
+        raise HTTPException(status_code=500, detail="Failed to create sales")
+
+
 # NEW: pay pending for an invoice
 @router.patch("/{sale_id}/pay", response_model=schemas.SaleOut)
 def pay_sale_pending(sale_id: UUID, pay_in: schemas.PayRequest, db: Session = Depends(get_db)):
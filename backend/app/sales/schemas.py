@@ -71,6 +71,14 @@ class SaleOut(BaseModel):
         from_attributes = True
 
 
+class SaleBulkResult(BaseModel):
+    index: int  # position in the submitted batch
+    ok: bool
+    sale_id: Optional[UUID] = None
+    invoice_number: Optional[str] = None
+    error: Optional[str] = None
+
+
 # NEW: Pay request
 class PayRequest(BaseModel):
     amount: float = Field(..., gt=0)
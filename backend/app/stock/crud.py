@@ -1,28 +1,87 @@
+from sqlalchemy import Float, column, delete, func, insert, or_, select, text, true, update, values
+from sqlalchemy.dialects.postgresql import UUID as PG_UUID, insert as pg_insert
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
 from uuid import UUID
 
 from . import models, schemas
+from ..pagination import paginate
+from .. import versions
+from ..sync import crud as sync_crud
+from ..outbox import crud as outbox
 
 
 def get_stock_item(db: Session, stock_item_id: UUID) -> Optional[models.StockItem]:
     return db.query(models.StockItem).filter(models.StockItem.id == stock_item_id).first()
 
 
-def get_stock_items(db: Session, skip: int = 0, limit: int = 100) -> List[models.StockItem]:
-    return (
-        db.query(models.StockItem)
-        .order_by(models.StockItem.created_at.desc())
-        .offset(skip)
-        .limit(limit)
-        .all()
-    )
+def get_stock_items(db: Session, skip: int = 0, limit: int = 100, cursor: Optional[str] = None) -> List[models.StockItem]:
+    query = db.query(models.StockItem)
+    return paginate(query, models.StockItem.created_at, models.StockItem.id, skip, limit, cursor).all()
+
+
+LOW_STOCK_ORDERINGS = ("shortfall", "name")
+
+
+def _low_stock_query(db: Session, category: Optional[str] = None):
+    # Same predicate as ix_stock_items_low_shortfall, so the planner can use it
+    StockItem = models.StockItem
+    query = db.query(StockItem).filter(StockItem.quantity <= StockItem.min_threshold)
+    if category:
+        query = query.filter(StockItem.category == category)
+    return query
+
+
+def get_low_stock_items(
+    db: Session,
+    category: Optional[str] = None,
+    order_by: str = "shortfall",
+    skip: int = 0,
+    limit: int = 100,
+) -> List[models.StockItem]:
+    """Items at or below their min_threshold, largest shortfall first by default."""
+    if order_by not in LOW_STOCK_ORDERINGS:
+        raise ValueError(f"order_by must be one of: {', '.join(LOW_STOCK_ORDERINGS)}")
+    StockItem = models.StockItem
+    if order_by == "shortfall":
+        ordering = ((StockItem.min_threshold - StockItem.quantity).desc(), StockItem.id)
+    else:
+        ordering = (StockItem.name, StockItem.id)
+    return _low_stock_query(db, category).order_by(*ordering).offset(skip).limit(limit).all()
+
+
+def count_low_stock_items(db: Session, category: Optional[str] = None) -> int:
+    return _low_stock_query(db, category).count()
+
+
+def get_threshold_events(db: Session, since: Optional[str] = None, limit: int = 500):
+    """Threshold crossings after the since token; returns (events, next_token, has_more)."""
+    events, _, next_token, has_more = sync_crud.get_changes(db, models.StockThresholdEvent, since, limit)
+    return events, next_token, has_more
+
+
+def _threshold_event(stock_item_id: UUID, min_threshold: Optional[float], before: float, after: float) -> Optional[dict]:
+    """Event row if going from before to after crosses min_threshold, else None."""
+    if min_threshold is None or (before <= min_threshold) == (after <= min_threshold):
+        return None
+    return {
+        "stock_item_id": stock_item_id,
+        "is_low": after <= min_threshold,
+        "quantity": after,
+        "min_threshold": min_threshold,
+    }
+
+
+def get_stock_changes(db: Session, since: Optional[str] = None, limit: int = 500):
+    return sync_crud.get_changes(db, models.StockItem, since, limit)
 
 
 def create_stock_item(db: Session, stock_in: schemas.StockCreate) -> models.StockItem:
     db_obj = models.StockItem(**stock_in.dict())
     db.add(db_obj)
     db.commit()
+    versions.bump(db, "stock")
     db.refresh(db_obj)
     return db_obj
 
@@ -32,17 +91,27 @@ def update_stock_item(db: Session, db_obj: models.StockItem, stock_in: schemas.S
     for field, value in data.items():
         setattr(db_obj, field, value)
     db.commit()
+    versions.bump(db, "stock")
     db.refresh(db_obj)
     return db_obj
 
 
 def delete_stock_item(db: Session, db_obj: models.StockItem):
     db.delete(db_obj)
+    sync_crud.record_deletion(db, models.StockItem, db_obj.id)
     db.commit()
+    versions.bump(db, "stock")
 
 
 def adjust_stock(db: Session, stock_item_id: UUID, delta: float, reason: str) -> models.StockItem:
-    stock_item = get_stock_item(db, stock_item_id)
+    # Locked so concurrent adjustments of the same item queue instead of
+    # overwriting each other's quantity
+    stock_item = (
+        db.query(models.StockItem)
+        .filter(models.StockItem.id == stock_item_id)
+        .with_for_update()
+        .first()
+    )
     if not stock_item:
         raise ValueError("Stock item not found")
 
@@ -51,6 +120,10 @@ def adjust_stock(db: Session, stock_item_id: UUID, delta: float, reason: str) ->
     if new_quantity < 0:
         raise ValueError("Cannot reduce stock below zero")
 
+    event = _threshold_event(stock_item.id, stock_item.min_threshold, stock_item.quantity, new_quantity)
+    if event:
+        db.add(models.StockThresholdEvent(**event))
+
     # Update stock quantity
     stock_item.quantity = new_quantity
 
@@ -61,19 +134,297 @@ def adjust_stock(db: Session, stock_item_id: UUID, delta: float, reason: str) ->
         reason=reason
     )
     db.add(transaction)
+    outbox.emit(db, "stock.adjusted", adjustments=[
+        {"stock_item_id": stock_item_id, "delta": delta, "quantity": new_quantity},
+    ])
 
     db.commit()
+    versions.bump(db, "stock")
     db.refresh(stock_item)
 
     return stock_item
 
 
-def get_stock_transactions(db: Session, stock_item_id: UUID, skip: int = 0, limit: int = 100):
-    return (
-        db.query(models.StockTransaction)
-        .filter(models.StockTransaction.stock_item_id == stock_item_id)
-        .order_by(models.StockTransaction.created_at.desc())
-        .offset(skip)
-        .limit(limit)
+def _lock_stock_items(db: Session, stock_item_ids: Iterable[UUID]) -> Dict[UUID, tuple]:
+    """Lock stock item rows in id order; returns {id: (id, quantity, min_threshold) row}.
+
+    A fixed lock order means overlapping batches queue behind each other
+    instead of deadlocking.
+    """
+    stock_item_ids = list(stock_item_ids)
+    if not stock_item_ids:
+        return {}
+    StockItem = models.StockItem
+    rows = (
+        db.query(StockItem.id, StockItem.quantity, StockItem.min_threshold)
+        .filter(StockItem.id.in_(stock_item_ids))
+        .order_by(StockItem.id)
+        .with_for_update()
         .all()
     )
+    return {row.id: row for row in rows}
+
+
+def _apply_deltas(db: Session, deltas: Dict[UUID, float]) -> Dict[UUID, float]:
+    """Add deltas where the quantity stays >= 0, in one UPDATE; returns {id: new quantity} for those applied."""
+    if not deltas:
+        return {}
+    StockItem = models.StockItem
+    requested = values(
+        column("id", PG_UUID(as_uuid=True)),
+        column("delta", Float),
+        name="requested",
+    ).data(list(deltas.items()))
+
+    return dict(
+        db.execute(
+            update(StockItem)
+            .where(StockItem.id == requested.c.id, StockItem.quantity + requested.c.delta >= 0)
+            .values(quantity=StockItem.quantity + requested.c.delta)
+            .returning(StockItem.id, StockItem.quantity)
+            .execution_options(synchronize_session=False)
+        ).all()
+    )
+
+
+def adjust_stock_bulk(db: Session, lines: List[schemas.StockAdjustLine]) -> List[schemas.StockAdjustResult]:
+    """Apply a batch of stock adjustments (e.g. a goods-received note) in one transaction.
+
+    Lines are checked in batch order against the locked rows, exactly as
+    sequential adjust_stock calls would see them. A line for an unknown item
+    or one that would take stock below zero fails on its own; the rest are
+    written with one UPDATE and one multi-row ledger INSERT. Items whose
+    net change crosses their min_threshold get one threshold event each.
+    """
+    results = [
+        schemas.StockAdjustResult(index=index, ok=False, stock_item_id=line.stock_item_id)
+        for index, line in enumerate(lines)
+    ]
+    items = _lock_stock_items(db, {line.stock_item_id for line in lines})
+
+    running = {stock_item_id: item.quantity for stock_item_id, item in items.items()}
+    deltas: Dict[UUID, float] = {}
+    accepted = []
+    for index, line in enumerate(lines):
+        if line.stock_item_id not in running:
+            results[index].error = "Stock item not found"
+            continue
+        new_quantity = running[line.stock_item_id] + line.delta
+        if new_quantity < 0:
+            results[index].error = "Cannot reduce stock below zero"
+            continue
+
+        running[line.stock_item_id] = new_quantity
+        deltas[line.stock_item_id] = deltas.get(line.stock_item_id, 0) + line.delta
+        results[index].ok = True
+        results[index].quantity = new_quantity
+        accepted.append(line)
+
+    if not accepted:
+        db.rollback()
+        return results
+
+    try:
+        # Rows are locked and every net delta was checked above, so the
+        # guarded UPDATE applies all of them.
+        _apply_deltas(db, deltas)
+        db.execute(insert(models.StockTransaction), [
+            {"stock_item_id": line.stock_item_id, "delta": line.delta, "reason": line.reason}
+            for line in accepted
+        ])
+        events = [
+            _threshold_event(stock_item_id, items[stock_item_id].min_threshold, items[stock_item_id].quantity, running[stock_item_id])
+            for stock_item_id in deltas
+        ]
+        events = [event for event in events if event]
+        if events:
+            db.execute(insert(models.StockThresholdEvent), events)
+        outbox.emit(db, "stock.adjusted", adjustments=[
+            {"stock_item_id": result.stock_item_id, "delta": line.delta, "quantity": result.quantity}
+            for line, result in zip(lines, results)
+            if result.ok
+        ])
+        db.commit()
+        versions.bump(db, "stock")
+
+    except Exception as e:
+        db.rollback()
+        raise e
+
+    return results
+
+
+def get_stock_transactions(db: Session, stock_item_id: UUID, skip: int = 0, limit: int = 100, cursor: Optional[str] = None):
+    query = db.query(models.StockTransaction).filter(models.StockTransaction.stock_item_id == stock_item_id)
+    return paginate(query, models.StockTransaction.created_at, models.StockTransaction.id, skip, limit, cursor).all()
+
+
+def _delta_total(stock_item_id, *conditions):
+    """Scalar subquery: sum of the item's ledger deltas matching conditions."""
+    Txn = models.StockTransaction
+    return (
+        select(func.coalesce(func.sum(Txn.delta), 0))
+        .where(Txn.stock_item_id == stock_item_id, *conditions)
+        .scalar_subquery()
+    )
+
+
+def get_stock_balance(db: Session, stock_item: models.StockItem, at: Optional[datetime] = None) -> schemas.StockBalanceOut:
+    """The item's ledger balance at a point in time (now by default).
+
+    Starts from the latest checkpoint at or before it and adds the
+    transactions since, so only recent history is read. Without such a
+    checkpoint it works back from the current quantity instead. Times
+    before the item's last compaction can't be answered: transactions
+    after them are gone.
+    """
+    Txn, Checkpoint = models.StockTransaction, models.StockCheckpoint
+    at = at or db.execute(select(func.now())).scalar()
+    compacted_to = (
+        db.query(func.max(Checkpoint.as_of))
+        .filter(Checkpoint.stock_item_id == stock_item.id, Checkpoint.compacted > 0, Checkpoint.as_of > at)
+        .scalar()
+    )
+    if compacted_to:
+        raise ValueError(f"Stock history before {compacted_to.isoformat()} has been compacted")
+
+    checkpoint = (
+        db.query(Checkpoint)
+        .filter(Checkpoint.stock_item_id == stock_item.id, Checkpoint.as_of <= at)
+        .order_by(Checkpoint.as_of.desc())
+        .first()
+    )
+    if checkpoint:
+        since = _delta_total(stock_item.id, Txn.created_at > checkpoint.as_of, Txn.created_at <= at)
+        balance = checkpoint.balance + db.execute(select(since)).scalar()
+    else:
+        later = _delta_total(stock_item.id, Txn.created_at > at)
+        balance = db.execute(
+            select(models.StockItem.quantity - later).where(models.StockItem.id == stock_item.id)
+        ).scalar()
+
+    return schemas.StockBalanceOut(
+        stock_item_id=stock_item.id,
+        at=at,
+        balance=balance,
+        checkpoint_at=checkpoint.as_of if checkpoint else None,
+    )
+
+
+def _settled_before(db: Session, as_of: Optional[datetime]) -> datetime:
+    """as_of (default now), moved back to the start of any transaction still running.
+
+    Ledger rows are stamped with their transaction's start time, so one that
+    is still running could commit a row dated before a later checkpoint.
+    """
+    return db.execute(text(
+        "SELECT least(coalesce(CAST(:as_of AS timestamptz), now()), min(xact_start)) "
+        "FROM pg_stat_activity WHERE datname = current_database() AND pid <> pg_backend_pid()"
+    ), {"as_of": as_of}).scalar()
+
+
+def _checkpoint_candidates(db: Session, as_of: datetime, compact: bool, after_id: Optional[UUID], limit: int) -> List[UUID]:
+    """Next ids (in id order) of items with transactions up to as_of not yet under a checkpoint.
+
+    When compacting, any transaction up to as_of counts, checkpointed or not.
+    """
+    Item, Txn, Checkpoint = models.StockItem, models.StockTransaction, models.StockCheckpoint
+    conditions = [Txn.stock_item_id == Item.id, Txn.created_at <= as_of]
+    if not compact:
+        last = (
+            select(func.max(Checkpoint.as_of))
+            .where(Checkpoint.stock_item_id == Item.id, Checkpoint.as_of <= as_of)
+            .scalar_subquery()
+        )
+        conditions.append(or_(last.is_(None), Txn.created_at > last))
+    query = select(Item.id).where(select(Txn.id).where(*conditions).exists())
+    if after_id:
+        query = query.where(Item.id > after_id)
+    return db.execute(query.order_by(Item.id).limit(limit)).scalars().all()
+
+
+def _checkpoint_rows(db: Session, stock_item_ids: List[UUID], as_of: datetime):
+    """Per item: balance at as_of (quantity less later transactions), ledger
+    (previous checkpoint plus the transactions since; None without one) and
+    older (transactions up to as_of)."""
+    Item, Txn, Checkpoint = models.StockItem, models.StockTransaction, models.StockCheckpoint
+    last = (
+        select(Checkpoint.as_of, Checkpoint.balance)
+        .where(Checkpoint.stock_item_id == Item.id, Checkpoint.as_of < as_of)
+        .order_by(Checkpoint.as_of.desc())
+        .limit(1)
+        .lateral("last")
+    )
+    older = (
+        select(func.count())
+        .where(Txn.stock_item_id == Item.id, Txn.created_at <= as_of)
+        .scalar_subquery()
+    )
+    return db.execute(
+        select(
+            Item.id,
+            (Item.quantity - _delta_total(Item.id, Txn.created_at > as_of)).label("balance"),
+            (last.c.balance + _delta_total(Item.id, Txn.created_at > last.c.as_of, Txn.created_at <= as_of)).label("ledger"),
+            older.label("older"),
+        )
+        .select_from(Item)
+        .outerjoin(last, true())
+        .where(Item.id.in_(stock_item_ids))
+    ).all()
+
+
+def checkpoint_stock(db: Session, as_of: Optional[datetime] = None, compact: bool = False, batch_size: int = 500) -> dict:
+    """Write a checkpoint as of as_of (default now) for every item with new transactions.
+
+    The checkpointed balance is the item's quantity less the transactions
+    after as_of; where the previous checkpoint plus the transactions since
+    disagree with it, the difference is kept as the checkpoint's drift.
+    With compact, items' transactions up to as_of are deleted, summarized
+    by the checkpoint. Items are locked and committed batch by batch, so
+    adjustments only wait for their own batch.
+    """
+    Txn, Checkpoint = models.StockTransaction, models.StockCheckpoint
+    as_of = _settled_before(db, as_of)
+    db.rollback()
+    result = {"as_of": as_of, "checkpoints": 0, "drifted": 0, "compacted": 0}
+
+    after_id = None
+    while True:
+        stock_item_ids = _checkpoint_candidates(db, as_of, compact, after_id, batch_size)
+        if not stock_item_ids:
+            break
+        after_id = stock_item_ids[-1]
+
+        _lock_stock_items(db, stock_item_ids)
+        rows = _checkpoint_rows(db, stock_item_ids, as_of)
+        checkpoints = {
+            row.id: {
+                "stock_item_id": row.id,
+                "as_of": as_of,
+                "balance": row.balance,
+                # Rounded: float sums in a different order differ in the last digits
+                "drift": round(row.balance - row.ledger, 6) if row.ledger is not None else 0,
+                "compacted": row.older if compact else 0,
+            }
+            for row in rows
+        }
+        # An item already checkpointed at exactly as_of keeps that checkpoint
+        # and, when compacting, its transactions
+        written = db.execute(
+            pg_insert(Checkpoint)
+            .values(list(checkpoints.values()))
+            .on_conflict_do_nothing(index_elements=["stock_item_id", "as_of"])
+            .returning(Checkpoint.stock_item_id)
+        ).scalars().all()
+        if compact and written:
+            db.execute(
+                delete(Txn)
+                .where(Txn.stock_item_id.in_(written), Txn.created_at <= as_of)
+                .execution_options(synchronize_session=False)
+            )
+        db.commit()
+
+        result["checkpoints"] += len(written)
+        result["drifted"] += sum(1 for stock_item_id in written if checkpoints[stock_item_id]["drift"])
+        result["compacted"] += sum(checkpoints[stock_item_id]["compacted"] for stock_item_id in written)
+    return result
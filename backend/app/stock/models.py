@@ -1,10 +1,11 @@
-from sqlalchemy import Column, String, Integer, Float, DateTime, ForeignKey
+from sqlalchemy import Column, String, Integer, Float, DateTime, ForeignKey, Index, BigInteger, Boolean, text
 from sqlalchemy.sql import func
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 import uuid
 
 from ..database import Base
+from ..sync.models import CURRENT_XID_DEFAULT, current_xid
 
 
 class StockItem(Base):
@@ -18,6 +19,8 @@ class StockItem(Base):
     min_threshold = Column(Float, nullable=True)
     linked_product_id = Column(UUID(as_uuid=True), ForeignKey("products.id"), nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    change_xid = Column(BigInteger, nullable=False, server_default=CURRENT_XID_DEFAULT, onupdate=current_xid)
 
     # FIX: Add relationship back
     transactions = relationship(
@@ -26,6 +29,16 @@ class StockItem(Base):
         cascade="all, delete"
     )
 
+    __table_args__ = (
+        Index("ix_stock_items_created_at_id", "created_at", "id"),
+        Index("ix_stock_items_change_xid_id", "change_xid", "id"),  # /changes feed
+        # /low: only items at or below their threshold, largest shortfall first
+        Index(
+            "ix_stock_items_low_shortfall", text("(min_threshold - quantity) DESC"), "id",
+            postgresql_where=text("quantity <= min_threshold"),
+        ),
+    )
+
 
 class StockTransaction(Base):
     __tablename__ = "stock_transactions"
@@ -38,3 +51,46 @@ class StockTransaction(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
     stock_item = relationship("StockItem", back_populates="transactions")
+
+    __table_args__ = (
+        Index("ix_stock_transactions_stock_item_id_created_at", "stock_item_id", "created_at", "id"),
+    )
+
+
+class StockCheckpoint(Base):
+    """An item's ledger balance as of a point in time.
+
+    Balances at later times start from the latest checkpoint and add only the
+    transactions after it. A compacting checkpoint also replaces (summarizes)
+    the transactions up to as_of, which are deleted with it.
+    """
+    __tablename__ = "stock_checkpoints"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    stock_item_id = Column(UUID(as_uuid=True), ForeignKey("stock_items.id", ondelete="CASCADE"), nullable=False)
+    as_of = Column(DateTime(timezone=True), nullable=False)
+    balance = Column(Float, nullable=False)
+    drift = Column(Float, nullable=False, default=0)  # quantity minus what the ledger adds up to
+    compacted = Column(Integer, nullable=False, default=0)  # transactions summarized and deleted
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        Index("ix_stock_checkpoints_stock_item_id_as_of", "stock_item_id", "as_of", unique=True),
+    )
+
+
+class StockThresholdEvent(Base):
+    """A stock item crossing its min_threshold, in either direction, through an adjustment."""
+    __tablename__ = "stock_threshold_events"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    stock_item_id = Column(UUID(as_uuid=True), ForeignKey("stock_items.id", ondelete="CASCADE"), nullable=False)
+    is_low = Column(Boolean, nullable=False)  # true: fell to/below threshold, false: recovered
+    quantity = Column(Float, nullable=False)
+    min_threshold = Column(Float, nullable=False)
+    change_xid = Column(BigInteger, nullable=False, server_default=CURRENT_XID_DEFAULT)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        Index("ix_stock_threshold_events_change_xid_id", "change_xid", "id"),
+    )
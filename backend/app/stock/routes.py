@@ -1,60 +1,85 @@
-import csv
-from io import StringIO
-from fastapi import APIRouter, HTTPException, Depends, Response
+from fastapi import APIRouter, HTTPException, Depends, Request, Response
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 from uuid import UUID
+from datetime import datetime
 
 from . import schemas, crud
 from ..utils import get_db
+from ..exports.streaming import csv_response
+from ..pagination import set_next_cursor
+from .. import versions
+from ..sync.schemas import ChangesOut
 
 router = APIRouter(prefix="/api/stock", tags=["stock"])
 
 @router.get("/export", tags=["Export"])
-def export_stock_csv(db: Session = Depends(get_db)):
-    """Download all stock items as CSV."""
-    stock_items = crud.get_stock_items(db, skip=0, limit=100000)
-
-    # Create CSV in memory
-    output = StringIO()
-    writer = csv.writer(output)
-
-    # Header
-    writer.writerow([
-        "id",
-        "name",
-        "category",
-        "quantity",
-        "unit",
-        "min_threshold",
-        "linked_product_id",
-        "created_at"
-    ])
-
-    # Rows
-    for item in stock_items:
-        writer.writerow([
-            str(item.id),
-            item.name,
-            item.category,
-            item.quantity,
-            item.unit,
-            item.min_threshold,
-            str(item.linked_product_id) if item.linked_product_id else "",
-            item.created_at.isoformat() if item.created_at else "",
-        ])
-
-    output.seek(0)
-
-    return Response(
-        content=output.getvalue(),
-        media_type="text/csv",
-        headers={"Content-Disposition": "attachment; filename=stock_export.csv"},
-    )
+def export_stock_csv(request: Request, start_date: Optional[str] = None, end_date: Optional[str] = None):
+    """Stream all stock items as CSV."""
+    return csv_response(request, "stock", start_date, end_date)
 
 @router.get("/", response_model=List[schemas.StockOut])
-def list_stock_items(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    return crud.get_stock_items(db, skip=skip, limit=limit)
+def list_stock_items(
+    request: Request,
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db),
+):
+    unchanged = versions.not_modified(request, response, db, "stock")
+    if unchanged:
+        return unchanged
+    try:
+        stock_items = crud.get_stock_items(db, skip=skip, limit=limit, cursor=cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    set_next_cursor(response, stock_items, limit)
+    return stock_items
+
+@router.get("/low", response_model=List[schemas.LowStockOut])
+def list_low_stock_items(
+    request: Request,
+    response: Response,
+    category: Optional[str] = None,
+    order_by: str = "shortfall",
+    skip: int = 0,
+    limit: int = 100,
+    db: Session = Depends(get_db),
+):
+    """Items at or below min_threshold (order_by: shortfall or name)"""
+    unchanged = versions.not_modified(request, response, db, "stock")
+    if unchanged:
+        return unchanged
+    try:
+        return crud.get_low_stock_items(db, category=category, order_by=order_by, skip=skip, limit=limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/low/count", response_model=schemas.LowStockCount)
+def count_low_stock_items(request: Request, response: Response, category: Optional[str] = None, db: Session = Depends(get_db)):
+    unchanged = versions.not_modified(request, response, db, "stock")
+    if unchanged:
+        return unchanged
+    return schemas.LowStockCount(count=crud.count_low_stock_items(db, category=category))
+
+@router.get("/low/events", response_model=schemas.StockThresholdEventsOut)
+def low_stock_events(since: Optional[str] = None, limit: int = 500, db: Session = Depends(get_db)):
+    """Items crossing their min_threshold since the token (all recorded crossings without one)"""
+    try:
+        events, next_token, has_more = crud.get_threshold_events(db, since, min(limit, 5000))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return schemas.StockThresholdEventsOut(events=events, next_token=next_token, has_more=has_more)
+
+@router.get("/changes", response_model=ChangesOut[schemas.StockOut])
+def stock_changes(since: Optional[str] = None, limit: int = 500, db: Session = Depends(get_db)):
+    """Rows inserted, updated or deleted since the sync token (all rows without one)"""
+    try:
+        updated, deleted, next_token, has_more = crud.get_stock_changes(db, since, min(limit, 5000))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return ChangesOut(updated=updated, deleted=deleted, next_token=next_token, has_more=has_more)
 
 @router.get("/{stock_item_id}", response_model=schemas.StockOut)
 def read_stock_item(stock_item_id: UUID, db: Session = Depends(get_db)):
@@ -82,6 +107,14 @@ def delete_stock_item(stock_item_id: UUID, db: Session = Depends(get_db)):
     crud.delete_stock_item(db, db_obj)
     return Response(status_code=204)
 
+@router.post("/adjust/bulk", response_model=List[schemas.StockAdjustResult])
+def adjust_stock_bulk(lines: List[schemas.StockAdjustLine], db: Session = Depends(get_db)):
+    """Apply many stock adjustments in one transaction; each line succeeds or fails on its own."""
+    try:
+        return crud.adjust_stock_bulk(db, lines)
+    except Exception:
+        raise HTTPException(status_code=500, detail="Failed to adjust stock")
+
 @router.post("/{stock_item_id}/adjust", response_model=schemas.StockOut)
 def adjust_stock_quantity(stock_item_id: UUID, adjust_data: schemas.AdjustStock, db: Session = Depends(get_db)):
     try:
@@ -90,5 +123,28 @@ def adjust_stock_quantity(stock_item_id: UUID, adjust_data: schemas.AdjustStock,
         raise HTTPException(status_code=400, detail=str(e))
 
 @router.get("/{stock_item_id}/transactions", response_model=List[schemas.StockTransactionOut])
-def get_stock_transactions(stock_item_id: UUID, skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    return crud.get_stock_transactions(db, stock_item_id, skip=skip, limit=limit)
\ No newline at end of file
+def get_stock_transactions(
+    stock_item_id: UUID,
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db),
+):
+    try:
+        transactions = crud.get_stock_transactions(db, stock_item_id, skip=skip, limit=limit, cursor=cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    set_next_cursor(response, transactions, limit)
+    return transactions
+
+@router.get("/{stock_item_id}/balance", response_model=schemas.StockBalanceOut)
+def get_stock_balance(stock_item_id: UUID, at: Optional[datetime] = None, db: Session = Depends(get_db)):
+    """Ledger balance at a point in time (now by default)"""
+    stock_item = crud.get_stock_item(db, stock_item_id)
+    if not stock_item:
+        raise HTTPException(status_code=404, detail="Stock item not found")
+    try:
+        return crud.get_stock_balance(db, stock_item, at)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
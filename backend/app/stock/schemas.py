@@ -1,5 +1,5 @@
-from pydantic import BaseModel, Field
-from typing import Optional
+from pydantic import BaseModel, Field, computed_field
+from typing import List, Optional
 from uuid import UUID
 from datetime import datetime
 
@@ -34,6 +34,19 @@ class StockUpdate(BaseModel):
 class StockOut(StockBase):
     id: UUID
     created_at: datetime
+    updated_at: Optional[datetime] = None
+
+
+class LowStockOut(StockOut):
+    @computed_field
+    @property
+    def shortfall(self) -> float:
+        """How far quantity is below min_threshold (0 when exactly at it)."""
+        return self.min_threshold - self.quantity
+
+
+class LowStockCount(BaseModel):
+    count: int
 
 
 class AdjustStock(BaseModel):
@@ -41,6 +54,25 @@ class AdjustStock(BaseModel):
     reason: str = Field(..., min_length=1, max_length=255)
 
 
+class StockAdjustLine(AdjustStock):
+    stock_item_id: UUID
+
+
+class StockAdjustResult(BaseModel):
+    index: int  # position in the submitted batch
+    ok: bool
+    stock_item_id: UUID
+    quantity: Optional[float] = None  # quantity after this line
+    error: Optional[str] = None
+
+
+class StockBalanceOut(BaseModel):
+    stock_item_id: UUID
+    at: datetime
+    balance: float
+    checkpoint_at: Optional[datetime] = None  # checkpoint the balance was counted from, if any
+
+
 class StockTransactionOut(BaseModel):
     id: UUID
     stock_item_id: UUID
@@ -51,3 +83,21 @@ class StockTransactionOut(BaseModel):
 
     class Config:
         from_attributes = True
+
+
+class StockThresholdEventOut(BaseModel):
+    id: UUID
+    stock_item_id: UUID
+    is_low: bool
+    quantity: float
+    min_threshold: float
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
+class StockThresholdEventsOut(BaseModel):
+    events: List[StockThresholdEventOut]
+    next_token: str
+    has_more: bool
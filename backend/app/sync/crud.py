@@ -0,0 +1,110 @@
+"""Change feeds for offline clients ("changes since <token>").
+
+Synced tables stamp each row with the id of the transaction that last wrote
+it (change_xid) and deletes leave a SyncTombstone. A feed walks rows and
+tombstones in (change_xid, id) order, but only below the snapshot xmin:
+every transaction under it has finished, so nothing can commit behind a
+token later. Rows of transactions still running are picked up next time.
+"""
+import base64
+import json
+from typing import List, Optional, Tuple
+from uuid import UUID
+
+from sqlalchemy import false, func, literal_column, select, true, tuple_, union_all
+from sqlalchemy.orm import Session
+
+from .models import SyncTombstone
+
+_HORIZON = literal_column("pg_snapshot_xmin(pg_current_snapshot())::text::bigint")
+
+
+def encode_token(xid: int, row_id: Optional[UUID] = None) -> str:
+    raw = json.dumps([xid, str(row_id) if row_id else None]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_token(token: str) -> Tuple[int, Optional[UUID]]:
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        xid, row_id = json.loads(raw)
+        return int(xid), UUID(row_id) if row_id else None
+    except (ValueError, TypeError) as e:
+        raise ValueError("Invalid sync token") from e
+
+
+def record_deletion(db: Session, model, row_id: UUID) -> None:
+    """Leave a tombstone for a deleted row (no commit; part of the delete)."""
+    db.add(SyncTombstone(resource=model.__tablename__, row_id=row_id))
+
+
+def start_token(db: Session) -> str:
+    """A token for the changes from now on.
+
+    Read it before a full snapshot of a table: every write the snapshot may
+    miss commits at or above it, so get_changes(since=token) returns it.
+    """
+    return encode_token(db.execute(select(_HORIZON)).scalar())
+
+
+def _after(xid_column, id_column, position: Tuple[int, Optional[UUID]]):
+    xid, row_id = position
+    if row_id is None:
+        return xid_column >= xid
+    return tuple_(xid_column, id_column) > tuple_(xid, row_id)
+
+
+def get_changes(
+    db: Session, model, since: Optional[str] = None, limit: int = 500, also_changed=()
+) -> Tuple[List, List[UUID], str, bool]:
+    """Rows of model written, and ids deleted, after the since token.
+
+    Returns (rows, deleted_ids, next_token, has_more). Without a token it
+    returns every row (a full sync) and no deletions.
+
+    also_changed lists (xid column, row id column) pairs of other tables
+    whose rows change a row of model without writing it, such as pending
+    ledger entries; such a row counts as changed at its latest xid.
+    """
+    position = decode_token(since) if since else None
+    horizon = db.execute(select(_HORIZON)).scalar()
+
+    sources = [(model.change_xid, model.id), *also_changed]
+    changes = []
+    for xid_column, id_column in sources:
+        change = select(xid_column.label("xid"), id_column.label("row_id")).where(xid_column < horizon)
+        if position:
+            change = change.where(_after(xid_column, id_column, position))
+        changes.append(change)
+    if len(changes) == 1:
+        live = changes[0].add_columns(false().label("deleted"))
+    else:
+        changed = union_all(*changes).subquery("changed")
+        live = select(
+            func.max(changed.c.xid).label("xid"), changed.c.row_id, false().label("deleted")
+        ).group_by(changed.c.row_id)
+    if position:
+        dead = select(SyncTombstone.change_xid, SyncTombstone.row_id, true()).where(
+            SyncTombstone.resource == model.__tablename__,
+            SyncTombstone.change_xid < horizon,
+            _after(SyncTombstone.change_xid, SyncTombstone.row_id, position),
+        )
+        feed = union_all(live, dead).subquery("feed")
+    else:
+        feed = live.subquery("feed")
+
+    entries = db.execute(select(feed).order_by(feed.c.xid, feed.c.row_id).limit(limit + 1)).all()
+    has_more = len(entries) > limit
+    entries = entries[:limit]
+
+    updated_ids = [entry.row_id for entry in entries if not entry.deleted]
+    by_id = {row.id: row for row in db.query(model).filter(model.id.in_(updated_ids))} if updated_ids else {}
+    # A row deleted since the feed was read is skipped; its tombstone follows
+    rows = [by_id[row_id] for row_id in updated_ids if row_id in by_id]
+    deleted = [entry.row_id for entry in entries if entry.deleted]
+
+    if has_more:
+        next_token = encode_token(entries[-1].xid, entries[-1].row_id)
+    else:
+        next_token = encode_token(horizon)
+    return rows, deleted, next_token, has_more
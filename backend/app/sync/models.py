@@ -0,0 +1,27 @@
+from sqlalchemy import Column, String, BigInteger, DateTime, Index, literal_column, text
+from sqlalchemy.sql import func
+from sqlalchemy.dialects.postgresql import UUID
+import uuid
+
+from ..database import Base
+
+# Id of the writing transaction (xid8 as bigint). Synced tables stamp it on
+# every insert and update; /changes pages by it (see sync.crud).
+CURRENT_XID_SQL = "pg_current_xact_id()::text::bigint"
+CURRENT_XID_DEFAULT = text(CURRENT_XID_SQL)
+current_xid = literal_column(CURRENT_XID_SQL)
+
+
+class SyncTombstone(Base):
+    """A deleted row of a synced table, kept so /changes can report it."""
+    __tablename__ = "sync_tombstones"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    resource = Column(String(50), nullable=False)  # table name
+    row_id = Column(UUID(as_uuid=True), nullable=False)
+    change_xid = Column(BigInteger, nullable=False, server_default=CURRENT_XID_DEFAULT)
+    deleted_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        Index("ix_sync_tombstones_resource_change_xid", "resource", "change_xid", "row_id"),
+    )
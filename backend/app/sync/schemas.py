@@ -0,0 +1,12 @@
+from pydantic import BaseModel
+from typing import Generic, List, TypeVar
+from uuid import UUID
+
+T = TypeVar("T")
+
+
+class ChangesOut(BaseModel, Generic[T]):
+    updated: List[T]          # inserted or updated rows, full
+    deleted: List[UUID]       # ids of deleted rows
+    next_token: str           # pass as ?since= on the next sync
+    has_more: bool            # true: call again right away with next_token
@@ -0,0 +1,167 @@
+"""initial schema
+
+Baseline: the schema Base.metadata.create_all produced before migrations
+were introduced. Databases created that way should be stamped rather than
+upgraded from scratch:  alembic stamp 0001
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18 04:42:14.608256
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0001'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('customers',
+    sa.Column('id', sa.UUID(), nullable=False),
+    sa.Column('name', sa.String(length=255), nullable=False),
+    sa.Column('phone', sa.String(length=20), nullable=False),
+    sa.Column('type', sa.String(length=20), nullable=False),
+    sa.Column('pending', sa.Float(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_customers_id'), 'customers', ['id'], unique=False)
+    op.create_table('export_jobs',
+    sa.Column('id', sa.UUID(), nullable=False),
+    sa.Column('dataset', sa.String(length=50), nullable=False),
+    sa.Column('start_date', sa.String(length=50), nullable=True),
+    sa.Column('end_date', sa.String(length=50), nullable=True),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('total_rows', sa.Integer(), nullable=True),
+    sa.Column('rows_written', sa.Integer(), nullable=False),
+    sa.Column('file_path', sa.String(length=500), nullable=True),
+    sa.Column('file_size', sa.BigInteger(), nullable=True),
+    sa.Column('error', sa.String(length=500), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.Column('finished_at', sa.DateTime(timezone=True), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_export_jobs_id'), 'export_jobs', ['id'], unique=False)
+    op.create_table('invoice_counters',
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('last_value', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('day')
+    )
+    op.create_table('products',
+    sa.Column('id', sa.UUID(), nullable=False),
+    sa.Column('name', sa.String(length=255), nullable=False),
+    sa.Column('category', sa.String(length=100), nullable=False),
+    sa.Column('retail_price', sa.Float(), nullable=False),
+    sa.Column('wholesale_price', sa.Float(), nullable=False),
+    sa.Column('is_wholesale_only', sa.Boolean(), nullable=True),
+    sa.Column('stock', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_products_id'), 'products', ['id'], unique=False)
+    op.create_table('customer_payments',
+    sa.Column('id', sa.UUID(), nullable=False),
+    sa.Column('customer_id', sa.UUID(), nullable=False),
+    sa.Column('amount', sa.Float(), nullable=False),
+    sa.Column('method', sa.String(length=50), nullable=False),
+    sa.Column('note', sa.String(length=255), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.ForeignKeyConstraint(['customer_id'], ['customers.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_customer_payments_id'), 'customer_payments', ['id'], unique=False)
+    op.create_table('customer_pending_entries',
+    sa.Column('id', sa.UUID(), nullable=False),
+    sa.Column('customer_id', sa.UUID(), nullable=False),
+    sa.Column('delta', sa.Float(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.ForeignKeyConstraint(['customer_id'], ['customers.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_customer_pending_entries_customer_id'), 'customer_pending_entries', ['customer_id'], unique=False)
+    op.create_index(op.f('ix_customer_pending_entries_id'), 'customer_pending_entries', ['id'], unique=False)
+    op.create_table('sales',
+    sa.Column('id', sa.UUID(), nullable=False),
+    sa.Column('invoice_number', sa.String(length=100), nullable=False),
+    sa.Column('date', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.Column('customer_id', sa.UUID(), nullable=True),
+    sa.Column('customer_name', sa.String(length=255), nullable=False),
+    sa.Column('customer_type', sa.String(length=20), nullable=False),
+    sa.Column('subtotal', sa.Float(), nullable=False),
+    sa.Column('gst', sa.Float(), nullable=False),
+    sa.Column('total', sa.Float(), nullable=False),
+    sa.Column('paid', sa.Float(), nullable=False),
+    sa.Column('pending', sa.Float(), nullable=False),
+    sa.Column('payment_method', sa.String(length=50), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.ForeignKeyConstraint(['customer_id'], ['customers.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_sales_id'), 'sales', ['id'], unique=False)
+    op.create_index(op.f('ix_sales_invoice_number'), 'sales', ['invoice_number'], unique=True)
+    op.create_table('stock_items',
+    sa.Column('id', sa.UUID(), nullable=False),
+    sa.Column('name', sa.String(length=255), nullable=False),
+    sa.Column('category', sa.String(length=100), nullable=False),
+    sa.Column('quantity', sa.Float(), nullable=False),
+    sa.Column('unit', sa.String(length=50), nullable=False),
+    sa.Column('min_threshold', sa.Float(), nullable=True),
+    sa.Column('linked_product_id', sa.UUID(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.ForeignKeyConstraint(['linked_product_id'], ['products.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_stock_items_id'), 'stock_items', ['id'], unique=False)
+    op.create_table('sale_items',
+    sa.Column('id', sa.UUID(), nullable=False),
+    sa.Column('sale_id', sa.UUID(), nullable=False),
+    sa.Column('product_id', sa.UUID(), nullable=True),
+    sa.Column('product_name', sa.String(length=255), nullable=False),
+    sa.Column('quantity', sa.Integer(), nullable=False),
+    sa.Column('price', sa.Float(), nullable=False),
+    sa.Column('line_total', sa.Float(), nullable=False),
+    sa.Column('price_type', sa.String(length=20), nullable=False),
+    sa.ForeignKeyConstraint(['product_id'], ['products.id'], ),
+    sa.ForeignKeyConstraint(['sale_id'], ['sales.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_sale_items_id'), 'sale_items', ['id'], unique=False)
+    op.create_table('stock_transactions',
+    sa.Column('id', sa.UUID(), nullable=False),
+    sa.Column('stock_item_id', sa.UUID(), nullable=False),
+    sa.Column('delta', sa.Float(), nullable=False),
+    sa.Column('reason', sa.String(length=255), nullable=False),
+    sa.Column('related_sale_id', sa.UUID(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.ForeignKeyConstraint(['stock_item_id'], ['stock_items.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_stock_transactions_id'), 'stock_transactions', ['id'], unique=False)
+
+
+def downgrade():
+    op.drop_index(op.f('ix_stock_transactions_id'), table_name='stock_transactions')
+    op.drop_table('stock_transactions')
+    op.drop_index(op.f('ix_sale_items_id'), table_name='sale_items')
+    op.drop_table('sale_items')
+    op.drop_index(op.f('ix_stock_items_id'), table_name='stock_items')
+    op.drop_table('stock_items')
+    op.drop_index(op.f('ix_sales_invoice_number'), table_name='sales')
+    op.drop_index(op.f('ix_sales_id'), table_name='sales')
+    op.drop_table('sales')
+    op.drop_index(op.f('ix_customer_pending_entries_id'), table_name='customer_pending_entries')
+    op.drop_index(op.f('ix_customer_pending_entries_customer_id'), table_name='customer_pending_entries')
+    op.drop_table('customer_pending_entries')
+    op.drop_index(op.f('ix_customer_payments_id'), table_name='customer_payments')
+    op.drop_table('customer_payments')
+    op.drop_index(op.f('ix_products_id'), table_name='products')
+    op.drop_table('products')
+    op.drop_table('invoice_counters')
+    op.drop_index(op.f('ix_export_jobs_id'), table_name='export_jobs')
+    op.drop_table('export_jobs')
+    op.drop_index(op.f('ix_customers_id'), table_name='customers')
+    op.drop_table('customers')
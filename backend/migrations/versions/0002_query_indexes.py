@@ -0,0 +1,51 @@
+"""query indexes
+
+Indexes for the list, report and pending queries. Built CONCURRENTLY so a
+live database keeps taking sales while they are created.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 05:10:37.112904
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+
+INDEXES = [
+    # (name, table, columns, extra kwargs)
+    ('ix_sales_created_at_id', 'sales', ['created_at', 'id'], {}),
+    ('ix_sales_customer_id_created_at', 'sales', ['customer_id', 'created_at'], {}),
+    ('ix_sales_pending_created_at', 'sales', ['created_at', 'id'],
+     {'postgresql_where': sa.text('pending > 0')}),
+    ('ix_sales_date_brin', 'sales', ['date'], {'postgresql_using': 'brin'}),
+    ('ix_sale_items_sale_id', 'sale_items', ['sale_id'], {}),
+    ('ix_sale_items_product_id', 'sale_items', ['product_id'], {}),
+    ('ix_customers_created_at_id', 'customers', ['created_at', 'id'], {}),
+    ('ix_customers_wholesale_pending', 'customers', ['pending', 'id'],
+     {'postgresql_where': sa.text("type = 'wholesale' AND pending > 0")}),
+    ('ix_customer_payments_customer_id_created_at', 'customer_payments',
+     ['customer_id', 'created_at', 'id'], {}),
+    ('ix_products_created_at_id', 'products', ['created_at', 'id'], {}),
+    ('ix_stock_items_created_at_id', 'stock_items', ['created_at', 'id'], {}),
+    ('ix_stock_transactions_stock_item_id_created_at', 'stock_transactions',
+     ['stock_item_id', 'created_at', 'id'], {}),
+]
+
+
+def upgrade():
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction block
+    with op.get_context().autocommit_block():
+        for name, table, columns, kwargs in INDEXES:
+            op.create_index(name, table, columns, postgresql_concurrently=True, if_not_exists=True, **kwargs)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, table, _, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,38 @@
+"""daily sales rollup
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 06:02:51.430118
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('daily_sales_rollup',
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('customer_type', sa.String(length=20), nullable=False),
+    sa.Column('payment_method', sa.String(length=50), nullable=False),
+    sa.Column('invoices', sa.Integer(), nullable=False),
+    sa.Column('total', sa.Float(), nullable=False),
+    sa.Column('paid', sa.Float(), nullable=False),
+    sa.Column('pending', sa.Float(), nullable=False),
+    sa.PrimaryKeyConstraint('day', 'customer_type', 'payment_method')
+    )
+    # Backfill; `python -m app.cli rebuild-daily-rollup` does the same later on
+    op.execute(
+        "INSERT INTO daily_sales_rollup "
+        "(day, customer_type, payment_method, invoices, total, paid, pending) "
+        "SELECT date(date), customer_type, payment_method, count(*), sum(total), sum(paid), sum(pending) "
+        "FROM sales GROUP BY 1, 2, 3"
+    )
+
+
+def downgrade():
+    op.drop_table('daily_sales_rollup')
@@ -0,0 +1,37 @@
+"""customer search trigram indexes
+
+Requires the pg_trgm extension (PostgreSQL contrib). The indexes are kept
+out of the models so create_all works on servers without it; env.py skips
+them when autogenerating.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18 07:21:09.845530
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_customers_name_trgm', 'customers', [sa.text('lower(name) gin_trgm_ops')],
+            postgresql_using='gin', postgresql_concurrently=True, if_not_exists=True,
+        )
+        op.create_index(
+            'ix_customers_phone_trgm', 'customers', [sa.text('phone gin_trgm_ops')],
+            postgresql_using='gin', postgresql_concurrently=True, if_not_exists=True,
+        )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_customers_phone_trgm', table_name='customers', postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_customers_name_trgm', table_name='customers', postgresql_concurrently=True, if_exists=True)
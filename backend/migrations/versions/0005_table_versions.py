@@ -0,0 +1,30 @@
+"""table version sequences
+
+Sequences advanced after writes to products, customers, stock and sales;
+their values form the ETags of the list and report endpoints.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18 08:03:44.270615
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0005'
+down_revision = '0004'
+branch_labels = None
+depends_on = None
+
+
+TABLES = ('products', 'customers', 'stock', 'sales')
+
+
+def upgrade():
+    for table in TABLES:
+        op.execute(sa.schema.CreateSequence(sa.Sequence(f'{table}_version_seq'), if_not_exists=True))
+
+
+def downgrade():
+    for table in TABLES:
+        op.execute(sa.schema.DropSequence(sa.Sequence(f'{table}_version_seq'), if_exists=True))
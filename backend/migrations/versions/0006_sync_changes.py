@@ -0,0 +1,58 @@
+"""sync changes
+
+Stamp products, customers and stock_items with the writing transaction id
+(change_xid) and an updated_at, and keep tombstones for deleted rows, for
+the /changes delta-sync endpoints. Existing rows all get the migrating
+transaction's id, so the first sync after upgrading is a full one.
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18 09:12:05.583120
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+revision = '0006'
+down_revision = '0005'
+branch_labels = None
+depends_on = None
+
+
+TABLES = ('products', 'customers', 'stock_items')
+CURRENT_XID = sa.text('pg_current_xact_id()::text::bigint')
+
+
+def upgrade():
+    for table in TABLES:
+        op.add_column(table, sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True))
+        op.add_column(table, sa.Column('change_xid', sa.BigInteger(), server_default=CURRENT_XID, nullable=False))
+
+    op.create_table('sync_tombstones',
+    sa.Column('id', postgresql.UUID(as_uuid=True), nullable=False),
+    sa.Column('resource', sa.String(length=50), nullable=False),
+    sa.Column('row_id', postgresql.UUID(as_uuid=True), nullable=False),
+    sa.Column('change_xid', sa.BigInteger(), server_default=CURRENT_XID, nullable=False),
+    sa.Column('deleted_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_sync_tombstones_resource_change_xid', 'sync_tombstones', ['resource', 'change_xid', 'row_id'])
+
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction block
+    with op.get_context().autocommit_block():
+        for table in TABLES:
+            op.create_index(f'ix_{table}_change_xid_id', table, ['change_xid', 'id'],
+                            postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for table in reversed(TABLES):
+            op.drop_index(f'ix_{table}_change_xid_id', table_name=table, postgresql_concurrently=True, if_exists=True)
+
+    op.drop_index('ix_sync_tombstones_resource_change_xid', table_name='sync_tombstones')
+    op.drop_table('sync_tombstones')
+    for table in reversed(TABLES):
+        op.drop_column(table, 'change_xid')
+        op.drop_column(table, 'updated_at')
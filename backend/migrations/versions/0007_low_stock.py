@@ -0,0 +1,49 @@
+"""low stock
+
+Partial index over stock items at or below their min_threshold, ordered by
+shortfall, for /api/stock/low; and the stock_threshold_events feed that
+adjustments append to when an item crosses its threshold.
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18 09:58:21.904417
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+revision = '0007'
+down_revision = '0006'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('stock_threshold_events',
+    sa.Column('id', postgresql.UUID(as_uuid=True), nullable=False),
+    sa.Column('stock_item_id', postgresql.UUID(as_uuid=True), nullable=False),
+    sa.Column('is_low', sa.Boolean(), nullable=False),
+    sa.Column('quantity', sa.Float(), nullable=False),
+    sa.Column('min_threshold', sa.Float(), nullable=False),
+    sa.Column('change_xid', sa.BigInteger(), server_default=sa.text('pg_current_xact_id()::text::bigint'), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.ForeignKeyConstraint(['stock_item_id'], ['stock_items.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_stock_threshold_events_change_xid_id', 'stock_threshold_events', ['change_xid', 'id'])
+
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction block
+    with op.get_context().autocommit_block():
+        op.create_index('ix_stock_items_low_shortfall', 'stock_items',
+                        [sa.text('(min_threshold - quantity) DESC'), 'id'],
+                        postgresql_where=sa.text('quantity <= min_threshold'),
+                        postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_stock_items_low_shortfall', table_name='stock_items', postgresql_concurrently=True, if_exists=True)
+
+    op.drop_index('ix_stock_threshold_events_change_xid_id', table_name='stock_threshold_events')
+    op.drop_table('stock_threshold_events')
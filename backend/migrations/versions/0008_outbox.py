@@ -0,0 +1,41 @@
+"""outbox
+
+Transactional outbox: events appended by the sale, payment and stock write
+paths in their own commit, drained by the outbox dispatcher.
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-18 11:20:47.318562
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+revision = '0008'
+down_revision = '0007'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('outbox_events',
+    sa.Column('id', postgresql.UUID(as_uuid=True), nullable=False),
+    sa.Column('event_type', sa.String(length=50), nullable=False),
+    sa.Column('payload', postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.Column('available_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('last_error', sa.String(length=500), nullable=True),
+    sa.Column('processed_at', sa.DateTime(timezone=True), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_outbox_events_pending', 'outbox_events', ['available_at', 'id'],
+                    postgresql_where=sa.text('processed_at IS NULL'))
+    op.create_index('ix_outbox_events_processed_at', 'outbox_events', ['processed_at'])
+
+
+def downgrade():
+    op.drop_index('ix_outbox_events_processed_at', table_name='outbox_events')
+    op.drop_index('ix_outbox_events_pending', table_name='outbox_events')
+    op.drop_table('outbox_events')
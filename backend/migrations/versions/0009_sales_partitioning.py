@@ -0,0 +1,102 @@
+"""sales partitioning
+
+Add sale_items.sale_date (its sale's date) and make sales.date NOT NULL,
+the keys sales and sale_items are range-partitioned on. Only when asked
+for explicitly, with `alembic -x sales_partitioned=true upgrade ...`, the
+two tables are then rebuilt as monthly partitions (see
+app/sales/partitions.py) and every row copied over, in this migration's
+transaction: run it in a maintenance window.
+
+Partitioned, sales' primary key becomes (id, date), invoice_number is
+indexed but no longer unique (invoice_numbers, from 0012, keeps it so),
+and sale_items references sales by (sale_id, sale_date).
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-18 12:41:09.775120
+"""
+from alembic import context, op
+import sqlalchemy as sa
+
+from app.config import settings
+from app.sales import partitions
+
+
+revision = '0009'
+down_revision = '0008'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute("UPDATE sales SET date = coalesce(created_at, now()) WHERE date IS NULL")
+    op.alter_column('sales', 'date', existing_type=sa.DateTime(timezone=True), nullable=False)
+    op.add_column('sale_items', sa.Column('sale_date', sa.DateTime(timezone=True), nullable=True))
+
+    if context.get_x_argument(as_dictionary=True).get('sales_partitioned', 'false').lower() == 'true':
+        _rebuild(partitioned=True)
+        return
+
+    op.execute("UPDATE sale_items SET sale_date = sales.date FROM sales WHERE sales.id = sale_items.sale_id")
+    op.alter_column('sale_items', 'sale_date', existing_type=sa.DateTime(timezone=True), nullable=False)
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction block
+    with op.get_context().autocommit_block():
+        op.create_index('ix_sale_items_sale_date_brin', 'sale_items', ['sale_date'], postgresql_using='brin',
+                        postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade():
+    if partitions.is_partitioned(op.get_bind()):
+        _rebuild(partitioned=False)
+    op.drop_index('ix_sale_items_sale_date_brin', table_name='sale_items', if_exists=True)
+    op.drop_column('sale_items', 'sale_date')
+    op.alter_column('sales', 'date', existing_type=sa.DateTime(timezone=True), nullable=True)
+
+
+def _rebuild(partitioned: bool):
+    """Recreate sales and sale_items, monthly-partitioned or plain, with all their rows."""
+    bind = op.get_bind()
+    for table, key in partitions.TABLES:
+        op.execute(f"ALTER TABLE {table} RENAME TO {table}_old")
+        partition_by = f" PARTITION BY RANGE ({key})" if partitioned else ""
+        op.execute(f"CREATE TABLE {table} (LIKE {table}_old INCLUDING DEFAULTS){partition_by}")
+        op.execute(f"ALTER TABLE {table} ALTER COLUMN {key} SET NOT NULL")
+
+    if partitioned:
+        this_month = partitions.current_month(bind)
+        first = bind.execute(sa.text("SELECT date_trunc('month', min(date))::date FROM sales_old")).scalar()
+        last = this_month
+        for _ in range(settings.SALES_PARTITION_MONTHS_AHEAD):
+            last = partitions.next_month(last)
+        for month in partitions.months(min(first or this_month, this_month), last):
+            partitions.create_month(bind, month)
+
+    op.execute("INSERT INTO sales SELECT * FROM sales_old")
+    columns = [column['name'] for column in sa.inspect(bind).get_columns('sale_items_old')]
+    op.execute(
+        f"INSERT INTO sale_items ({', '.join(columns)}) "
+        f"SELECT {', '.join('s.date' if name == 'sale_date' else 'i.' + name for name in columns)} "
+        "FROM sale_items_old i JOIN sales_old s ON s.id = i.sale_id"
+    )
+    op.drop_table('sale_items_old')
+    op.drop_table('sales_old')
+
+    sale_key, item_key = (['id', 'date'], ['id', 'sale_date']) if partitioned else (['id'], ['id'])
+    op.create_primary_key('sales_pkey', 'sales', sale_key)
+    op.create_primary_key('sale_items_pkey', 'sale_items', item_key)
+    op.create_foreign_key('sales_customer_id_fkey', 'sales', 'customers', ['customer_id'], ['id'])
+    op.create_foreign_key('sale_items_product_id_fkey', 'sale_items', 'products', ['product_id'], ['id'])
+    op.create_foreign_key('sale_items_sale_id_fkey', 'sale_items', 'sales',
+                          ['sale_id', 'sale_date'] if partitioned else ['sale_id'], sale_key)
+
+    op.create_index('ix_sales_id', 'sales', ['id'])
+    op.create_index('ix_sales_invoice_number', 'sales', ['invoice_number'], unique=not partitioned)
+    op.create_index('ix_sales_created_at_id', 'sales', ['created_at', 'id'])
+    op.create_index('ix_sales_customer_id_created_at', 'sales', ['customer_id', 'created_at'])
+    op.create_index('ix_sales_pending_created_at', 'sales', ['created_at', 'id'],
+                    postgresql_where=sa.text('pending > 0'))
+    op.create_index('ix_sales_date_brin', 'sales', ['date'], postgresql_using='brin')
+    op.create_index('ix_sale_items_id', 'sale_items', ['id'])
+    op.create_index('ix_sale_items_sale_id', 'sale_items', ['sale_id'])
+    op.create_index('ix_sale_items_product_id', 'sale_items', ['product_id'])
+    op.create_index('ix_sale_items_sale_date_brin', 'sale_items', ['sale_date'], postgresql_using='brin')
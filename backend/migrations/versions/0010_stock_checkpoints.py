@@ -0,0 +1,39 @@
+"""stock checkpoints
+
+stock_checkpoints: per-item ledger balances as of a point in time, which
+balance-at-date lookups start from and stock transaction compaction folds
+old transactions into.
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2026-10-18 14:07:32.418265
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+revision = '0010'
+down_revision = '0009'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('stock_checkpoints',
+    sa.Column('id', postgresql.UUID(as_uuid=True), nullable=False),
+    sa.Column('stock_item_id', postgresql.UUID(as_uuid=True), nullable=False),
+    sa.Column('as_of', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('balance', sa.Float(), nullable=False),
+    sa.Column('drift', sa.Float(), nullable=False),
+    sa.Column('compacted', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.ForeignKeyConstraint(['stock_item_id'], ['stock_items.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_stock_checkpoints_stock_item_id_as_of', 'stock_checkpoints', ['stock_item_id', 'as_of'], unique=True)
+
+
+def downgrade():
+    op.drop_index('ix_stock_checkpoints_stock_item_id_as_of', table_name='stock_checkpoints')
+    op.drop_table('stock_checkpoints')
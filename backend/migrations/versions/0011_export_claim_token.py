@@ -0,0 +1,26 @@
+"""export claim token
+
+export_jobs.claim_token: the claim under which a worker runs an export.
+Progress and completion are written only while it is still the job's.
+
+Revision ID: 0011
+Revises: 0010
+Create Date: 2026-10-18 15:02:47.330912
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+revision = '0011'
+down_revision = '0010'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('export_jobs', sa.Column('claim_token', postgresql.UUID(as_uuid=True), nullable=True))
+
+
+def downgrade():
+    op.drop_column('export_jobs', 'claim_token')
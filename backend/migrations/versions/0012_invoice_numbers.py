@@ -0,0 +1,36 @@
+"""invoice numbers
+
+invoice_numbers: every invoice number issued, unique by its primary key.
+Partitioned sales (0009) cannot keep a unique index on invoice_number, so
+allocate_invoice_numbers records each number here in the checkout's
+transaction. Backfilled from the numbers sales already holds.
+
+Revision ID: 0012
+Revises: 0011
+Create Date: 2026-10-18 16:20:31.518204
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0012'
+down_revision = '0011'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'invoice_numbers',
+        sa.Column('invoice_number', sa.String(length=100), nullable=False),
+        sa.Column('issued_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.PrimaryKeyConstraint('invoice_number'),
+    )
+    op.execute(
+        "INSERT INTO invoice_numbers (invoice_number, issued_at) "
+        "SELECT invoice_number, min(coalesce(created_at, now())) FROM sales GROUP BY invoice_number"
+    )
+
+
+def downgrade():
+    op.drop_table('invoice_numbers')
@@ -0,0 +1,30 @@
+"""pending entry change xid
+
+customer_pending_entries.change_xid: the transaction that appended the
+delta, so /api/customers/changes reports ledger balance changes before
+they are folded into the customer row.
+
+Revision ID: 0013
+Revises: 0012
+Create Date: 2026-10-18 17:05:12.604377
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0013'
+down_revision = '0012'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('customer_pending_entries', sa.Column(
+        'change_xid', sa.BigInteger(), server_default=sa.text('pg_current_xact_id()::text::bigint'), nullable=False
+    ))
+    op.create_index('ix_customer_pending_entries_change_xid', 'customer_pending_entries', ['change_xid', 'customer_id'])
+
+
+def downgrade():
+    op.drop_index('ix_customer_pending_entries_change_xid', table_name='customer_pending_entries')
+    op.drop_column('customer_pending_entries', 'change_xid')
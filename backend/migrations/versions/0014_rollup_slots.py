@@ -0,0 +1,42 @@
+"""rollup slots
+
+daily_sales_rollup.slot: each day's totals are spread over several rows
+(one per slot) so concurrent checkouts do not all update the same row.
+Existing rows become slot 0; readers already sum over rows.
+
+Revision ID: 0014
+Revises: 0013
+Create Date: 2026-10-18 17:48:26.915034
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0014'
+down_revision = '0013'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('daily_sales_rollup', sa.Column('slot', sa.SmallInteger(), server_default='0', nullable=False))
+    op.drop_constraint('daily_sales_rollup_pkey', 'daily_sales_rollup', type_='primary')
+    op.create_primary_key('daily_sales_rollup_pkey', 'daily_sales_rollup',
+                          ['day', 'customer_type', 'payment_method', 'slot'])
+
+
+def downgrade():
+    # Merge the slots back into one row per key
+    op.execute(
+        "CREATE TEMPORARY TABLE rollup_merged ON COMMIT DROP AS "
+        "SELECT day, customer_type, payment_method, sum(invoices) AS invoices, sum(total) AS total, "
+        "sum(paid) AS paid, sum(pending) AS pending FROM daily_sales_rollup GROUP BY 1, 2, 3"
+    )
+    op.execute("DELETE FROM daily_sales_rollup")
+    op.drop_constraint('daily_sales_rollup_pkey', 'daily_sales_rollup', type_='primary')
+    op.drop_column('daily_sales_rollup', 'slot')
+    op.execute(
+        "INSERT INTO daily_sales_rollup (day, customer_type, payment_method, invoices, total, paid, pending) "
+        "SELECT * FROM rollup_merged"
+    )
+    op.create_primary_key('daily_sales_rollup_pkey', 'daily_sales_rollup', ['day', 'customer_type', 'payment_method'])
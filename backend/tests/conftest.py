@@ -0,0 +1,141 @@
+"""Shared fixtures. The suite runs against a throwaway Postgres database.
+
+A database named after PG_DB plus "_test_<pid>" is created on the server the
+app is configured for (PG_HOST, PG_USER, ... from the environment or .env),
+given the models' schema with create_all (so contrib extensions such as
+pg_trgm are not required) and dropped when the session ends.
+Settings are read when app.config is imported, so the environment is set
+here before anything from app is imported.
+
+Run from backend/: python -m pytest
+"""
+import os
+
+os.environ["PG_DB"] = f"{os.getenv('PG_DB', 'billing_db')}_test_{os.getpid()}"
+os.environ["CREATE_SCHEMA"] = "false"
+os.environ["OUTBOX_DISPATCH_SECONDS"] = "0"
+os.environ["DB_POOL_SIZE"] = "20"
+
+import pytest
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import make_url
+
+import app.main  # noqa: F401  (imports every models module onto Base.metadata)
+from app.config import settings
+from app.database import Base, SessionLocal, engine
+from app.customers import crud as customer_crud, schemas as customer_schemas
+from app.products import crud as product_crud, schemas as product_schemas
+from app.sales import schemas as sale_schemas
+
+
+def _server_engine():
+    url = make_url(settings.DATABASE_URL).set(database="postgres")
+    return create_engine(url, isolation_level="AUTOCOMMIT")
+
+
+@pytest.fixture(scope="session", autouse=True)
+def database():
+    server = _server_engine()
+    with server.connect() as conn:
+        conn.execute(text(f'CREATE DATABASE "{settings.PG_DB}"'))
+    try:
+        Base.metadata.create_all(bind=engine)
+        yield
+    finally:
+        engine.dispose()
+        with server.connect() as conn:
+            conn.execute(text(f'DROP DATABASE IF EXISTS "{settings.PG_DB}" WITH (FORCE)'))
+        server.dispose()
+
+
+@pytest.fixture(autouse=True)
+def clean_tables(database):
+    yield
+    tables = ", ".join(table.name for table in Base.metadata.sorted_tables)
+    with engine.begin() as conn:
+        conn.execute(text(f"TRUNCATE {tables} CASCADE"))
+
+
+@pytest.fixture
+def db():
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+class StatementCounter:
+    """Records the SQL statements run on the app's engine while active."""
+
+    def __init__(self):
+        self.statements = []
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+    def __enter__(self):
+        event.listen(engine, "before_cursor_execute", self._record)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(engine, "before_cursor_execute", self._record)
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+
+@pytest.fixture
+def count_statements():
+    return StatementCounter
+
+
+@pytest.fixture
+def make_customer():
+    def make(name: str = "Walk-in", customer_type: str = "retail"):
+        session = SessionLocal()
+        try:
+            return customer_crud.create_customer(
+                session, customer_schemas.CustomerCreate(name=name, phone="9000000000", type=customer_type)
+            ).id
+        finally:
+            session.close()
+    return make
+
+
+@pytest.fixture
+def make_product():
+    def make(name: str = "Rice 1kg", stock: int = 100, price: float = 10):
+        session = SessionLocal()
+        try:
+            return product_crud.create_product(
+                session,
+                product_schemas.ProductCreate(
+                    name=name, category="Grocery", retail_price=price, wholesale_price=price, stock=stock
+                ),
+            ).id
+        finally:
+            session.close()
+    return make
+
+
+@pytest.fixture
+def sale_payload():
+    """Build a SaleCreate for a customer from (product_id, quantity) pairs."""
+    def build(customer_id, lines, paid: float = 0, price: float = 10):
+        return sale_schemas.SaleCreate(
+            customer_id=customer_id,
+            customer_name="Walk-in",
+            customer_type="retail",
+            items=[
+                sale_schemas.SaleItemCreate(
+                    product_id=product_id, product_name="Item", quantity=quantity, price=price,
+                    line_total=quantity * price,
+                )
+                for product_id, quantity in lines
+            ],
+            paid=paid,
+            payment_method="cash",
+        )
+    return build
@@ -0,0 +1,70 @@
+"""In-process product catalog: category lookups and change-feed refreshes."""
+import threading
+
+from app.database import SessionLocal
+from app.products import catalog, crud, schemas
+from app.products.models import Product
+from app.sync import crud as sync_crud
+
+
+def _names(products):
+    return sorted(product.name for product in products)
+
+
+def test_search_by_category(db, make_product):
+    make_product(name="Rice 1kg")
+    make_product(name="Rice flour")
+    catalog.load()
+    crud.create_product(db, schemas.ProductCreate(
+        name="Rice cooker", category="Kitchen", retail_price=50, wholesale_price=45, stock=3,
+    ))
+
+    assert _names(catalog.search(category="grocery")) == ["Rice 1kg", "Rice flour"]
+    assert _names(catalog.search("rice", category="Kitchen")) == ["Rice cooker"]
+    assert _names(catalog.search("flour", category="kitchen")) == []
+    assert catalog.search(category="Toys") == []
+
+
+def test_refresh_picks_up_writes_from_other_workers(make_product):
+    kept = make_product(name="Rice 1kg")
+    dropped = make_product(name="Soap bar")
+    catalog.load()
+
+    # Written behind the catalog's back, as another worker would
+    db = SessionLocal()
+    try:
+        db.query(Product).filter(Product.id == kept).update({"name": "Basmati rice"})
+        db.query(Product).filter(Product.id == dropped).delete()
+        sync_crud.record_deletion(db, Product, dropped)
+        db.commit()
+    finally:
+        db.close()
+    assert _names(catalog.search("soap")) == ["Soap bar"]
+
+    assert catalog.refresh() == 2
+    assert _names(catalog.search("rice")) == ["Basmati rice"]
+    assert catalog.search("soap") == []
+    assert catalog.refresh() == 0
+
+
+def test_concurrent_loads_are_serialized(make_product, monkeypatch):
+    make_product(name="Rice 1kg")
+    running, overlapped = [], []
+    load = catalog._load
+
+    def tracked_load():
+        overlapped.append(bool(running))
+        running.append(True)
+        try:
+            return load()
+        finally:
+            running.pop()
+
+    monkeypatch.setattr(catalog, "_load", tracked_load)
+    threads = [threading.Thread(target=catalog.load) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert overlapped == [False] * 4
+    assert _names(catalog.search("rice")) == ["Rice 1kg"]
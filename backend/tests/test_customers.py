@@ -0,0 +1,46 @@
+"""Customer typeahead search and keyset-paginated customer lists."""
+from fastapi.testclient import TestClient
+
+from app.customers import crud
+from app.main import app
+from app.pagination import NEXT_CURSOR_HEADER
+
+
+def _names(customers):
+    return [customer.name for customer in customers]
+
+
+def test_short_terms_match_name_prefixes_only(db, make_customer):
+    for name in ("Ramesh Kumar", "Kumaran Stores", "Anil Traders"):
+        make_customer(name=name)
+
+    assert _names(crud.search_customers(db, "KU")) == ["Kumaran Stores"]
+    assert _names(crud.search_customers(db, "  ")) == []
+
+
+def test_long_terms_match_anywhere_prefixes_first(db, make_customer):
+    for name in ("Ramesh Kumar", "Kumaran Stores", "Anil Traders", "100% Fresh"):
+        make_customer(name=name)
+
+    assert _names(crud.search_customers(db, "kuma")) == ["Kumaran Stores", "Ramesh Kumar"]
+    assert _names(crud.search_customers(db, "kuma", limit=1)) == ["Kumaran Stores"]
+    # LIKE wildcards in the term are matched literally
+    assert _names(crud.search_customers(db, "0% f")) == ["100% Fresh"]
+    assert len(crud.search_customers(db, "9000000")) == 4  # by phone
+
+
+def test_cursor_pages_cover_every_customer_once(make_customer):
+    created = [make_customer(name=f"Customer {n}") for n in range(7)]
+    client = TestClient(app)
+
+    seen, cursor = [], None
+    while True:
+        response = client.get("/api/customers/", params={"limit": 3, **({"cursor": cursor} if cursor else {})})
+        assert response.status_code == 200
+        seen += [customer["id"] for customer in response.json()]
+        cursor = response.headers.get(NEXT_CURSOR_HEADER)
+        if not cursor:
+            break
+
+    assert seen == [str(customer_id) for customer_id in reversed(created)]  # newest first
+    assert client.get("/api/customers/", params={"cursor": "not-a-cursor"}).status_code == 400
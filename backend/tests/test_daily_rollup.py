@@ -0,0 +1,50 @@
+"""Daily rollup rows written by concurrent checkouts."""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy import func
+
+from app.database import SessionLocal
+from app.sales import crud, models
+
+WORKERS = 8
+ROUNDS = 5
+
+
+def _rollup_totals(db):
+    Rollup = models.DailySalesRollup
+    return db.query(
+        Rollup.day, Rollup.customer_type, Rollup.payment_method,
+        func.sum(Rollup.invoices), func.sum(Rollup.total), func.sum(Rollup.paid), func.sum(Rollup.pending),
+    ).group_by(Rollup.day, Rollup.customer_type, Rollup.payment_method).all()
+
+
+def test_checkouts_spread_over_slots_add_up_to_a_rebuild(db, make_customer, make_product, sale_payload):
+    customers = [make_customer(name=f"Customer {n}") for n in range(WORKERS)]
+    product_id = make_product(stock=10_000)
+    barrier = threading.Barrier(WORKERS)
+
+    def worker(customer_id):
+        session = SessionLocal()
+        try:
+            for _ in range(ROUNDS):
+                barrier.wait()
+                crud.create_sale(session, sale_payload(customer_id, [(product_id, 2)], paid=5))
+        except Exception:
+            barrier.abort()
+            raise
+        finally:
+            session.close()
+
+    with ThreadPoolExecutor(WORKERS) as pool:
+        for future in [pool.submit(worker, customer_id) for customer_id in customers]:
+            future.result()
+
+    # One key, written from several connections: more than one slot in use
+    assert db.query(func.count(func.distinct(models.DailySalesRollup.slot))).scalar() > 1
+    incremental = _rollup_totals(db)
+    assert len(incremental) == 1 and incremental[0][3] == WORKERS * ROUNDS
+    db.rollback()
+
+    crud.rebuild_daily_rollup(db)
+    assert _rollup_totals(db) == incremental
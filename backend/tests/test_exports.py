@@ -0,0 +1,154 @@
+"""Export jobs: claim tokens, chunked streaming, Range downloads and file retention."""
+import csv
+import gzip
+import os
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.config import settings
+from app.customers import models as customer_models
+from app.database import SessionLocal
+from app.exports import crud, jobs, schemas, streaming
+from app.exports.routes import _parse_range
+from app.main import app
+
+CUSTOMERS = 5
+
+
+@pytest.fixture
+def export_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "EXPORT_DIR", str(tmp_path))
+    monkeypatch.setattr(streaming, "FETCH_SIZE", 2)  # several chunks for a handful of rows
+    return tmp_path
+
+
+@pytest.fixture
+def customers_job(db, make_customer):
+    names = [f"Customer {n}" for n in range(CUSTOMERS)]
+    for name in names:
+        make_customer(name=name)
+    job = crud.create_job(db, schemas.ExportCreate(dataset="customers"))
+    return job.id, names
+
+
+def test_job_streams_every_row_in_chunks(export_dir, db, customers_job):
+    job_id, names = customers_job
+    jobs.run_export_job(job_id)
+
+    job = crud.get_job(db, job_id)
+    assert (job.status, job.total_rows, job.rows_written) == ("done", CUSTOMERS, CUSTOMERS)
+    with gzip.open(job.file_path, "rt") as f:
+        rows = list(csv.reader(f))
+    assert [row[1] for row in rows[1:]] == names[::-1]  # newest first
+    assert os.listdir(export_dir) == [f"{job_id}.csv.gz"]
+
+
+def test_reclaimed_job_is_not_finished_by_the_previous_holder(export_dir, db, customers_job, monkeypatch):
+    job_id, _ = customers_job
+    monkeypatch.setattr(settings, "EXPORT_STALE_SECONDS", -60)  # every running job looks abandoned
+    tokens = []
+    iter_csv = jobs.iter_csv
+
+    def reclaimed_midway(*args, **kwargs):
+        for n, chunk in enumerate(iter_csv(*args, **kwargs)):
+            if n == 1:
+                session = SessionLocal()
+                tokens.append(crud.claim_job(session, job_id))
+                session.close()
+            yield chunk
+
+    monkeypatch.setattr(jobs, "iter_csv", reclaimed_midway)
+    jobs.run_export_job(job_id)
+
+    job = crud.get_job(db, job_id)
+    assert tokens[0] and job.claim_token == tokens[0]
+    assert (job.status, job.file_path) == ("running", None)
+    assert not crud.update_claimed_job(db, job_id, None, rows_written=1)
+    assert os.listdir(export_dir) == []  # the first holder's side file is gone too
+
+
+def test_maintenance_requeues_abandoned_jobs(export_dir, db, customers_job, monkeypatch):
+    job_id, _ = customers_job
+    assert crud.claim_job(db, job_id)  # a worker claimed it, then died
+    submitted = []
+    monkeypatch.setattr(jobs, "submit", submitted.append)
+    assert jobs.maintain()["requeued"] == 0
+
+    monkeypatch.setattr(settings, "EXPORT_STALE_SECONDS", -60)
+    assert jobs.maintain()["requeued"] == 1
+    assert submitted == [job_id]
+
+
+def test_sweep_deletes_expired_jobs_and_leftover_part_files(export_dir, db, customers_job):
+    job_id, _ = customers_job
+    jobs.run_export_job(job_id)
+    fresh = crud.create_job(db, schemas.ExportCreate(dataset="customers"))
+    jobs.run_export_job(fresh.id)
+    running = crud.create_job(db, schemas.ExportCreate(dataset="customers"))
+    token = crud.claim_job(db, running.id)
+    live_part = export_dir / f"{running.id}.{token}.csv.gz.part"
+    dead_part = export_dir / f"{running.id}.{uuid.uuid4()}.csv.gz.part"
+    live_part.touch()
+    dead_part.touch()
+    crud.get_job(db, job_id).finished_at = datetime.now(timezone.utc) - timedelta(hours=settings.EXPORT_RETENTION_HOURS + 1)
+    db.commit()
+
+    assert jobs.sweep_files(db) == {"jobs": 1, "files": 1, "part_files": 1}
+    assert crud.get_job(db, job_id) is None
+    assert sorted(os.listdir(export_dir)) == sorted([f"{fresh.id}.csv.gz", live_part.name])
+
+
+def test_export_dir_is_resolved_against_the_backend_directory():
+    assert os.path.isabs(settings.EXPORT_DIR)
+
+
+@pytest.mark.parametrize("header, expected", [
+    (None, None),
+    ("bytes=0-9", (0, 9)),
+    ("bytes=90-", (90, 99)),
+    ("bytes=90-200", (90, 99)),
+    ("bytes=-10", (90, 99)),
+    ("bytes=-500", (0, 99)),
+    ("bytes=5-3", None),  # invalid: ignored, not 416
+    ("bytes=0-1,5-6", None),
+    ("items=0-1", None),
+    ("bytes=100-", (-1, -1)),
+    ("bytes=-0", (-1, -1)),
+])
+def test_parse_range(header, expected):
+    assert _parse_range(header, 100) == expected
+
+
+def test_customers_export_uses_the_api_pending_balance(db, make_customer, monkeypatch):
+    monkeypatch.setattr(settings, "PENDING_LEDGER", True)
+    customer_id = make_customer(name="Ledger customer")
+    db.add(customer_models.CustomerPendingEntry(customer_id=customer_id, delta=30))  # not folded yet
+    db.commit()
+    response = TestClient(app).get("/api/customers/export", headers={"Accept-Encoding": "identity"})
+    rows = {row[1]: row[4] for row in csv.reader(response.text.splitlines()[1:])}
+    assert float(rows["Ledger customer"]) == 30
+
+
+@pytest.mark.parametrize("params", [{"start_date": "yesterday"}, {"end_date": "2024-13-01"}])
+def test_bad_dates_are_rejected_before_streaming(db, params):
+    client = TestClient(app)
+    assert client.get("/api/customers/export", params=params).status_code == 422
+    response = client.post("/api/exports/", json={"dataset": "customers", **params})
+    assert response.status_code == 422
+
+
+def test_download_ignores_invalid_range(export_dir, db, customers_job):
+    job_id, _ = customers_job
+    jobs.run_export_job(job_id)
+    client = TestClient(app)
+    body = client.get(f"/api/exports/{job_id}/download").content
+
+    response = client.get(f"/api/exports/{job_id}/download", headers={"Range": "bytes=5-3"})
+    assert (response.status_code, response.content) == (200, body)
+    response = client.get(f"/api/exports/{job_id}/download", headers={"Range": "bytes=2-5"})
+    assert (response.status_code, response.content) == (206, body[2:6])
+    response = client.get(f"/api/exports/{job_id}/download", headers={"Range": f"bytes={len(body)}-"})
+    assert response.status_code == 416
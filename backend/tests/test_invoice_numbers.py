@@ -0,0 +1,83 @@
+"""Invoice number allocation: concurrent checkouts, the day's counter row and reissues."""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import pytest
+from sqlalchemy import event, func, update
+from sqlalchemy.exc import IntegrityError
+
+from app.database import SessionLocal, engine
+from app.sales import crud, models
+
+CHECKOUTS = 20
+
+
+def _concurrent_checkouts(customers, product_id, sale_payload):
+    """Run one checkout per customer at once; returns their invoice numbers."""
+    barrier = threading.Barrier(len(customers))
+
+    def checkout(customer_id):
+        db = SessionLocal()
+        try:
+            barrier.wait()
+            return crud.create_sale(db, sale_payload(customer_id, [(product_id, 1)])).invoice_number
+        finally:
+            db.close()
+
+    with ThreadPoolExecutor(len(customers)) as pool:
+        return list(pool.map(checkout, customers))
+
+
+def test_concurrent_checkouts_get_unique_gapless_numbers(db, make_customer, make_product, sale_payload):
+    # Separate customers, so checkouts only meet at the invoice counter
+    customers = [make_customer(name=f"Customer {n}") for n in range(CHECKOUTS)]
+    product_id = make_product(stock=1000)
+    failed = []
+
+    def on_error(context):
+        failed.append(context.original_exception)
+
+    event.listen(engine, "handle_error", on_error)
+    try:
+        # The first wave races to create the day's counter row, the second
+        # only increments it
+        numbers = _concurrent_checkouts(customers, product_id, sale_payload)
+        numbers += _concurrent_checkouts(customers, product_id, sale_payload)
+    finally:
+        event.remove(engine, "handle_error", on_error)
+
+    prefix = f"INV-{datetime.now():%Y%m%d}-"
+    assert sorted(numbers) == [f"{prefix}{n:04d}" for n in range(1, 2 * CHECKOUTS + 1)]
+    # No statement failed (no unique violation, deadlock or serialization
+    # error), so no checkout would have needed a retry
+    assert failed == []
+    assert db.query(func.count(models.Sale.id)).scalar() == 2 * CHECKOUTS
+
+
+def test_an_issued_number_is_never_issued_again(db, make_customer, make_product, sale_payload):
+    customer_id, product_id = make_customer(), make_product()
+    sale = crud.create_sale(db, sale_payload(customer_id, [(product_id, 1)]))
+    crud.delete_sale(db, sale)
+
+    # Even with its sale gone (and on partitioned sales, which has no unique
+    # index), a counter set back cannot hand the number out again
+    db.execute(update(models.InvoiceCounter).values(last_value=models.InvoiceCounter.last_value - 1))
+    db.commit()
+    with pytest.raises(IntegrityError, match="invoice_numbers_pkey"):
+        crud.create_sale(db, sale_payload(customer_id, [(product_id, 1)]))
+    assert db.query(func.count(models.Sale.id)).scalar() == 0
+
+
+def test_numbers_continue_from_the_counter_row(db, count_statements):
+    db.add(models.InvoiceCounter(day=datetime.now().date(), last_value=41))
+    db.commit()
+
+    with count_statements() as counter:
+        numbers = crud.allocate_invoice_numbers(db, 2)
+    db.commit()
+
+    assert numbers == [f"INV-{datetime.now():%Y%m%d}-{n:04d}" for n in (42, 43)]
+    # One upsert of the counter and the insert of the numbers: nothing
+    # scans the numbers already issued
+    assert counter.count == 2
@@ -0,0 +1,50 @@
+"""SQL statements per list page stay fixed, whatever the page size."""
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.pagination import NEXT_CURSOR_HEADER
+from app.sales import crud as sale_crud
+
+SALES = 12
+
+
+@pytest.fixture
+def client():
+    return TestClient(app)
+
+
+@pytest.fixture
+def sales(db, make_customer, make_product, sale_payload):
+    customers = [make_customer(name=f"Customer {n}") for n in range(SALES)]
+    products = [make_product(name=f"Product {n}") for n in range(2)]
+    for customer_id in customers:
+        sale_crud.create_sale(db, sale_payload(customer_id, [(product_id, 1) for product_id in products]))
+
+
+def _statements_per_page(client, count_statements, path, limit):
+    """Statements for the first page and for the page after its cursor."""
+    with count_statements() as first:
+        response = client.get(path, params={"limit": limit})
+    assert len(response.json()) == limit
+    with count_statements() as following:
+        response = client.get(path, params={"limit": limit, "cursor": response.headers[NEXT_CURSOR_HEADER]})
+    assert response.status_code == 200 and response.json()
+    return first.count, following.count
+
+
+@pytest.mark.parametrize("limit", [1, 5, SALES // 2])
+def test_sales_page_statements(sales, client, count_statements, limit):
+    # One query for the page of sales and one IN query for all their items
+    assert _statements_per_page(client, count_statements, "/api/sales/", limit) == (2, 2)
+
+
+def test_sales_page_items_are_loaded(sales, client):
+    page = client.get("/api/sales/", params={"limit": 5}).json()
+    assert [len(sale["items"]) for sale in page] == [2] * 5
+
+
+@pytest.mark.parametrize("limit", [1, 5, SALES // 2])
+def test_customers_page_statements(sales, client, count_statements, limit):
+    # The ETag's table versions, then the page itself
+    assert _statements_per_page(client, count_statements, "/api/customers/", limit) == (2, 2)
@@ -0,0 +1,46 @@
+"""Outbox events, dispatcher locking and when the in-app dispatcher runs."""
+import pytest
+
+from app.config import settings
+from app.customers import crud as customer_crud, schemas as customer_schemas
+from app.outbox import dispatcher, handlers
+from app.outbox.models import OutboxEvent
+from app.sales import crud as sale_crud, models as sale_models
+
+
+def _checkout_and_payment(db, make_customer, make_product, sale_payload):
+    customer_id = make_customer()
+    sale_crud.create_sale(db, sale_payload(customer_id, [(make_product(), 2)]))
+    customer_crud.apply_payment(db, customer_id, customer_schemas.CustomerPaymentCreate(amount=5, method="cash"))
+
+
+def test_nothing_is_queued_or_locked_without_an_enabled_handler(db, make_customer, make_product, sale_payload, count_statements):
+    _checkout_and_payment(db, make_customer, make_product, sale_payload)
+    assert db.query(OutboxEvent).count() == 0
+
+    with count_statements() as counter:
+        assert dispatcher.dispatch_batch(db, 10) == 0
+    assert not [s for s in counter.statements if s.startswith("LOCK TABLE")]
+
+
+@pytest.fixture
+def outbox_rollup(monkeypatch):
+    monkeypatch.setattr(settings, "OUTBOX_ROLLUP", True)
+
+
+def test_rollup_events_are_applied_under_the_rollup_lock(outbox_rollup, db, make_customer, make_product, sale_payload, count_statements):
+    _checkout_and_payment(db, make_customer, make_product, sale_payload)
+    assert [event.event_type for event in db.query(OutboxEvent)] == ["sale.created"]
+    assert db.query(sale_models.DailySalesRollup).count() == 0
+    db.rollback()
+
+    with count_statements() as counter:
+        assert dispatcher.dispatch_batch(db, 10) == 1
+    assert [s for s in counter.statements if s.startswith("LOCK TABLE daily_sales_rollup")]
+    assert db.query(sale_models.DailySalesRollup.invoices).scalar() == 1
+
+
+def test_dispatcher_runs_only_with_an_enabled_handler(monkeypatch):
+    assert not handlers.any_enabled()
+    monkeypatch.setattr(settings, "OUTBOX_ROLLUP", True)
+    assert handlers.any_enabled()
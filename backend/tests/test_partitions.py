@@ -0,0 +1,84 @@
+"""Monthly sales partitions: ensure_partitions and detach_month.
+
+The test database is built unpartitioned, so these run against minimal
+partitioned sales and sale_items tables in a schema of their own.
+"""
+from datetime import date
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.database import engine
+from app.sales import partitions
+
+SCHEMA = "partitioned_sales"
+
+
+@pytest.fixture
+def partitioned_db():
+    with engine.connect() as conn:
+        conn.execute(text(f"CREATE SCHEMA {SCHEMA}"))
+        conn.execute(text(f"SET search_path TO {SCHEMA}"))
+        conn.execute(text(
+            "CREATE TABLE sales (id uuid, date timestamptz NOT NULL, PRIMARY KEY (id, date)) "
+            "PARTITION BY RANGE (date)"
+        ))
+        conn.execute(text(
+            "CREATE TABLE sale_items (id uuid, sale_id uuid, sale_date timestamptz NOT NULL, "
+            "PRIMARY KEY (id, sale_date), CONSTRAINT sale_items_sale_id_fkey "
+            "FOREIGN KEY (sale_id, sale_date) REFERENCES sales (id, date)) PARTITION BY RANGE (sale_date)"
+        ))
+        conn.commit()
+        db = Session(bind=conn)
+        try:
+            yield db
+        finally:
+            db.close()
+            conn.rollback()
+            conn.execute(text(f"DROP SCHEMA {SCHEMA} CASCADE"))
+            conn.execute(text("RESET search_path"))
+            conn.commit()
+
+
+def test_ensure_partitions_creates_only_missing_months(partitioned_db):
+    db = partitioned_db
+    months = [partitions.current_month(db)]
+    for _ in range(3):
+        months.append(partitions.next_month(months[-1]))
+
+    created = partitions.ensure_partitions(db, 2)
+    assert created == [partitions.partition_name("sales", month) for month in months[:3]]
+    assert partitions.attached(db, "sale_items") == {partitions.partition_name("sale_items", month) for month in months[:3]}
+    assert partitions.ensure_partitions(db, 2) == []
+    assert partitions.ensure_partitions(db, 3) == [partitions.partition_name("sales", months[3])]
+
+
+def test_ensure_partitions_skips_an_unpartitioned_sales(db):
+    assert partitions.ensure_partitions(db, 3) == []
+
+
+def test_detach_month_keeps_the_tables(partitioned_db):
+    db = partitioned_db
+    month = partitions.current_month(db)
+    partitions.ensure_partitions(db, 1)
+    db.execute(text("INSERT INTO sales VALUES ('00000000-0000-0000-0000-000000000001', :at)"), {"at": month})
+    db.execute(text(
+        "INSERT INTO sale_items VALUES ('00000000-0000-0000-0000-000000000002', "
+        "'00000000-0000-0000-0000-000000000001', :at)"
+    ), {"at": month})
+    db.commit()
+
+    sales, items = partitions.partition_name("sales", month), partitions.partition_name("sale_items", month)
+    assert partitions.detach_month(db, month) == [sales, items]
+    assert sales not in partitions.attached(db, "sales")
+    assert db.execute(text("SELECT count(*) FROM sales")).scalar() == 0
+    assert db.execute(text(f"SELECT count(*) FROM {items}")).scalar() == 1
+
+    with pytest.raises(ValueError, match="No sales partition"):
+        partitions.detach_month(db, month)
+
+
+def test_detach_month_needs_partitioned_sales(db):
+    with pytest.raises(ValueError, match="not partitioned"):
+        partitions.detach_month(db, date(2024, 1, 1))
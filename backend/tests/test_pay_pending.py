@@ -0,0 +1,42 @@
+"""Paying off sales while the same customer checks out, with the daily rollup kept in step."""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from app.customers import models as customer_models
+from app.database import SessionLocal
+from app.sales import crud
+
+WORKERS = 8
+ROUNDS = 5
+
+
+def test_payments_and_checkouts_for_one_customer_do_not_deadlock(db, make_customer, make_product, sale_payload):
+    customer_id = make_customer()
+    product_id = make_product(stock=10_000)
+    unpaid = [crud.create_sale(db, sale_payload(customer_id, [(product_id, 1)])).id for _ in range(WORKERS * ROUNDS)]
+    db.close()
+    barrier = threading.Barrier(WORKERS)
+
+    def worker(index):
+        db = SessionLocal()
+        try:
+            for round_ in range(ROUNDS):
+                barrier.wait()
+                if index % 2:
+                    crud.pay_pending(db, unpaid[index * ROUNDS + round_], 1)
+                else:
+                    crud.create_sale(db, sale_payload(customer_id, [(product_id, 1)]))
+        except Exception:
+            barrier.abort()
+            raise
+        finally:
+            db.close()
+
+    with ThreadPoolExecutor(WORKERS) as pool:
+        for future in [pool.submit(worker, index) for index in range(WORKERS)]:
+            future.result()
+
+    # Every sale added 10 on credit, every payment took 1 off
+    sales = WORKERS * ROUNDS + (WORKERS // 2) * ROUNDS
+    payments = (WORKERS // 2) * ROUNDS
+    assert db.get(customer_models.Customer, customer_id).pending == sales * 10 - payments
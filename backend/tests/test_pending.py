@@ -0,0 +1,74 @@
+"""Pending-customers list and the receivables aging report."""
+from datetime import datetime, timedelta, timezone
+
+from app.customers import models as customer_models
+from app.pending import crud
+from app.reports import services
+from app.sales import crud as sale_crud, models as sale_models
+
+
+def _sell(db, sale_payload, customer_id, product_id, amount, days_ago=0):
+    """A credit sale of amount, dated days_ago."""
+    sale = sale_crud.create_sale(db, sale_payload(customer_id, [(product_id, 1)], price=amount))
+    if days_ago:
+        when = datetime.now(timezone.utc) - timedelta(days=days_ago)
+        db.query(sale_models.Sale).filter(sale_models.Sale.id == sale.id).update({"date": when, "created_at": when})
+        db.commit()
+    return sale
+
+
+def test_pending_customers_with_their_last_invoice(db, make_customer, make_product, sale_payload):
+    product_id = make_product(stock=100)
+    owing = make_customer(name="Owing", customer_type="wholesale")
+    settled = make_customer(name="Settled", customer_type="wholesale")
+    retail = make_customer(name="Retail", customer_type="retail")
+    _sell(db, sale_payload, owing, product_id, 40, days_ago=10)
+    last = _sell(db, sale_payload, owing, product_id, 60)
+    _sell(db, sale_payload, retail, product_id, 10)
+    db.get(customer_models.Customer, settled).pending = 0
+    db.commit()
+
+    rows = crud.get_pending_customers(db)
+    assert [(row.name, row.pending, row.last_invoice) for row in rows] == [("Owing", 100, last.invoice_number)]
+    assert crud.get_pending_customers(db, min_pending=101) == []
+
+
+def test_overdue_counts_from_the_oldest_unpaid_charge(db, make_customer, make_product, sale_payload):
+    product_id = make_product(stock=100)
+    behind = make_customer(name="Behind", customer_type="wholesale")
+    caught_up = make_customer(name="Caught up", customer_type="wholesale")
+    for customer_id in (behind, caught_up):
+        _sell(db, sale_payload, customer_id, product_id, 100, days_ago=45)
+        _sell(db, sale_payload, customer_id, product_id, 50)
+    # Caught up paid off the old invoice; only today's is open
+    db.get(customer_models.Customer, caught_up).pending = 50
+    db.commit()
+
+    assert [row.name for row in crud.get_pending_customers(db, overdue_days=30)] == ["Behind"]
+    assert [row.name for row in crud.get_pending_customers(db, overdue_days=60)] == []
+    assert len(crud.get_pending_customers(db, overdue_days=0)) == 2
+
+
+def test_a_balance_without_invoices_is_due_from_the_customer_creation(db, make_customer):
+    customer_id = make_customer(name="Opening balance", customer_type="wholesale")
+    db.get(customer_models.Customer, customer_id).pending = 75
+    db.commit()
+
+    assert [row.name for row in crud.get_pending_customers(db, overdue_days=0)] == ["Opening balance"]
+    assert crud.get_pending_customers(db, overdue_days=1) == []
+
+
+def test_aging_settles_the_oldest_charges_first(db, make_customer, make_product, sale_payload):
+    product_id = make_product(stock=100)
+    customer_id = make_customer(name="Wholesaler", customer_type="wholesale")
+    _sell(db, sale_payload, customer_id, product_id, 100, days_ago=45)
+    _sell(db, sale_payload, customer_id, product_id, 50)
+    # A 30 payment on account pays down the oldest invoice
+    db.get(customer_models.Customer, customer_id).pending = 120
+    db.commit()
+
+    report = services.get_receivables_aging(db)
+    expected = {"days_0_30": 50, "days_31_60": 70, "days_61_90": 0, "days_90_plus": 0, "total": 120}
+    assert report["totals"] == expected
+    assert [customer["customer_name"] for customer in report["customers"]] == ["Wholesaler"]
+    assert {name: report["customers"][0][name] for name in expected} == expected
@@ -0,0 +1,92 @@
+"""Pending ledger balances on the read paths, concurrent payments and the changes feed."""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import func
+
+from app.config import settings
+from app.customers import crud as customer_crud, models as customer_models, schemas as customer_schemas
+from app.database import SessionLocal
+from app.main import app
+from app.sales import crud as sale_crud
+
+PAYMENTS = 4
+
+
+@pytest.fixture
+def ledger(monkeypatch):
+    monkeypatch.setattr(settings, "PENDING_LEDGER", True)
+
+
+def test_reads_include_unfolded_deltas_without_writing(ledger, db, make_customer, make_product, sale_payload, count_statements):
+    customer_id = make_customer(customer_type="wholesale")
+    product_id = make_product(stock=100)
+    sale_crud.create_sale(db, sale_payload(customer_id, [(product_id, 3)], paid=10))
+    sale_crud.create_sale(db, sale_payload(customer_id, [(product_id, 2)], paid=0))
+    db.close()
+
+    client = TestClient(app)
+    with count_statements() as counter:
+        responses = [
+            client.get(f"/api/customers/{customer_id}").json(),
+            client.get("/api/customers/").json()[0],
+            client.get("/api/customers/search", params={"q": "walk"}).json()[0],
+            client.get("/api/customers/changes").json()["updated"][0],
+        ]
+        pending = client.get("/api/pending/").json()
+        aging = client.get("/api/reports/receivables-aging").json()
+
+    assert [customer["pending"] for customer in responses] == [40.0] * 4
+    assert [row["pending"] for row in pending] == [40.0]
+    assert aging["totals"]["total"] == 40.0
+    assert not [s for s in counter.statements if s.split()[0].upper() in ("INSERT", "UPDATE", "DELETE")]
+    assert db.query(customer_models.CustomerPendingEntry).count() == 2
+
+    # Folding moves the deltas into customers.pending without changing the balance
+    customer_crud.fold_pending_ledger(db)
+    assert db.query(customer_models.CustomerPendingEntry).count() == 0
+    assert client.get(f"/api/customers/{customer_id}").json()["pending"] == 40.0
+
+
+def test_concurrent_payments_start_from_each_others_balance(ledger, db, make_customer, make_product, sale_payload):
+    customer_id = make_customer()
+    product_id = make_product(stock=100)
+    sale_crud.create_sale(db, sale_payload(customer_id, [(product_id, 4)]))  # 40 on credit
+    db.close()
+    barrier = threading.Barrier(PAYMENTS)
+
+    def pay(_):
+        session = SessionLocal()
+        try:
+            barrier.wait()
+            customer_crud.apply_payment(session, customer_id, customer_schemas.CustomerPaymentCreate(amount=30, method="cash"))
+        finally:
+            session.close()
+
+    with ThreadPoolExecutor(PAYMENTS) as pool:
+        list(pool.map(pay, range(PAYMENTS)))
+
+    # +40, then -30 and -10: the balance stops at 0 instead of going below
+    # it, so the next credit sale is owed in full rather than absorbed
+    assert db.query(func.sum(customer_models.CustomerPendingEntry.delta)).scalar() == 0
+    sale = sale_crud.create_sale(db, sale_payload(customer_id, [(product_id, 1)]))
+    assert sale.pending == 10.0
+    assert customer_crud.get_customer(db, customer_id).pending == 10.0
+
+
+def test_changes_feed_reports_unfolded_balance_changes(ledger, db, make_customer, make_product, sale_payload):
+    customer_id, other_id = make_customer(), make_customer(name="Other")
+    product_id = make_product(stock=100)
+    client = TestClient(app)
+    token = client.get("/api/customers/changes").json()["next_token"]
+
+    sale_crud.create_sale(db, sale_payload(customer_id, [(product_id, 1)]))
+    sale_crud.create_sale(db, sale_payload(customer_id, [(product_id, 2)]))
+    db.close()  # an open transaction would hold the feed's horizon back
+
+    feed = client.get("/api/customers/changes", params={"since": token}).json()
+    assert [(customer["id"], customer["pending"]) for customer in feed["updated"]] == [(str(customer_id), 30.0)]
+    assert not feed["has_more"]
+    assert client.get("/api/customers/changes", params={"since": feed["next_token"]}).json()["updated"] == []
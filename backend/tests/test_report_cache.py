@@ -0,0 +1,30 @@
+"""Cached reports follow the shared table versions."""
+from fastapi.testclient import TestClient
+from sqlalchemy import update
+
+from app import versions
+from app.main import app
+from app.products import models as product_models
+from app.reports import cache
+from app.sales import crud as sale_crud
+
+
+def test_write_from_another_worker_is_not_served_from_cache(db, make_customer, make_product, sale_payload):
+    product_id = make_product(name="Rice 1kg")
+    sale_crud.create_sale(db, sale_payload(make_customer(), [(product_id, 2)]))
+    cache.clear()
+    client = TestClient(app)
+
+    first = client.get("/api/reports/product-performance")
+    assert first.json()[0]["product_name"] == "Rice 1kg"
+    assert client.get("/api/reports/product-performance").json() == first.json()
+    assert cache.stats()["hits"] == 1
+
+    # A rename committed by another worker: this process's cache is never told
+    db.execute(update(product_models.Product).where(product_models.Product.id == product_id).values(name="Rice 5kg"))
+    db.commit()
+    versions.bump(db, "products")
+
+    second = client.get("/api/reports/product-performance")
+    assert second.headers["ETag"] != first.headers["ETag"]
+    assert second.json()[0]["product_name"] == "Rice 5kg"
@@ -0,0 +1,56 @@
+"""Checkout stock and line items, and the product performance report."""
+import pytest
+from sqlalchemy import func
+
+from app.products import models as product_models
+from app.reports import services
+from app.sales import crud, models
+
+
+def _stock(db, product_id):
+    db.expire_all()
+    return db.get(product_models.Product, product_id).stock
+
+
+def test_checkout_takes_the_cart_total_of_each_product(db, make_customer, make_product, sale_payload):
+    customer_id = make_customer()
+    rice, soap = make_product(name="Rice 1kg", stock=10), make_product(name="Soap bar", stock=5)
+
+    # The same product on two lines is taken once, for both
+    sale = crud.create_sale(db, sale_payload(customer_id, [(rice, 2), (soap, 1), (rice, 3)]))
+
+    assert (_stock(db, rice), _stock(db, soap)) == (5, 4)
+    assert sorted((item.product_id, item.quantity) for item in sale.items) == sorted([(rice, 2), (soap, 1), (rice, 3)])
+    assert {item.sale_date for item in sale.items} == {sale.date}
+
+
+def test_short_stock_fails_the_whole_checkout(db, make_customer, make_product, sale_payload):
+    customer_id = make_customer()
+    rice, soap = make_product(name="Rice 1kg", stock=10), make_product(name="Soap bar", stock=1)
+
+    with pytest.raises(ValueError, match="Insufficient stock for product: Soap bar"):
+        crud.create_sale(db, sale_payload(customer_id, [(rice, 2), (soap, 2)]))
+
+    assert (_stock(db, rice), _stock(db, soap)) == (10, 1)
+    assert db.query(func.count(models.Sale.id)).scalar() == 0
+    assert db.query(func.count(models.SaleItem.id)).scalar() == 0
+
+
+def test_product_performance_ranks_by_product_id(db, make_customer, make_product, sale_payload):
+    customer_id = make_customer()
+    rice, soap = make_product(name="Rice 1kg", price=10), make_product(name="Soap bar", price=30)
+    crud.create_sale(db, sale_payload(customer_id, [(rice, 4)], price=10))
+    crud.create_sale(db, sale_payload(customer_id, [(soap, 1), (rice, 1)], price=30))
+
+    # Renaming the product does not split its rows
+    db.get(product_models.Product, rice).name = "Basmati rice"
+    db.commit()
+
+    by_revenue = services.get_product_performance(db)
+    assert [(row["product_name"], row["total_quantity"], row["total_revenue"]) for row in by_revenue] == [
+        ("Basmati rice", 5, 70), ("Soap bar", 1, 30),
+    ]
+    top = services.get_product_performance(db, limit=1, order_by="quantity")
+    assert [row["product_id"] for row in top] == [str(rice)]
+    with pytest.raises(ValueError):
+        services.get_product_performance(db, order_by="margin")
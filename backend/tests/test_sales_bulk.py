@@ -0,0 +1,61 @@
+"""POST /api/sales/bulk alongside single checkouts."""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from app.database import SessionLocal
+from app.products import models as product_models
+from app.sales import crud, models
+
+WORKERS = 12
+ROUNDS = 5
+BATCH = 4
+
+
+def test_bulk_results_are_per_record(db, make_customer, make_product, sale_payload):
+    customer_id = make_customer()
+    product_id = make_product(stock=5)
+
+    results = crud.create_sales_bulk(db, [
+        sale_payload(customer_id, [(product_id, 2)]),
+        sale_payload(customer_id, [(product_id, 4)]),  # only 3 left after the first
+        sale_payload(customer_id, [(product_id, 3)]),
+    ])
+
+    assert [result.ok for result in results] == [True, False, True]
+    assert results[1].error == "Insufficient stock for product: Rice 1kg"
+    assert db.get(product_models.Product, product_id).stock == 0
+
+
+def test_mixed_single_and_bulk_checkouts_do_not_deadlock(db, make_customer, make_product, sale_payload):
+    # Every call has its own customers, so calls only meet on the product
+    # rows and the invoice counter, which both paths lock
+    products = [make_product(name=f"Product {n}", stock=10_000) for n in range(3)]
+    customers = [[make_customer(name=f"Customer {w}-{n}") for n in range(BATCH)] for w in range(WORKERS)]
+    barrier = threading.Barrier(WORKERS)
+
+    def worker(index):
+        cart = [(product_id, 1) for product_id in (products if index % 4 < 2 else reversed(products))]
+        db = SessionLocal()
+        try:
+            for _ in range(ROUNDS):
+                barrier.wait()
+                if index % 2:
+                    results = crud.create_sales_bulk(db, [sale_payload(c, cart) for c in customers[index]])
+                    assert all(result.ok for result in results), results
+                else:
+                    crud.create_sale(db, sale_payload(customers[index][0], cart))
+        except Exception:
+            barrier.abort()  # release the other workers instead of leaving them waiting
+            raise
+        finally:
+            db.close()
+
+    with ThreadPoolExecutor(WORKERS) as pool:
+        for future in [pool.submit(worker, index) for index in range(WORKERS)]:
+            future.result()  # re-raises DeadlockDetected or a failed assertion
+
+    sales = (WORKERS // 2) * ROUNDS * (1 + BATCH)
+    invoice_numbers = [number for number, in db.query(models.Sale.invoice_number)]
+    assert len(invoice_numbers) == len(set(invoice_numbers)) == sales
+    for product_id in products:
+        assert db.get(product_models.Product, product_id).stock == 10_000 - sales
@@ -0,0 +1,22 @@
+"""App startup survives a failing database step."""
+from fastapi.testclient import TestClient
+
+from app import main
+
+
+def _fail():
+    raise ConnectionError("database is down")
+
+
+def test_startup_steps_fail_without_stopping_the_app(monkeypatch, caplog):
+    monkeypatch.setattr(main.settings, "DB_POOL_PREWARM", 2)
+    monkeypatch.setattr(main, "prewarm_pool", lambda count: _fail())
+    monkeypatch.setattr(main.export_jobs, "resume_unfinished", _fail)
+    monkeypatch.setattr(main.product_catalog, "load", _fail)
+    monkeypatch.setattr(main, "_start_dispatcher", _fail)
+
+    with TestClient(main.app) as client:
+        assert client.get("/").json() == {"status": "running"}
+
+    failed = [record.getMessage() for record in caplog.records if "failed; continuing" in record.getMessage()]
+    assert len(failed) == 4
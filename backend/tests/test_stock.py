@@ -0,0 +1,91 @@
+"""Batch stock adjustments, low-stock lists, and ledger checkpoints and compaction."""
+import uuid
+from datetime import timedelta
+
+import pytest
+from sqlalchemy import func
+
+from app.stock import crud, models, schemas
+
+
+@pytest.fixture
+def make_item(db):
+    def make(name: str = "Sugar", quantity: float = 10, min_threshold=None):
+        return crud.create_stock_item(db, schemas.StockCreate(
+            name=name, category="Grocery", quantity=quantity, unit="kg", min_threshold=min_threshold,
+        )).id
+    return make
+
+
+def _line(stock_item_id, delta):
+    return schemas.StockAdjustLine(stock_item_id=stock_item_id, delta=delta, reason="count")
+
+
+def test_batch_lines_succeed_or_fail_on_their_own(db, make_item):
+    sugar, salt = make_item("Sugar", 10, min_threshold=4), make_item("Salt", 1)
+    missing = uuid.uuid4()
+
+    results = crud.adjust_stock_bulk(db, [
+        _line(sugar, -4), _line(salt, -2), _line(missing, 1), _line(sugar, -3), _line(salt, 5),
+    ])
+
+    assert [(result.ok, result.quantity, result.error) for result in results] == [
+        (True, 6, None),
+        (False, None, "Cannot reduce stock below zero"),
+        (False, None, "Stock item not found"),
+        (True, 3, None),
+        (True, 6, None),
+    ]
+    db.expire_all()
+    assert (db.get(models.StockItem, sugar).quantity, db.get(models.StockItem, salt).quantity) == (3, 6)
+    assert db.query(func.count(models.StockTransaction.id)).scalar() == 3
+    # Sugar's net change crossed its threshold once
+    events = db.query(models.StockThresholdEvent).all()
+    assert [(event.stock_item_id, event.is_low, event.quantity) for event in events] == [(sugar, True, 3)]
+
+
+def test_low_stock_orderings(db, make_item):
+    make_item("Sugar", 3, min_threshold=5)
+    make_item("Salt", 0, min_threshold=10)
+    make_item("Flour", 5, min_threshold=5)
+    make_item("Rice", 50, min_threshold=5)
+    make_item("Tea", 1)  # no threshold
+
+    assert [item.name for item in crud.get_low_stock_items(db)] == ["Salt", "Sugar", "Flour"]
+    assert [item.name for item in crud.get_low_stock_items(db, order_by="name")] == ["Flour", "Salt", "Sugar"]
+    assert crud.count_low_stock_items(db) == 3
+    with pytest.raises(ValueError):
+        crud.get_low_stock_items(db, order_by="quantity")
+
+
+def test_balance_is_counted_from_the_latest_checkpoint(db, make_item):
+    sugar = make_item("Sugar", 10)
+    crud.adjust_stock(db, sugar, 5, "received")
+    crud.adjust_stock(db, sugar, -2, "sold")
+
+    first = crud.checkpoint_stock(db)
+    assert (first["checkpoints"], first["drifted"], first["compacted"]) == (1, 0, 0)
+    assert crud.checkpoint_stock(db)["checkpoints"] == 0  # nothing new since
+
+    crud.adjust_stock(db, sugar, -4, "sold")
+    item = crud.get_stock_item(db, sugar)
+    now = crud.get_stock_balance(db, item)
+    assert (now.balance, now.checkpoint_at) == (9, first["as_of"])
+    assert crud.get_stock_balance(db, item, first["as_of"]).balance == 13
+
+
+def test_compaction_deletes_the_transactions_it_summarizes(db, make_item):
+    sugar = make_item("Sugar", 10)
+    crud.adjust_stock(db, sugar, 5, "received")
+    crud.adjust_stock(db, sugar, -2, "sold")
+    before = db.query(func.max(models.StockTransaction.created_at)).scalar() - timedelta(microseconds=1)
+    db.rollback()
+
+    result = crud.checkpoint_stock(db, compact=True)
+    assert (result["checkpoints"], result["compacted"]) == (1, 2)
+    assert db.query(func.count(models.StockTransaction.id)).scalar() == 0
+
+    item = crud.get_stock_item(db, sugar)
+    assert crud.get_stock_balance(db, item).balance == 13
+    with pytest.raises(ValueError, match="has been compacted"):
+        crud.get_stock_balance(db, item, before)
@@ -0,0 +1,45 @@
+"""Change feeds: deletions as tombstones, and rows held back below the xid horizon."""
+from app.database import SessionLocal
+from app.products import crud as product_crud
+from app.products.models import Product
+from app.sync import crud
+
+
+def _changes(db, since):
+    rows, deleted, next_token, has_more = crud.get_changes(db, Product, since)
+    db.rollback()
+    return sorted(row.name for row in rows), deleted, next_token
+
+
+def test_deletes_reach_the_feed_as_tombstones(db, make_product):
+    kept, dropped = make_product(name="Rice 1kg"), make_product(name="Soap bar")
+    names, deleted, token = _changes(db, None)
+    assert (names, deleted) == (["Rice 1kg", "Soap bar"], [])
+
+    db.get(Product, kept).name = "Basmati rice"
+    db.commit()
+    product_crud.delete_product(db, db.get(Product, dropped))
+
+    names, deleted, token = _changes(db, token)
+    assert (names, deleted) == (["Basmati rice"], [dropped])
+    assert _changes(db, token)[:2] == ([], [])
+
+
+def test_rows_wait_for_older_transactions_still_running(db, make_product):
+    token = _changes(db, None)[2]
+    slow = SessionLocal()
+    try:
+        # An older transaction holds an xid while a later one commits
+        slow.add(Product(name="Slow", category="Grocery", retail_price=1, wholesale_price=1, stock=1))
+        slow.flush()
+        make_product(name="Fast")
+
+        # Fast's xid is above the horizon, so it waits: a token past it
+        # would skip Slow when it commits
+        names, _, held_token = _changes(db, token)
+        assert names == []
+        slow.commit()
+    finally:
+        slow.close()
+
+    assert _changes(db, held_token)[0] == ["Fast", "Slow"]